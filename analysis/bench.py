@@ -0,0 +1,174 @@
+'''
+benchmark of the analysis pipeline on synthetic logs
+
+Times every stage of analyze_file (parse_filename, pd.read_csv, compute_moments,
+print_sct_stats and each plot function) on synthetic logs of increasing size,
+and records the peak memory each stage allocates (tracemalloc). Results are
+written as JSON; --save makes them the baseline and --check compares against
+it, exiting non-zero when a stage got slower than the baseline by more than
+--threshold.
+
+usage (from analysis/):
+    python3 bench.py --sizes 1e3,1e4,1e5 --save     # record the baseline
+    python3 bench.py --sizes 1e3,1e4,1e5 --check    # after a change
+'''
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+import matplotlib
+
+import run
+import synthetic
+from experiments import parse_filename
+from view import ExperimentView
+
+BENCH_DIR = "./results/bench"
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+LATEST = os.path.join(BENCH_DIR, "latest.json")
+
+DEFAULT_SIZES = [10**3, 10**4, 10**5, 10**6]
+# a stage regresses when it is this much slower than the baseline ...
+THRESHOLD = 0.25
+# ... and slower by more than this many seconds (timer noise on tiny stages)
+MIN_DELTA_S = 0.005
+
+PLOTS = [
+    "plot_throughput_boxplot",
+    "plot_throughput_ridgeline",
+    "plot_throughput_timeseries",
+    "plot_sct_boxplot",
+    "plot_e2e_bar",
+    "plot_goodput_timeseries",
+]
+
+
+@contextlib.contextmanager
+def working_dir(path):
+    '''plots are saved relative to the cwd; keep them out of ./results/plots'''
+    os.makedirs(path, exist_ok=True)
+    old = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(old)
+
+
+def measure(fn, repeat):
+    '''best wall time of `repeat` calls, then one traced call for the peak memory'''
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, {"seconds": min(times), "peak_mb": peak / 2**20}
+
+
+def bench_size(nrows, repeat):
+    path = os.path.abspath(os.path.join(DATA_DIR, f"n{nrows}", synthetic.log_name()))
+    if not os.path.exists(path):
+        print(f"generating {nrows} rows ...")
+        synthetic.write_log(path, nrows)
+
+    stages = {}
+    meta, stages["parse_filename"] = measure(lambda: parse_filename(path), repeat)
+    df, stages["read_csv"] = measure(lambda: pd.read_csv(path, sep=","), repeat)
+    view = ExperimentView(df, meta)
+    _, stages["compute_moments"] = measure(
+        lambda: run.compute_moments("full", view.values("throughput")), repeat)
+    _, stages["print_sct_stats"] = measure(lambda: run.print_sct_stats(view), repeat)
+    with working_dir(os.path.join(BENCH_DIR, "work")):
+        for name in PLOTS:
+            plot = getattr(run, name)
+            _, stages[name] = measure(lambda: plot(view, meta, force=True), repeat)
+    return stages
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    '''list of (size, stage, baseline s, current s) that slowed down beyond threshold'''
+    slower = []
+    for size, stages in current["sizes"].items():
+        for stage, res in stages.items():
+            ref = baseline["sizes"].get(size, {}).get(stage)
+            if ref is None:
+                continue
+            if (res["seconds"] > ref["seconds"] * (1 + threshold)
+                    and res["seconds"] - ref["seconds"] > MIN_DELTA_S):
+                slower.append((size, stage, ref["seconds"], res["seconds"]))
+    return slower
+
+
+def print_table(results):
+    rows = []
+    for size, stages in results["sizes"].items():
+        for stage, res in stages.items():
+            rows.append({"rows": int(size), "stage": stage,
+                         "seconds": res["seconds"], "peak_mb": res["peak_mb"]})
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the analysis pipeline on synthetic logs")
+    parser.add_argument("--sizes", type=str, default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="comma separated row counts, e.g. 1e3,1e5,1e7")
+    parser.add_argument("--repeat", type=int, default=3, help="timed calls per stage (best is kept)")
+    parser.add_argument("--save", action="store_true", help=f"write the results to {BASELINE}")
+    parser.add_argument("--check", action="store_true",
+                        help=f"fail if a stage is slower than {BASELINE} by more than --threshold")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed relative slowdown per stage")
+    args = parser.parse_args()
+
+    sizes = [int(float(s)) for s in args.sizes.split(",") if s]
+    results = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+        "machine": platform.machine(),
+        "sizes": {},
+    }
+    for n in sizes:
+        print(f"benchmarking {n} rows ...")
+        results["sizes"][str(n)] = bench_size(n, args.repeat)
+
+    print_table(results)
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    with open(LATEST, "w") as fp:
+        json.dump(results, fp, indent=2)
+    if args.save:
+        with open(BASELINE, "w") as fp:
+            json.dump(results, fp, indent=2)
+        print(f"baseline written to {BASELINE}")
+
+    if args.check:
+        if not os.path.exists(BASELINE):
+            print(f"error: no baseline at {BASELINE}, run with --save first")
+            sys.exit(2)
+        with open(BASELINE) as fp:
+            baseline = json.load(fp)
+        slower = compare(results, baseline, args.threshold)
+        for size, stage, ref, cur in slower:
+            print(f"regression: {stage} at {size} rows took {cur:.4f}s, baseline {ref:.4f}s "
+                  f"(+{(cur / ref - 1) * 100:.0f}%)")
+        if slower:
+            sys.exit(1)
+        print(f"no stage slower than the baseline by more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+'''
+columnar cache of the server logs
+
+Every CSV is parsed once into one .npy file per column under CACHE_DIR/<id>/,
+and a single index table (CACHE_DIR/index.csv) records the parsed file name
+metadata next to the size, mtime and sha1 of the source. Later runs memory-map
+only the columns they need and never re-parse a file whose content is unchanged.
+Logs of a replayed workload are cached with the classes of their trace
+(workload.apply_trace), as analysis/run.py classes them; the index records the
+trace, so a log is re-parsed when the trace it replayed changes.
+
+usage (from analysis/):
+    python3 cache.py                      # ingest ../logs/server and ../data/*
+    python3 cache.py ../data/rr_threePoints_data
+'''
+import os
+import sys
+import glob
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+
+import workload
+from experiments import LOG_COLUMNS, META_FIELDS, parse_filename
+
+CACHE_DIR = "./results/cache"
+DEFAULT_SOURCES = ["../logs/server", "../data/*"]
+
+# on-disk dtype of every numeric column; "class" and "scheduler" are stored
+# as int8 category codes with the categories kept in categories.json
+NUMERIC_DTYPES = {
+    "time_ms": np.int64,
+    "stream_id": np.int64,
+    "bytes": np.int64,
+    "sct_ms": np.float64,
+    "e2e_ms": np.float64,
+}
+CATEGORICAL_COLUMNS = ["class", "scheduler"]
+
+INDEX_COLUMNS = ["id", "path", "size", "mtime_ns", "sha1", "rows", "trace"] + META_FIELDS + ["file"]
+INT_META_FIELDS = [f for f in META_FIELDS if f not in ("scenario", "scheduler")]
+
+
+def file_sha1(path, blocksize=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(blocksize), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def entry_id(path):
+    '''cache id of a source file, stable across runs and cwd'''
+    return hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:16]
+
+
+def find_sources(sources=None):
+    '''expand source directories (globs allowed) into a sorted list of csv files'''
+    files = []
+    for pattern in sources or DEFAULT_SOURCES:
+        for d in sorted(glob.glob(pattern)):
+            if os.path.isdir(d):
+                files.extend(
+                    os.path.join(d, f) for f in os.listdir(d) if f.endswith(".csv")
+                )
+            elif d.endswith(".csv"):
+                files.append(d)
+    return sorted(set(files))
+
+
+def load_index(cache_dir=CACHE_DIR):
+    path = os.path.join(cache_dir, "index.csv")
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    dtypes = {"id": str, "sha1": str, "trace": str, "scenario": str, "scheduler": str}
+    dtypes.update({f: "Int64" for f in INT_META_FIELDS})
+    index = pd.read_csv(path, dtype=dtypes)
+    # "" for logs without a trace, and in an index written before traces were recorded
+    index["trace"] = index["trace"].fillna("") if "trace" in index else ""
+    return index
+
+
+def _write_index(index, cache_dir):
+    tmp = os.path.join(cache_dir, "index.csv.tmp")
+    index.to_csv(tmp, index=False)
+    os.replace(tmp, os.path.join(cache_dir, "index.csv"))
+
+
+def _convert(path, out_dir, trace=None):
+    '''parse one csv (classed by its trace, if any) and write its columns; returns the number of rows'''
+    df = pd.read_csv(path, sep=",")
+    if trace:
+        df = workload.reclassify(df, workload.read_trace(trace))
+    os.makedirs(out_dir, exist_ok=True)
+
+    categories = {}
+    for col, dtype in NUMERIC_DTYPES.items():
+        if col in df:
+            values = df[col].to_numpy(dtype=dtype)
+        else:
+            # older server builds do not log every column
+            values = np.full(len(df), np.nan)
+        np.save(os.path.join(out_dir, f"{col}.npy"), values)
+    for col in CATEGORICAL_COLUMNS:
+        cat = pd.Categorical(df[col]) if col in df else pd.Categorical([None] * len(df))
+        np.save(os.path.join(out_dir, f"{col}.npy"), cat.codes.astype(np.int8))
+        categories[col] = [str(c) for c in cat.categories]
+
+    with open(os.path.join(out_dir, "categories.json"), "w") as fp:
+        json.dump(categories, fp)
+    return len(df)
+
+
+def ingest(sources=None, cache_dir=CACHE_DIR, verbose=True):
+    '''
+    bring the cache up to date with the given source files/directories
+    a file is re-parsed only if its size or mtime changed AND its sha1 differs;
+    experiments whose source file is gone are dropped with their columns
+    returns the full index table
+    '''
+    os.makedirs(cache_dir, exist_ok=True)
+    index = load_index(cache_dir)
+    rows = {r["id"]: r for r in index.to_dict("records")}
+
+    parsed, skipped, failed = 0, 0, 0
+    manifests = {}
+    for path in find_sources(sources):
+        eid = entry_id(path)
+        st = os.stat(path)
+        old = rows.get(eid)
+        trace = workload.trace_for(path, manifests) or ""
+        if old is not None and old["trace"] != trace:
+            old = None
+
+        if old is not None and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+            skipped += 1
+            continue
+
+        digest = file_sha1(path)
+        if old is not None and old["sha1"] == digest:
+            # touched but not changed
+            old["size"], old["mtime_ns"] = st.st_size, st.st_mtime_ns
+            skipped += 1
+            continue
+
+        try:
+            nrows = _convert(path, os.path.join(cache_dir, eid), trace)
+        except Exception as e:
+            print(f"warning: could not ingest {path}: {type(e).__name__}: {e}")
+            failed += 1
+            continue
+
+        row = {"id": eid, "path": os.path.abspath(path), "size": st.st_size,
+               "mtime_ns": st.st_mtime_ns, "sha1": digest, "rows": nrows, "trace": trace}
+        row.update(parse_filename(path))
+        rows[eid] = row
+        parsed += 1
+
+    removed = [eid for eid, row in rows.items() if not os.path.exists(row["path"])]
+    for eid in removed:
+        shutil.rmtree(os.path.join(cache_dir, eid), ignore_errors=True)
+        del rows[eid]
+
+    index = pd.DataFrame(list(rows.values()), columns=INDEX_COLUMNS)
+    index = index.astype({f: "Int64" for f in INT_META_FIELDS})
+    index = index.sort_values("path").reset_index(drop=True)
+    _write_index(index, cache_dir)
+    if verbose:
+        print(f"cache: {parsed} parsed, {skipped} unchanged, {failed} failed, {len(removed)} removed, "
+              f"{len(index)} experiments indexed in {cache_dir}")
+    return index
+
+
+def select(index, sources=None):
+    '''the rows of the index whose source is one of the given files/directories'''
+    paths = [os.path.abspath(p) for p in find_sources(sources)]
+    return index[index["path"].isin(paths)]
+
+
+def lookup(path, index, check=True):
+    '''
+    index row of a source file, or None if it is not cached
+    with check=True a row whose size/mtime no longer match the file is ignored
+    '''
+    hit = index[index["id"] == entry_id(path)]
+    if hit.empty:
+        return None
+    row = hit.iloc[0]
+    if check:
+        st = os.stat(path)
+        if row["size"] != st.st_size or row["mtime_ns"] != st.st_mtime_ns:
+            return None
+    return row
+
+
+def load_columns(eid, columns=None, cache_dir=CACHE_DIR):
+    '''
+    memory-map the requested columns of one cached experiment (zero copy)
+    categorical columns come back as int8 codes, see load_categories()
+    '''
+    columns = columns or LOG_COLUMNS
+    d = os.path.join(cache_dir, eid)
+    return {c: np.load(os.path.join(d, f"{c}.npy"), mmap_mode="r") for c in columns}
+
+
+def load_categories(eid, cache_dir=CACHE_DIR):
+    with open(os.path.join(cache_dir, eid, "categories.json")) as fp:
+        return json.load(fp)
+
+
+def load_frame(eid, columns=None, cache_dir=CACHE_DIR):
+    '''cached experiment as a DataFrame with categorical class/scheduler columns'''
+    columns = columns or LOG_COLUMNS
+    arrays = load_columns(eid, columns, cache_dir)
+    categories = load_categories(eid, cache_dir)
+    data = {}
+    for c in columns:
+        if c in CATEGORICAL_COLUMNS:
+            data[c] = pd.Categorical.from_codes(np.asarray(arrays[c]), categories[c])
+        else:
+            data[c] = arrays[c]
+    return pd.DataFrame(data, copy=False)
+
+
+def read_log(path, index=None, cache_dir=CACHE_DIR):
+    '''
+    drop-in for pd.read_csv(path): served from the cache when the file is
+    cached and unchanged, parsed from the csv otherwise
+    '''
+    if index is None:
+        index = load_index(cache_dir)
+    row = lookup(path, index)
+    if row is None:
+        return workload.apply_trace(pd.read_csv(path, sep=","), path)
+    return load_frame(row["id"], cache_dir=cache_dir)
+
+
+if __name__ == "__main__":
+    ingest(sys.argv[1:] or None)
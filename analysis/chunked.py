@@ -0,0 +1,114 @@
+'''
+bounded-memory summary of server logs too large to load at once
+
+The csv is read CHUNK_ROWS rows at a time with the compact LOG_DTYPES schema,
+and every chunk is folded into per-class OnlineMoments and QuantileSketch
+accumulators (stats.py). Only the accumulators outlive a chunk, so memory
+stays flat however long the log is. The result has the columns of
+summary.build_summary: the moments match the in-memory computation (up to the
+float32 rounding of sct_ms/e2e_ms), the percentiles are within SKETCH_ALPHA.
+Logs of a replayed workload are classed by their trace, as in the cache.
+
+usage (from analysis/):
+    python3 chunked.py ../logs/server/<experiment>.csv [--chunksize 1000000]
+'''
+import argparse
+import numpy as np
+import pandas as pd
+
+import workload
+from experiments import LOG_DTYPES, META_FIELDS, parse_filename, slowdown
+from stats import OnlineMoments, QuantileSketch
+from summary import DERIVED, PERCENTILES, MOMENTS, SUMMARY_METRICS, summary_columns
+
+CHUNK_ROWS = 1_000_000
+SKETCH_ALPHA = 0.01
+
+
+def read_chunks(path, chunksize=CHUNK_ROWS):
+    '''iterate over a server log in DataFrames of at most chunksize rows'''
+    header = pd.read_csv(path, nrows=0).columns
+    # older server builds do not log every column
+    dtypes = {c: t for c, t in LOG_DTYPES.items() if c in header}
+    return pd.read_csv(path, usecols=list(dtypes), dtype=dtypes, chunksize=chunksize)
+
+
+def summarize_file(path, chunksize=CHUNK_ROWS, metrics=SUMMARY_METRICS, alpha=SKETCH_ALPHA):
+    '''one row per class (plus "full") of one log, as in summary.build_summary'''
+    meta = parse_filename(path)
+    trace = workload.trace_for(path)
+    trace = workload.read_trace(trace) if trace else None
+    acc = {}
+    for chunk in read_chunks(path, chunksize):
+        if trace is not None and "class" in chunk:
+            chunk = workload.reclassify(chunk, trace)
+            chunk["class"] = chunk["class"].astype("category")
+        if "slowdown" in metrics and all(c in chunk for c in DERIVED["slowdown"]):
+            chunk["slowdown"] = slowdown(chunk["sct_ms"].to_numpy(), chunk["bytes"].to_numpy(),
+                                         meta["delay_ms"], meta["bandwidth_mbps"])
+        if "class" in chunk:
+            classes = chunk["class"].cat.categories
+            codes = chunk["class"].cat.codes.to_numpy()
+        else:
+            classes, codes = [], np.full(len(chunk), -1)
+        for m in metrics:
+            if m not in chunk:
+                continue
+            vals = chunk[m].to_numpy(dtype=np.float64)
+            ok = vals > 0           # also drops the NaN slowdown of unnamed configurations
+            groups = [("full", ok)] + [(str(c), ok & (codes == i)) for i, c in enumerate(classes)]
+            for name, sel in groups:
+                if name not in acc:
+                    acc[name] = {}
+                if m not in acc[name]:
+                    acc[name][m] = (OnlineMoments(), QuantileSketch(alpha))
+                moments, sketch = acc[name][m]
+                moments.add(vals[sel])
+                sketch.add(vals[sel])
+
+    rows = []
+    for name in sorted(acc):
+        row = {"file": meta["file"], **{f: meta[f] for f in META_FIELDS}, "class": name}
+        for m in metrics:
+            moments, sketch = acc[name].get(m, (OnlineMoments(), QuantileSketch(alpha)))
+            stats = {
+                "count": moments.n,
+                "mean": moments.mean if moments.n else np.nan,
+                "std": moments.std,
+                "skew": moments.skew,
+                "kurtosis": moments.kurtosis,
+            }
+            for s in MOMENTS:
+                row[f"{m}_{s}"] = stats[s]
+            for p, q in PERCENTILES.items():
+                row[f"{m}_{p}"] = sketch.quantile(q)
+        if any(row[f"{m}_count"] for m in metrics):
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def summarize_files(paths, chunksize=CHUNK_ROWS):
+    '''summary table of several logs, one file at a time'''
+    tables = []
+    for path in paths:
+        try:
+            tables.append(summarize_file(path, chunksize))
+        except Exception as e:
+            print(f"warning: could not summarise {path}: {type(e).__name__}: {e}")
+    if not tables:
+        return pd.DataFrame(columns=summary_columns())
+    table = pd.concat(tables, ignore_index=True)
+    return table.sort_values(["file", "class"]).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bounded-memory per-class summary of server logs")
+    parser.add_argument("logfiles", nargs="+")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_ROWS, help="rows read at a time")
+    args = parser.parse_args()
+    table = summarize_files(args.logfiles, args.chunksize)
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+'''
+cross-scheduler comparison
+
+Experiments from all data directories are joined on their network parameters
+(scenario, delay, bandwidth, queue, concurrency). Every scheduler variant
+(drr with each of its quanta counts as its own variant) is compared with the
+baseline scheduler at the same grid point: short/long mean and p99 SCT, as
+ratios to the baseline, with percentile bootstrap confidence intervals.
+Replicates of a variant at the same grid point are pooled. With --metric
+slowdown the same statistics are computed on SCT over the ideal completion time.
+
+The bootstrap is batched: the SCT samples of every (experiment, class) are
+stacked into one array and all of them are resampled together with one random
+index array per batch of resamples; means come from one bincount and p99s from
+one grouped sort (stats.py), so there is no Python loop over configurations.
+
+usage (from analysis/):
+    python3 compare.py                       # ../logs/server and ../data/*
+    python3 compare.py ../data/* --baseline rr --resamples 2000 [--metric slowdown]
+'''
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+import cache
+from stats import grouped_quantiles
+from summary import stack_experiments
+
+OUT_COMPARE = "./results/compare_schedulers.csv"
+POINT_FIELDS = ["scenario", "delay_ms", "bandwidth_mbps", "queue_pkts", "concurrency"]
+CLASSES = ["short", "long"]
+METRICS = ["sct_ms", "slowdown"]
+RESAMPLES = 2000
+CONFIDENCE = 0.95
+# resampled values held in memory at once; larger runs are split into batches
+MAX_DRAWS = 20_000_000
+
+
+def variant_name(row):
+    if pd.notna(row["quantum0"]):
+        return f"{row['scheduler']} q{row['quantum0']}-{row['quantum1']}-{row['quantum2']}"
+    return row["scheduler"]
+
+
+def sample_groups(index, classes=CLASSES, metric="sct_ms"):
+    '''
+    valid values of metric of every (grid point, variant, class), stored contiguously
+    returns (values, group of each value, table of the groups)
+    '''
+    index = index.reset_index(drop=True)
+    stacked, exp_pos, codes, names = stack_experiments(index, [metric])
+    sct = stacked[metric]
+
+    exps = index[POINT_FIELDS].copy()
+    exps["variant"] = index.apply(variant_name, axis=1)
+    exps["scheduler"] = index["scheduler"]
+    keys = exps[POINT_FIELDS + ["variant", "scheduler"]].astype(str).agg("|".join, axis=1)
+    exp_key, key_names = pd.factorize(keys)
+
+    wanted = np.array([names.index(c) if c in names else -2 for c in classes])
+    class_slot = np.full(len(names) + 1, -1)
+    for slot, code in enumerate(wanted):
+        if code >= 0:
+            class_slot[code] = slot
+    slot = class_slot[codes]
+    ok = (sct > 0) & (slot >= 0)
+
+    group = exp_key[exp_pos[ok]] * len(classes) + slot[ok]
+    order = np.argsort(group, kind="stable")
+    values, group = sct[ok][order], group[order]
+
+    first = exps.groupby(exp_key).first()
+    table = pd.DataFrame({
+        "group": np.arange(len(key_names) * len(classes)),
+        "class": np.tile(classes, len(key_names)),
+    })
+    table = table.join(first.loc[np.repeat(np.arange(len(key_names)), len(classes))]
+                       .reset_index(drop=True))
+    table["n"] = np.bincount(group, minlength=len(table))
+    return values, group, table
+
+
+def group_stats(values, group, ngroups):
+    '''mean and p99 of every group; arrays of shape (ngroups,)'''
+    n = np.bincount(group, minlength=ngroups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(group, weights=values, minlength=ngroups) / n
+    p99 = grouped_quantiles(values, group, ngroups, [0.99])[:, 0]
+    return mean, p99
+
+
+def bootstrap(values, group, ngroups, resamples=RESAMPLES, seed=0, max_draws=MAX_DRAWS):
+    '''
+    mean and p99 of every group in each of `resamples` bootstrap resamples;
+    arrays of shape (resamples, ngroups)
+    '''
+    rng = np.random.default_rng(seed)
+    n = np.bincount(group, minlength=ngroups)
+    start = np.concatenate(([0], np.cumsum(n)[:-1]))
+    means = np.full((resamples, ngroups), np.nan)
+    p99s = np.full((resamples, ngroups), np.nan)
+    batch = max(1, min(resamples, max_draws // max(len(values), 1)))
+
+    for b0 in range(0, resamples, batch):
+        nb = min(batch, resamples - b0)
+        # every value position draws a replacement from its own group, in all nb resamples
+        pick = start[group] + (rng.random((nb, len(values))) * n[group]).astype(np.int64)
+        drawn = values[pick].ravel()
+        bgroup = (np.arange(nb)[:, None] * ngroups + group[None, :]).ravel()
+        mean, p99 = group_stats(drawn, bgroup, nb * ngroups)
+        means[b0:b0 + nb] = mean.reshape(nb, ngroups)
+        p99s[b0:b0 + nb] = p99.reshape(nb, ngroups)
+    return means, p99s
+
+
+def compare(index, baseline="rr", resamples=RESAMPLES, seed=0, confidence=CONFIDENCE,
+            metric="sct_ms"):
+    '''
+    one row per (grid point, variant, class, statistic) with the value, the
+    baseline value, their ratio and its bootstrap confidence interval
+    '''
+    values, group, table = sample_groups(index, metric=metric)
+    ngroups = len(table)
+    mean, p99 = group_stats(values, group, ngroups)
+    boot_mean, boot_p99 = bootstrap(values, group, ngroups, resamples, seed)
+
+    # baseline group of every group: same grid point and class
+    table["point"] = table[POINT_FIELDS].astype(str).agg("|".join, axis=1)
+    base = table[(table["scheduler"] == baseline) & (table["n"] > 0)]
+    base_of = table.merge(base[["point", "class", "group"]], on=["point", "class"],
+                          how="left", suffixes=("", "_base"))["group_base"]
+    has_base = (base_of.notna().to_numpy() & (table["n"].to_numpy() > 0)
+                & (table["scheduler"] != baseline).to_numpy())
+    g = np.flatnonzero(has_base)
+    gb = base_of.to_numpy()[has_base].astype(np.int64)
+
+    if not len(g):
+        # no scheduler shares a grid point with the baseline
+        return pd.DataFrame(columns=POINT_FIELDS + ["variant", "class", "n", "stat", "value",
+                                                    "baseline", "ratio", "ci_low", "ci_high"])
+    lo_q, hi_q = (1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100
+    rows = []
+    for stat, point, boot in (("mean", mean, boot_mean), ("p99", p99, boot_p99)):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratios = boot[:, g] / boot[:, gb]
+        lo, hi = np.nanpercentile(ratios, [lo_q, hi_q], axis=0)
+        out = table.iloc[g][POINT_FIELDS + ["variant", "class", "n"]].reset_index(drop=True)
+        out["stat"] = f"{metric}_{stat}"
+        out["value"] = point[g]
+        out["baseline"] = point[gb]
+        out["ratio"] = point[g] / point[gb]
+        out["ci_low"] = lo
+        out["ci_high"] = hi
+        rows.append(out)
+    result = pd.concat(rows, ignore_index=True)
+    return result.sort_values(POINT_FIELDS + ["class", "stat", "variant"]).reset_index(drop=True)
+
+
+def write_comparison(sources=None, baseline="rr", resamples=RESAMPLES, seed=0, out=OUT_COMPARE,
+                     metric="sct_ms"):
+    # only the given sources, not whatever else was cached before
+    index = cache.select(cache.ingest(sources, verbose=False), sources)
+    result = compare(index, baseline, resamples, seed, metric=metric)
+    if result.empty:
+        print(f"warning: no scheduler shares a grid point with {baseline} in {len(index)} experiments")
+    else:
+        with pd.option_context("display.width", 200):
+            print(result.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    result.to_csv(out, index=False)
+    print(f"Saved comparison against {baseline} to {out}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compare schedulers on shared network parameters")
+    parser.add_argument("sources", nargs="*", help="log directories (globs allowed), default: cache sources")
+    parser.add_argument("--baseline", "-b", type=str, default="rr")
+    parser.add_argument("--resamples", "-n", type=int, default=RESAMPLES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--metric", choices=METRICS, default="sct_ms")
+    args = parser.parse_args()
+    write_comparison(args.sources or None, args.baseline, args.resamples, args.seed,
+                     metric=args.metric)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+'''
+naming and schema of the server-side experiment logs written by run_grid.py
+'''
+import os
+import numpy as np
+
+# columns the quic-go datacenter server writes, in order
+LOG_COLUMNS = ["time_ms", "stream_id", "bytes", "sct_ms", "e2e_ms", "class", "scheduler"]
+
+# compact dtypes for reading large logs (see chunked.py); time_ms is epoch ms
+LOG_DTYPES = {
+    "time_ms": "int64",
+    "stream_id": "int32",
+    "bytes": "int32",
+    "sct_ms": "float32",
+    "e2e_ms": "float32",
+    "class": "category",
+    "scheduler": "category",
+}
+
+# metadata fields recovered from an experiment file name
+META_FIELDS = [
+    "scenario",
+    "delay_ms",
+    "bandwidth_mbps",
+    "queue_pkts",
+    "scheduler",
+    "quantum0",
+    "quantum1",
+    "quantum2",
+    "concurrency",
+    "rep",
+]
+
+def parse_filename(path):
+    '''
+    example filename: sc-simple-p2p_d20_bw10_ql20_sch-drr_q7200-3600-1200_con10.csv
+    replicated runs end in _rep<r>, e.g. ..._con10_rep2.csv
+    '''
+    name = os.path.basename(path)
+    if name.endswith(".csv"):
+        name = name[:-4]
+
+    # make meta data struct
+    parts = name.split("_")
+    meta = {
+        "scenario": None,
+        "delay_ms": None,
+        "bandwidth_mbps": None,
+        "queue_pkts": None,
+        "scheduler": None,
+        "quantum0": None,
+        "quantum1": None,
+        "quantum2": None,
+        "concurrency": None, 
+        "rep": None,
+        "file": name,
+    }
+
+    for p in parts:
+        if p.startswith("sc-"):
+            meta["scenario"] = p[3:]                 # after "sc-"
+        elif p.startswith("d") and p[1:].isdigit():
+            meta["delay_ms"] = int(p[1:])            # "d20" -> 20
+        elif p.startswith("bw"):
+            meta["bandwidth_mbps"] = int(p[2:])      # "bw10" -> 10
+        elif p.startswith("ql"):
+            meta["queue_pkts"] = int(p[2:])          # "ql20" -> 20
+        elif p.startswith("sch-"):
+            meta["scheduler"] = p[4:]                # "sch-drr" -> "drr"
+        elif p.startswith("q"):                      # "q7200-3600-1200" -> 7200,3600,1200
+            nums = p[1:].split("-")
+            if len(nums) == 3:
+                meta["quantum0"] = int(nums[0])
+                meta["quantum1"] = int(nums[1])
+                meta["quantum2"] = int(nums[2])
+        elif p.startswith("con"):
+            meta["concurrency"] = int(p[3:])
+        elif p.startswith("rep") and p[3:].isdigit():
+            meta["rep"] = int(p[3:])                 # "rep2" -> replicate 2 (run_grid.py --reps)
+
+    return meta
+
+
+def ideal_fct_ms(nbytes, delay_ms, bandwidth_mbps):
+    '''
+    completion time of a stream alone on an idle link: one-way delay plus
+    serialization of its bytes at the bottleneck rate (1 Mbps = 1000 bits/ms)
+    NaN where the file name did not give the delay or bandwidth
+    '''
+    delay = np.asarray(np.nan if delay_ms is None else delay_ms, dtype=float)
+    bw = np.asarray(np.nan if bandwidth_mbps is None else bandwidth_mbps, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return delay + np.asarray(nbytes, dtype=float) * 8 / (bw * 1000)
+
+
+def slowdown(sct_ms, nbytes, delay_ms, bandwidth_mbps):
+    '''sct_ms / ideal_fct_ms, NaN for streams without a valid sct_ms'''
+    sct = np.asarray(sct_ms, dtype=float)
+    ideal = ideal_fct_ms(nbytes, delay_ms, bandwidth_mbps)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(sct > 0, sct / ideal, np.nan)
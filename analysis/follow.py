@@ -0,0 +1,172 @@
+'''
+live summary of an experiment while the server is still writing its log
+
+Tails logs/server/<experiment>.csv, folds every new row into per-class online
+moments and quantile sketches, and reprints the summary every --interval
+seconds. Stops when the file has not grown for --idle seconds, or on Ctrl-C.
+
+usage (from analysis/):
+    python3 follow.py ../logs/server/sc-simple-p2p_d20_bw8_ql20_sch-drr_q3600-2400-1200_con10.csv
+'''
+import os
+import io
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from experiments import parse_filename, slowdown
+from stats import OnlineMoments, QuantileSketch
+
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+
+
+class LogFollower:
+    '''
+    incremental reader of one server csv; poll() returns the rows appended
+    since the last call as a DataFrame (a trailing partial line is kept
+    until the server finishes writing it). A log that was recreated (new
+    inode) or truncated since the last poll is read again from the start,
+    and `restarts` counts how often that happened.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.header = None
+        self.restarts = 0
+        self._partial = ""
+        self._inode = None
+        self._size = 0
+
+    def poll(self):
+        try:
+            with open(self.path, "r") as fp:
+                st = os.fstat(fp.fileno())
+                if self._inode is not None and (st.st_ino != self._inode or st.st_size < self._size):
+                    self.offset, self.header, self._partial = 0, None, ""
+                    self.restarts += 1
+                self._inode, self._size = st.st_ino, st.st_size
+                fp.seek(self.offset)
+                data = fp.read()
+                self.offset = fp.tell()
+        except FileNotFoundError:
+            return None
+
+        data = self._partial + data
+        cut = data.rfind("\n") + 1
+        self._partial = data[cut:]
+        lines = data[:cut]
+        if self.header is None and lines:
+            first, _, lines = lines.partition("\n")
+            self.header = first.strip().split(",")
+        if not lines:
+            return None
+        return pd.read_csv(io.StringIO(lines), names=self.header, header=None)
+
+
+class ClassSummary:
+    '''
+    online sct_ms (and e2e_ms, slowdown) statistics per stream class; the
+    slowdown needs the delay and bandwidth of the file name metadata
+    '''
+
+    def __init__(self, alpha=0.01, meta=None):
+        self.alpha = alpha
+        self.meta = meta or {}
+        self.sct = {}
+        self.e2e = {}
+        self.slowdown = {}
+
+    def _acc(self, table, name):
+        if name not in table:
+            table[name] = (OnlineMoments(), QuantileSketch(self.alpha))
+        return table[name]
+
+    def update(self, df):
+        if "bytes" in df and "sct_ms" in df:
+            df = df.assign(slowdown=slowdown(df["sct_ms"].to_numpy(), df["bytes"].to_numpy(),
+                                             self.meta.get("delay_ms"),
+                                             self.meta.get("bandwidth_mbps")))
+        for col, table in (("sct_ms", self.sct), ("e2e_ms", self.e2e),
+                           ("slowdown", self.slowdown)):
+            if col not in df:
+                continue
+            valid = df[df[col] > 0]
+            for name, vals in [("full", valid[col])] + list(valid.groupby("class")[col]):
+                moments, sketch = self._acc(table, name)
+                vals = vals.to_numpy(dtype=float)
+                moments.add(vals)
+                sketch.add(vals)
+
+    def table(self):
+        rows = []
+        for name in sorted(self.sct, key=lambda c: (c == "full", c)):
+            moments, sketch = self.sct[name]
+            row = {
+                "class": name,
+                "count": moments.n,
+                "mean": moments.mean,
+                "std": moments.std,
+                "skew": moments.skew,
+                "kurtosis": moments.kurtosis,
+            }
+            row.update({q: sketch.quantile(v) for q, v in QUANTILES.items()})
+            if name in self.e2e:
+                row["e2e_mean"] = self.e2e[name][0].mean
+            if name in self.slowdown:
+                row["slowdown_mean"] = self.slowdown[name][0].mean
+                row["slowdown_p99"] = self.slowdown[name][1].quantile(0.99)
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def follow(path, interval=5.0, idle=60.0, poll=0.5):
+    follower = LogFollower(path)
+    summary = ClassSummary(meta=parse_filename(path))
+    last_growth = time.time()
+    last_print = 0.0
+    rows = 0
+
+    print(f"following {path} (refresh every {interval:g}s, stop after {idle:g}s idle)")
+    try:
+        while True:
+            restarts = follower.restarts
+            df = follower.poll()
+            now = time.time()
+            if follower.restarts != restarts:
+                print(f"\n[{time.strftime('%H:%M:%S')}] {path} was rewritten, starting over")
+                summary = ClassSummary(meta=parse_filename(path))
+                rows = 0
+            if df is not None and len(df):
+                summary.update(df)
+                rows += len(df)
+                last_growth = now
+            if rows and now - last_print >= interval:
+                print(f"\n[{time.strftime('%H:%M:%S')}] {rows} streams completed (sct_ms)")
+                print(summary.table().to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+                last_print = now
+            if now - last_growth >= idle:
+                break
+            time.sleep(poll)
+    except KeyboardInterrupt:
+        pass
+
+    print(f"\nfinal summary of {rows} streams (sct_ms)")
+    if rows:
+        print(summary.table().to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="live per-class summary of a running experiment")
+    parser.add_argument("logfile", help="server csv being written, e.g. ../logs/server/<experiment>.csv")
+    parser.add_argument("--interval", "-i", type=float, default=5.0, help="seconds between summaries")
+    parser.add_argument("--idle", type=float, default=60.0,
+                        help="stop once the file has not grown for this many seconds")
+    args = parser.parse_args()
+    follow(args.logfile, args.interval, args.idle)
+
+
+if __name__ == "__main__":
+    main()
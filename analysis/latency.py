@@ -0,0 +1,179 @@
+'''
+end-to-end latency breakdown from the client and server logs
+
+Client log contract. The datacenter_client in this tree's image writes no
+per-stream log; a client that defines `-logfile <path>` must write one CSV row
+per stream, with this header (CLIENT_COLUMNS, any extra columns are ignored):
+
+    stream_id       same id as in the server log
+    bytes           requested size
+    arrival_ms      the flow arrived in the workload (epoch ms, host clock)
+    open_ms         the stream was opened (a -concurrency slot was free)
+    first_byte_ms   the first byte of the response arrived
+    done_ms         the last byte arrived
+
+`run_grid.py --client-log` refuses to start unless `datacenter_client -h` lists
+-logfile, and then collects the logs as ../logs/client/<experiment>.csv, named
+like the server log. Client logs without these columns are skipped with a
+warning.
+
+Client and server rows of all experiments are joined on (experiment,
+stream_id) in one vectorized sort-merge, and every stream's latency is split
+into
+
+    queue_ms        arrival_ms -> open_ms       waiting for the concurrency limit
+    first_byte_ms   open_ms -> first_byte_ms    request, handshake, first byte
+    transfer_ms     first_byte_ms -> done_ms    the stream scheduler at work
+
+Per experiment and class it writes the mean of each part, its share of the
+mean total and the dominant part to ./results/latency_breakdown.csv.
+
+usage (from analysis/):
+    python3 latency.py                                   # ../logs/server + ../logs/client
+    python3 latency.py --server ../data/x --client ../logs/client --streams
+'''
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+from experiments import LOG_DTYPES, META_FIELDS, parse_filename
+
+SERVER_DIR = "../logs/server"
+CLIENT_DIR = "../logs/client"
+OUT_BREAKDOWN = "./results/latency_breakdown.csv"
+OUT_STREAMS = "./results/latency_streams.csv"
+CLIENT_COLUMNS = ["stream_id", "bytes", "arrival_ms", "open_ms", "first_byte_ms", "done_ms"]
+SERVER_COLUMNS = ["stream_id", "time_ms", "sct_ms", "e2e_ms", "class"]
+PARTS = ["queue_ms", "first_byte_ms", "transfer_ms"]
+# experiment code in the high bits of the join key, stream_id in the low bits
+STREAM_BITS = 40
+
+
+def missing_columns(path, columns):
+    '''the columns of the contract a csv's header does not have'''
+    with open(path, newline="") as fp:
+        header = fp.readline().strip().split(",")
+    return [c for c in columns if c not in header]
+
+
+def find_pairs(server_dir=SERVER_DIR, client_dir=CLIENT_DIR):
+    '''(experiment name, server log, client log) of every experiment with both'''
+    pairs = []
+    for fname in sorted(os.listdir(server_dir)):
+        client = os.path.join(client_dir, fname)
+        if not fname.endswith(".csv") or not os.path.exists(client):
+            continue
+        missing = missing_columns(client, CLIENT_COLUMNS)
+        if missing:
+            print(f"warning: skipping {client}: no {', '.join(missing)} column (see the client log contract)")
+            continue
+        pairs.append((fname[:-4], os.path.join(server_dir, fname), client))
+    return pairs
+
+
+def stack_logs(paths, columns, dtypes=None):
+    '''the columns of several logs concatenated, plus the position of the log of every row'''
+    frames = [pd.read_csv(p, usecols=columns, dtype=dtypes) for p in paths]
+    exp = np.repeat(np.arange(len(frames)), [len(f) for f in frames])
+    stacked = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+    return stacked, exp
+
+
+def join_keys(exp, stream_id):
+    stream_id = np.asarray(stream_id, dtype=np.int64)
+    if len(stream_id) and (stream_id.min() < 0 or stream_id.max() >= 1 << STREAM_BITS):
+        raise ValueError(f"stream_id outside [0, 2^{STREAM_BITS})")
+    return (np.asarray(exp, dtype=np.int64) << STREAM_BITS) | stream_id
+
+
+def sort_merge(left, right):
+    '''
+    positions (li, ri) with left[li] == right[ri], for int64 keys that are
+    unique within each side; both sides are sorted once and matched by a
+    binary search of the left keys in the right ones
+    '''
+    lo, ro = np.argsort(left, kind="stable"), np.argsort(right, kind="stable")
+    ls, rs = left[lo], right[ro]
+    if not len(rs):
+        return lo[:0], ro[:0]
+    pos = np.minimum(np.searchsorted(rs, ls), len(rs) - 1)
+    hit = rs[pos] == ls
+    return lo[hit], ro[pos[hit]]
+
+
+def breakdown(pairs):
+    '''one row per stream found in both logs, with its latency parts'''
+    names = [name for name, _, _ in pairs]
+    server, s_exp = stack_logs([s for _, s, _ in pairs], SERVER_COLUMNS,
+                               {c: LOG_DTYPES[c] for c in SERVER_COLUMNS})
+    client, c_exp = stack_logs([c for _, _, c in pairs], CLIENT_COLUMNS)
+    si, ci = sort_merge(join_keys(s_exp, server["stream_id"]), join_keys(c_exp, client["stream_id"]))
+
+    for pos, name in enumerate(names):
+        n_s, n_c = int((s_exp == pos).sum()), int((c_exp == pos).sum())
+        n = int((s_exp[si] == pos).sum())
+        if n < max(n_s, n_c):
+            print(f"warning: {name}: {n} streams in both logs, {n_s} server and {n_c} client rows")
+
+    streams = pd.DataFrame({"file": np.asarray(names, dtype=object)[s_exp[si]]})
+    streams = pd.concat([streams, server.iloc[si].reset_index(drop=True),
+                         client.drop(columns="stream_id").iloc[ci].reset_index(drop=True)], axis=1)
+    arrival, opened, first, done = (streams[c].to_numpy(dtype=float) for c in CLIENT_COLUMNS[2:])
+    streams["queue_ms"] = opened - arrival
+    streams["first_byte_ms"] = first - opened
+    streams["transfer_ms"] = done - first
+    streams["total_ms"] = done - arrival
+    return streams
+
+
+def summarize(streams):
+    '''mean of every part per (experiment, class), its share of the total and the dominant part'''
+    g = streams.groupby(["file", "class"], observed=True, sort=True)
+    table = g[PARTS + ["total_ms", "sct_ms"]].mean()
+    table.insert(0, "count", g.size())
+    table["p99_total_ms"] = g["total_ms"].quantile(0.99)
+    parts = table[PARTS].to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shares = parts / parts.sum(axis=1, keepdims=True)
+    for i, part in enumerate(PARTS):
+        table[part.replace("_ms", "_share")] = shares[:, i]
+    dominant = np.argmax(np.nan_to_num(parts, nan=-np.inf), axis=1) if len(parts) else []
+    table["dominant"] = np.asarray(PARTS, dtype=object)[dominant]
+    table = table.reset_index()
+    meta = pd.DataFrame([parse_filename(f + ".csv") for f in table["file"]], index=table.index)
+    return pd.concat([table[["file"]], meta[META_FIELDS], table.drop(columns="file")], axis=1)
+
+
+def write_breakdown(server_dir=SERVER_DIR, client_dir=CLIENT_DIR, out=OUT_BREAKDOWN, streams_out=None):
+    pairs = find_pairs(server_dir, client_dir)
+    if not pairs:
+        print(f"warning: no experiment has a log in both {server_dir} and {client_dir}")
+        return None
+    streams = breakdown(pairs)
+    table = summarize(streams)
+    cols = ["scheduler", "quantum0", "concurrency", "queue_pkts", "class", "count"] + PARTS + ["dominant"]
+    with pd.option_context("display.width", 200):
+        print(table[cols].to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    table.to_csv(out, index=False)
+    print(f"Saved latency breakdown of {len(pairs)} experiments to {out}")
+    if streams_out:
+        streams.to_csv(streams_out, index=False)
+        print(f"Saved {len(streams)} joined streams to {streams_out}")
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="split stream latency using the client and server logs")
+    parser.add_argument("--server", type=str, default=SERVER_DIR, help="directory of the server logs")
+    parser.add_argument("--client", type=str, default=CLIENT_DIR, help="directory of the client logs")
+    parser.add_argument("--out", type=str, default=OUT_BREAKDOWN)
+    parser.add_argument("--streams", action="store_true",
+                        help=f"also write the joined per-stream rows to {OUT_STREAMS}")
+    args = parser.parse_args()
+    write_breakdown(args.server, args.client, args.out, OUT_STREAMS if args.streams else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,694 @@
+'''
+queueing delay and drops at the ns-3 bottleneck, from the sim's captures
+
+The sim container runs tcpdump on both sides of ns-3 (sim/run.sh):
+logs/sim/trace_node_left.pcap on the client network, trace_node_right.pcap on
+the server network. Every packet that crosses the simulated link shows up in
+both, so matching the two captures gives each packet's transit time; a packet
+that enters on one side and never leaves on the other was dropped.
+
+    reading    the captures are memory-mapped and parsed BLOCK_PACKETS records
+               at a time: only the record offsets are walked in Python, every
+               field is gathered for the whole block with numpy
+    matching   IPv4 UDP/TCP packets are keyed by a 64-bit hash of addresses,
+               IP id and length, the first and last 16 transport bytes (for QUIC
+               the header and the AEAD tag, unique per packet). A packet still
+               unmatched TIMEOUT_S after both captures have moved past it is a
+               drop if it was on its ingress side, so memory stays bounded by
+               one block plus TIMEOUT_S of traffic, whatever the capture size
+    delay      queueing delay = transit - base delay - serialization at the
+               bottleneck rate; base is the smallest transit of the direction
+    intervals  per INTERVAL_S and direction: packets, bytes, drops, drop rate,
+               mean/max queueing delay and mean queue occupancy (Little's law)
+
+With --server the intervals are joined with the stream completions of the
+server log, and every stream gets the mean queueing delay and drop rate over its
+lifetime, correlated (Spearman) with its SCT per class.
+
+--synth writes a matching pair of captures and a server log of a FIFO
+bottleneck with known queueing delays and drops (truth.csv) to test against.
+
+usage (from analysis/):
+    python3 pcap.py                                          # ../logs/sim
+    python3 pcap.py --left L.pcap --right R.pcap --server ../logs/server/<experiment>.csv
+    python3 pcap.py --synth ./results/pcap/synthetic && \\
+        python3 pcap.py --dir ./results/pcap/synthetic --server ./results/pcap/synthetic/<log>.csv
+'''
+import os
+import mmap
+import struct
+import argparse
+import numpy as np
+import pandas as pd
+
+from experiments import parse_filename
+
+SIM_DIR = "../logs/sim"
+LEFT_PCAP = "trace_node_left.pcap"
+RIGHT_PCAP = "trace_node_right.pcap"
+OUT_DIR = "./results/pcap"
+BLOCK_PACKETS = 200_000
+INTERVAL_S = 0.1
+# a packet's copy on the other side arrives within this time or never
+TIMEOUT_S = 2.0
+KEY_BYTES = 16
+
+# pcap magic -> nanoseconds per timestamp fraction unit
+MAGIC = {0xa1b2c3d4: 1000, 0xa1b23c4d: 1}
+PCAPNG_MAGIC = 0x0a0d0d0a
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+DIRECTIONS = ["left->right", "right->left"]
+
+
+def _uint(buf, pos, nbytes, big=True):
+    '''unsigned integers of nbytes at every position, as uint64'''
+    out = np.zeros(len(pos), dtype=np.uint64)
+    for j in range(nbytes):
+        shift = np.uint64(8 * (nbytes - 1 - j) if big else 8 * j)
+        out |= buf[pos + j].astype(np.uint64) << shift
+    return out
+
+
+def _gather(buf, start, end, width):
+    '''(n, width) bytes from start, zero past end'''
+    idx = start[:, None] + np.arange(width)
+    inside = idx < end[:, None]
+    return np.where(inside, buf[np.where(inside, idx, 0)], 0).astype(np.uint8)
+
+
+def _mix(columns):
+    '''64-bit hash of equally long uint64 columns'''
+    key = np.full(len(columns[0]), 0x9E3779B97F4A7C15, dtype=np.uint64)
+    for col in columns:
+        key ^= col.astype(np.uint64)
+        key *= np.uint64(0xBF58476D1CE4E5B9)
+        key ^= key >> np.uint64(31)
+    return key
+
+
+class PcapReader:
+    '''
+    memory-mapped reader of one pcap file; blocks() yields dicts of arrays
+    (t ns, key, size = IP total length, pair = src << 32 | dst) for the IPv4
+    UDP/TCP packets of up to n records at a time
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.fp = open(path, "rb")
+        size = os.fstat(self.fp.fileno()).st_size
+        if size < 24:
+            raise ValueError(f"{path}: not a pcap file ({size} bytes)")
+        self.mm = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buf = np.frombuffer(self.mm, dtype=np.uint8)
+
+        magic = struct.unpack_from("<I", self.mm, 0)[0]
+        if magic == PCAPNG_MAGIC:
+            raise ValueError(f"{path}: pcapng is not supported, write pcap (tcpdump -w does)")
+        if magic in MAGIC:
+            self.endian = "<"
+        else:
+            magic = struct.unpack_from(">I", self.mm, 0)[0]
+            if magic not in MAGIC:
+                raise ValueError(f"{path}: not a pcap file (magic {magic:#x})")
+            self.endian = ">"
+        self.frac_ns = MAGIC[magic]
+        self.linktype = struct.unpack_from(self.endian + "I", self.mm, 20)[0] & 0xffff
+        if self.linktype not in (LINKTYPE_ETHERNET, LINKTYPE_RAW, LINKTYPE_LINUX_SLL, LINKTYPE_IPV4):
+            raise ValueError(f"{path}: unsupported link type {self.linktype}")
+        self.offset = 24
+        self.records = 0
+        self.skipped = 0
+
+    def close(self):
+        self.buf = None
+        self.mm.close()
+        self.fp.close()
+
+    def _offsets(self, n):
+        '''offsets of the next n complete records (a record still being written is left)'''
+        incl_len = struct.Struct(self.endian + "I").unpack_from
+        mm, size, off = self.mm, len(self.mm), self.offset
+        offsets = []
+        append = offsets.append
+        for _ in range(n):
+            if off + 16 > size:
+                break
+            end = off + 16 + incl_len(mm, off + 8)[0]
+            if end > size:
+                break
+            append(off)
+            off = end
+        self.offset = off
+        return np.array(offsets, dtype=np.int64)
+
+    def blocks(self, n=BLOCK_PACKETS):
+        while True:
+            offs = self._offsets(n)
+            if len(offs) == 0:
+                return
+            self.records += len(offs)
+            yield self._parse(offs)
+
+    def _parse(self, offs):
+        buf, big = self.buf, self.endian == ">"
+        sec = _uint(buf, offs, 4, big).astype(np.int64)
+        frac = _uint(buf, offs + 4, 4, big).astype(np.int64)
+        caplen = _uint(buf, offs + 8, 4, big).astype(np.int64)
+        data = offs + 16
+        end = data + caplen
+
+        # link layer -> IPv4 header
+        if self.linktype == LINKTYPE_ETHERNET:
+            ok = caplen >= 14 + 20
+            ok[ok] = _uint(buf, data[ok] + 12, 2) == 0x0800
+            ip = data + 14
+        elif self.linktype == LINKTYPE_LINUX_SLL:
+            ok = caplen >= 16 + 20
+            ok[ok] = _uint(buf, data[ok] + 14, 2) == 0x0800
+            ip = data + 16
+        else:
+            ok = caplen >= 20
+            ip = data
+        ok[ok] = buf[ip[ok]] >> 4 == 4
+        sel = np.flatnonzero(ok)
+        ip, end = ip[sel], end[sel]
+        ihl = (buf[ip] & 0x0f).astype(np.int64) * 4
+        proto = buf[ip + 9]
+        l4 = ip + ihl
+        keep = ((proto == 17) | (proto == 6)) & (l4 + 8 <= end)
+        self.skipped += len(offs) - int(keep.sum())
+        sel, ip, end, l4 = sel[keep], ip[keep], end[keep], l4[keep]
+
+        total_len = _uint(buf, ip + 2, 2)
+        ip_id = _uint(buf, ip + 4, 2)
+        src, dst = _uint(buf, ip + 12, 4), _uint(buf, ip + 16, 4)
+        head = _gather(buf, l4, end, KEY_BYTES).view("<u8")
+        tail = _gather(buf, np.maximum(end - KEY_BYTES, l4), end, KEY_BYTES).view("<u8")
+        pair = (src << np.uint64(32)) | dst
+        key = _mix([pair, (ip_id << np.uint64(16)) | total_len,
+                    head[:, 0], head[:, 1], tail[:, 0], tail[:, 1]])
+        return {
+            "t": sec[sel] * 1_000_000_000 + frac[sel] * self.frac_ns,
+            "key": key,
+            "size": total_len.astype(np.int64),
+            "pair": pair,
+        }
+
+
+def _concat(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return {k: np.concatenate([a[k], b[k]]) for k in a}
+
+
+def _take(arrays, idx):
+    return {k: v[idx] for k, v in arrays.items()}
+
+
+def _dedupe(side):
+    '''keep the first packet of every key; returns (packets, number removed)'''
+    _, first = np.unique(side["key"], return_index=True)
+    if len(first) == len(side["key"]):
+        return side, 0
+    first.sort()
+    return _take(side, first), len(side["key"]) - len(first)
+
+
+class Intervals:
+    '''per-direction sums over fixed intervals, grown as the captures advance'''
+
+    FIELDS = ["packets", "bytes", "drops", "drop_bytes", "size2", "transit", "size_transit", "max_net"]
+
+    def __init__(self, t0, interval_ns):
+        self.t0 = t0
+        self.interval_ns = interval_ns
+        self.data = np.zeros((2, len(self.FIELDS), 0))
+
+    def _bins(self, t):
+        idx = np.maximum((t - self.t0) // self.interval_ns, 0)
+        need = int(idx.max()) + 1 if len(idx) else 0
+        if need > self.data.shape[2]:
+            grown = np.zeros((2, len(self.FIELDS), max(need, 2 * self.data.shape[2])))
+            grown[:, :, :self.data.shape[2]] = self.data
+            self.data = grown
+        return idx
+
+    def add_transits(self, direction, t_in, size, transit, net):
+        '''net: transit minus serialization, whose maximum gives the largest queueing delay'''
+        idx = self._bins(t_in)
+        nb = self.data.shape[2]
+        d = self.data[direction]
+        d[0] += np.bincount(idx, minlength=nb)
+        d[1] += np.bincount(idx, weights=size, minlength=nb)
+        d[4] += np.bincount(idx, weights=size * size, minlength=nb)
+        d[5] += np.bincount(idx, weights=transit, minlength=nb)
+        d[6] += np.bincount(idx, weights=size * transit, minlength=nb)
+        np.maximum.at(d[7], idx, net)
+
+    def add_drops(self, direction, t_in, size):
+        idx = self._bins(t_in)
+        nb = self.data.shape[2]
+        d = self.data[direction]
+        d[0] += np.bincount(idx, minlength=nb)
+        d[1] += np.bincount(idx, weights=size, minlength=nb)
+        d[2] += np.bincount(idx, minlength=nb)
+        d[3] += np.bincount(idx, weights=size, minlength=nb)
+
+
+class CaptureMatcher:
+    '''
+    streams the two captures side by side, matches their packets and keeps
+    only what is not resolved yet (unmatched packets younger than the timeout)
+    '''
+
+    def __init__(self, left, right, interval_s=INTERVAL_S, timeout_s=TIMEOUT_S,
+                 block_packets=BLOCK_PACKETS, bw_mbps=None):
+        self.readers = [PcapReader(left), PcapReader(right)]
+        self.interval_ns = int(interval_s * 1e9)
+        self.timeout_ns = int(timeout_s * 1e9)
+        self.block_packets = block_packets
+        # ns per IP byte at the bottleneck, to separate serialization from queueing
+        self.ns_per_byte = 8e3 / bw_mbps if bw_mbps else 0.0
+        self.pending = [None, None]
+        self.first = [None, None]
+        self.last = [None, None]
+        self.done = [False, False]
+        self.lr_pairs = set()
+        self.rl_pairs = set()
+        self.base = [np.inf, np.inf]    # min transit - serialization, ns
+        self.counts = {"matched": [0, 0], "drops": [0, 0], "duplicates": 0,
+                       "censored": 0, "unknown_flow": 0}
+        self.intervals = None
+
+    def _pull(self, side, blocks):
+        block = next(blocks[side], None)
+        if block is None:
+            self.done[side] = True
+            return
+        if len(block["t"]):
+            if self.first[side] is None:
+                self.first[side] = int(block["t"].min())
+            self.last[side] = max(self.last[side] or 0, int(block["t"].max()))
+        self.pending[side] = _concat(self.pending[side], block)
+
+    def _match(self):
+        left, right = self.pending
+        if left is None or right is None or not len(left["key"]) or not len(right["key"]):
+            return
+        left, dl = _dedupe(left)
+        right, dr = _dedupe(right)
+        self.counts["duplicates"] += dl + dr
+        order = np.argsort(right["key"])
+        rkeys = right["key"][order]
+        pos = np.minimum(np.searchsorted(rkeys, left["key"]), len(rkeys) - 1)
+        hit = rkeys[pos] == left["key"]
+        li, ri = np.flatnonzero(hit), order[pos[hit]]
+
+        t_l, t_r = left["t"][li], right["t"][ri]
+        lr = t_r >= t_l
+        size = left["size"][li]
+        transit = np.abs(t_r - t_l).astype(float)
+        for direction, sel in enumerate([lr, ~lr]):
+            if not sel.any():
+                continue
+            pairs = set(np.unique(left["pair"][li][sel]).tolist())
+            (self.lr_pairs if direction == 0 else self.rl_pairs).update(pairs)
+            net = transit[sel] - size[sel] * self.ns_per_byte
+            self.base[direction] = min(self.base[direction], float(net.min()))
+            self.intervals.add_transits(direction, np.minimum(t_l, t_r)[sel],
+                                        size[sel].astype(float), transit[sel], net)
+            self.counts["matched"][direction] += int(sel.sum())
+
+        keep_l = np.ones(len(left["key"]), dtype=bool)
+        keep_l[li] = False
+        keep_r = np.ones(len(right["key"]), dtype=bool)
+        keep_r[ri] = False
+        self.pending = [_take(left, keep_l), _take(right, keep_r)]
+
+    def _resolve(self, horizon, final=False):
+        '''packets unmatched for longer than the timeout: drops or censored'''
+        for side in (0, 1):
+            pend = self.pending[side]
+            if pend is None or not len(pend["t"]):
+                continue
+            old = np.ones(len(pend["t"]), dtype=bool) if final else pend["t"] < horizon - self.timeout_ns
+            if not old.any():
+                continue
+            other = 1 - side
+            # side 0 (left) is the ingress of left->right, side 1 of right->left
+            ingress = np.isin(pend["pair"], list(self.lr_pairs if side == 0 else self.rl_pairs))
+            egress = np.isin(pend["pair"], list(self.rl_pairs if side == 0 else self.lr_pairs))
+            observable = (self.first[other] is not None) & (pend["t"] >= (self.first[other] or 0))
+            if self.last[other] is not None:
+                observable &= pend["t"] < self.last[other] - self.timeout_ns
+            drop = old & ingress & observable
+            unknown = old & ~ingress & ~egress
+            self.intervals.add_drops(side, pend["t"][drop], pend["size"][drop].astype(float))
+            self.counts["drops"][side] += int(drop.sum())
+            self.counts["unknown_flow"] += int(unknown.sum())
+            # egress copies whose ingress was before the other capture started, and
+            # ingress copies too close to either end of the other capture to tell
+            self.counts["censored"] += int((old & ~drop & ~unknown).sum())
+            self.pending[side] = _take(pend, ~old)
+
+    def run(self):
+        blocks = [r.blocks(self.block_packets) for r in self.readers]
+        self._pull(0, blocks)
+        self._pull(1, blocks)
+        starts = [f for f in self.first if f is not None]
+        if not starts:
+            raise ValueError("no IPv4 UDP/TCP packets in the captures")
+        self.intervals = Intervals(min(starts), self.interval_ns)
+        while not all(self.done):
+            self._match()
+            if self.done[0] or self.done[1]:
+                horizon = min(l for l in self.last if l is not None)
+            else:
+                horizon = min(self.last[0] or 0, self.last[1] or 0)
+            self._resolve(horizon)
+            # advance the capture that is behind
+            if self.done[0]:
+                side = 1
+            elif self.done[1]:
+                side = 0
+            else:
+                side = 0 if (self.last[0] or 0) <= (self.last[1] or 0) else 1
+            self._pull(side, blocks)
+        self._match()
+        self._resolve(None, final=True)
+        for r in self.readers:
+            r.close()
+        return self.table()
+
+    def table(self):
+        '''per-interval DataFrame of both directions'''
+        iv = self.intervals
+        nbins = iv.data.shape[2]
+        rows = []
+        for direction in (0, 1):
+            d = dict(zip(Intervals.FIELDS, iv.data[direction]))
+            base = self.base[direction] if np.isfinite(self.base[direction]) else 0.0
+            delivered = d["packets"] - d["drops"]
+            delivered_bytes = d["bytes"] - d["drop_bytes"]
+            # sum of queueing delays = transits - base - serialization, per interval
+            queued = d["transit"] - delivered * base - delivered_bytes * self.ns_per_byte
+            queued_bytes = d["size_transit"] - delivered_bytes * base - d["size2"] * self.ns_per_byte
+            with np.errstate(invalid="ignore", divide="ignore"):
+                rows.append(pd.DataFrame({
+                    "direction": DIRECTIONS[direction],
+                    "t_s": np.arange(nbins) * iv.interval_ns / 1e9,
+                    "time_ms": (iv.t0 + np.arange(nbins) * iv.interval_ns) / 1e6,
+                    "packets": d["packets"].astype(np.int64),
+                    "bytes": d["bytes"].astype(np.int64),
+                    "drops": d["drops"].astype(np.int64),
+                    "drop_rate": d["drops"] / d["packets"],
+                    "mean_qdelay_ms": queued / delivered / 1e6,
+                    "max_qdelay_ms": np.where(delivered > 0, (d["max_net"] - base) / 1e6, np.nan),
+                    "queued_pkts": queued / iv.interval_ns,
+                    "queued_bytes": queued_bytes / iv.interval_ns,
+                }))
+        return pd.concat(rows, ignore_index=True)
+
+
+def stream_exposure(intervals, server, direction):
+    '''
+    per completed stream of the server log: mean queueing delay and drop rate
+    of the given direction over the stream's lifetime, from cumulative sums of
+    the intervals (one searchsorted per stream boundary)
+    '''
+    iv = intervals[intervals["direction"] == direction]
+    edges = np.append(iv["time_ms"].to_numpy(), iv["time_ms"].iloc[-1] + (
+        iv["time_ms"].iloc[1] - iv["time_ms"].iloc[0] if len(iv) > 1 else INTERVAL_S * 1e3))
+    delivered = (iv["packets"] - iv["drops"]).to_numpy(dtype=float)
+    qsum = np.nan_to_num(iv["mean_qdelay_ms"].to_numpy() * delivered)
+    cum = {name: np.concatenate([[0.0], np.cumsum(v)]) for name, v in
+           (("q", qsum), ("n", delivered), ("packets", iv["packets"].to_numpy(dtype=float)),
+            ("drops", iv["drops"].to_numpy(dtype=float)))}
+
+    df = server[server["sct_ms"] > 0]
+    end = df["time_ms"].to_numpy(dtype=float)
+    start = end - df["sct_ms"].to_numpy(dtype=float)
+    # intervals overlapping [start, end]
+    lo = np.clip(np.searchsorted(edges, start, side="right") - 1, 0, len(iv))
+    hi = np.clip(np.searchsorted(edges, end, side="left"), 0, len(iv))
+    hi = np.maximum(hi, lo + 1).clip(max=len(iv))
+
+    def window(name):
+        return cum[name][hi] - cum[name][lo]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = pd.DataFrame({
+            "stream_id": df["stream_id"].to_numpy() if "stream_id" in df else np.arange(len(df)),
+            "class": df["class"].to_numpy() if "class" in df else "all",
+            "time_ms": end,
+            "sct_ms": df["sct_ms"].to_numpy(dtype=float),
+            "mean_qdelay_ms": window("q") / window("n"),
+            "drop_rate": window("drops") / window("packets"),
+        })
+    return out
+
+
+def completions(intervals, server):
+    '''intervals joined with the count and mean SCT of the streams completing in each, per class'''
+    df = server[server["sct_ms"] > 0]
+    t0 = intervals["time_ms"].min()
+    step = np.diff(np.unique(intervals["time_ms"]))[0] if intervals["time_ms"].nunique() > 1 \
+        else INTERVAL_S * 1e3
+    nbins = intervals["time_ms"].nunique()
+    bins = np.clip(((df["time_ms"].to_numpy(dtype=float) - t0) // step).astype(np.int64), 0, nbins - 1)
+    classes = df["class"].astype(str).to_numpy() if "class" in df else np.full(len(df), "all")
+    cols = {}
+    for c in sorted(set(classes)):
+        sel = classes == c
+        n = np.bincount(bins[sel], minlength=nbins)
+        total = np.bincount(bins[sel], weights=df["sct_ms"].to_numpy(dtype=float)[sel], minlength=nbins)
+        cols[f"{c}_completions"] = n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cols[f"{c}_mean_sct_ms"] = total / n
+    per_bin = pd.DataFrame(cols)
+    per_bin["bin"] = np.arange(nbins)
+    out = intervals.copy()
+    out["bin"] = np.round((out["time_ms"] - t0) / step).astype(np.int64)
+    return out.merge(per_bin, on="bin", how="left").drop(columns="bin")
+
+
+def print_report(matcher, intervals):
+    print(f"{matcher.readers[0].records} + {matcher.readers[1].records} records, "
+          f"{matcher.readers[0].skipped + matcher.readers[1].skipped} not IPv4 UDP/TCP, "
+          f"{matcher.counts['duplicates']} duplicates, {matcher.counts['censored']} censored "
+          f"at the capture edges, {matcher.counts['unknown_flow']} of unknown direction")
+    for direction, name in enumerate(DIRECTIONS):
+        iv = intervals[intervals["direction"] == name]
+        matched, drops = matcher.counts["matched"][direction], matcher.counts["drops"][direction]
+        if matched + drops == 0:
+            continue
+        delivered = (iv["packets"] - iv["drops"]).to_numpy(dtype=float)
+        mean_q = np.nansum(iv["mean_qdelay_ms"].to_numpy() * delivered) / max(delivered.sum(), 1)
+        print(f"  {name}: {matched} delivered, {drops} dropped ({drops / (matched + drops):.2%}), "
+              f"base delay {matcher.base[direction] / 1e6:.2f} ms, queueing delay mean "
+              f"{mean_q:.2f} ms, max {np.nanmax(iv['max_qdelay_ms']):.2f} ms")
+
+
+def analyze(left, right, server=None, interval_s=INTERVAL_S, timeout_s=TIMEOUT_S,
+            block_packets=BLOCK_PACKETS, bw_mbps=None, out_dir=OUT_DIR):
+    '''
+    intervals of one pair of captures, written to out_dir; with a server log
+    also the per-stream exposure and its correlation with the SCT
+    returns (intervals, streams or None)
+    '''
+    meta = parse_filename(server) if server else {}
+    if bw_mbps is None:
+        bw_mbps = meta.get("bandwidth_mbps")
+    matcher = CaptureMatcher(left, right, interval_s, timeout_s, block_packets, bw_mbps)
+    intervals = matcher.run()
+    print_report(matcher, intervals)
+    name = meta.get("file") or os.path.basename(os.path.dirname(os.path.abspath(left))) or "capture"
+    os.makedirs(out_dir, exist_ok=True)
+
+    streams = None
+    if server:
+        log = pd.read_csv(server)
+        intervals = completions(intervals, log)
+        # the direction carrying most bytes is the data direction of the streams
+        by_dir = intervals.groupby("direction")["bytes"].sum()
+        direction = by_dir.idxmax()
+        streams = stream_exposure(intervals, log, direction)
+        streams.to_csv(os.path.join(out_dir, f"{name}_streams.csv"), index=False)
+        print(f"\nstreams vs {direction} queue over their lifetime (Spearman correlation with SCT)")
+        rows = []
+        for c, g in streams.groupby("class"):
+            rows.append({
+                "class": c,
+                "streams": len(g),
+                "mean_qdelay_ms": g["mean_qdelay_ms"].mean(),
+                "drop_rate": g["drop_rate"].mean(),
+                "corr_qdelay": g["sct_ms"].corr(g["mean_qdelay_ms"], method="spearman"),
+                "corr_drop_rate": g["sct_ms"].corr(g["drop_rate"], method="spearman"),
+            })
+        print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    path = os.path.join(out_dir, f"{name}_queue.csv")
+    intervals.to_csv(path, index=False)
+    print(f"Saved per-interval queue statistics to {path}")
+    return intervals, streams
+
+
+''' synthetic captures '''
+CLIENT_IP = (193, 167, 0, 100)
+SERVER_IP = (193, 167, 100, 100)
+SERVER_PORT = 4242
+PAYLOAD = 1200
+ACK_PAYLOAD = 40
+ACK_EVERY = 2
+EPOCH_S = 1_765_000_000
+
+
+def _frame(src, dst, sport, dport, ip_id, payload):
+    '''ethernet + IPv4 + UDP frame (checksums left at zero)'''
+    udp = struct.pack(">HHHH", sport, dport, 8 + len(payload), 0) + payload
+    ip = struct.pack(">BBHHHBBH4B4B", 0x45, 0, 20 + len(udp), ip_id, 0, 64, 17, 0, *src, *dst)
+    return b"\x02\x00\x00\x00\x00\x01" + b"\x02\x00\x00\x00\x00\x02" + b"\x08\x00" + ip + udp
+
+
+def write_pcap(path, times_ns, frames):
+    '''microsecond pcap of (time, frame) records, in time order'''
+    order = np.argsort(times_ns, kind="stable")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fp:
+        fp.write(struct.pack("<IHHiIII", 0xa1b2c3d4, 2, 4, 0, 0, 262144, LINKTYPE_ETHERNET))
+        for i in order:
+            t_us = int(times_ns[i]) // 1000
+            frame = frames[i]
+            fp.write(struct.pack("<IIII", t_us // 1_000_000, t_us % 1_000_000, len(frame), len(frame)))
+            fp.write(frame)
+    os.replace(tmp, path)
+
+
+def write_synthetic(out_dir, duration_s=30.0, bw_mbps=8, delay_ms=20, qlen=20, seed=0,
+                    load=0.6, pace=0.7):
+    '''
+    captures of streams through a FIFO bottleneck of qlen packets: client
+    streams (short 50 KB / long 1.5 MB) arrive at random and each sends at
+    `pace` times the link rate, so the queue fills and drops while they
+    overlap. The server acknowledges every ACK_EVERY delivered packet.
+    Writes trace_node_left/right.pcap, a server log and truth.csv
+    returns the path of the server log
+    '''
+    rng = np.random.default_rng(seed)
+    capacity = bw_mbps * 1e6 / 8                      # bytes/s
+    pkt_bytes = 20 + 8 + PAYLOAD
+    service = pkt_bytes / capacity
+    sizes = np.where(rng.random(100_000) < 0.9, 51200, 1521664)
+    arrivals = np.cumsum(rng.exponential(sizes.mean() / (load * capacity), len(sizes)))
+    nstreams = int(np.searchsorted(arrivals, duration_s))
+    sizes, arrivals = sizes[:nstreams], arrivals[:nstreams]
+
+    # packet send times: each stream paces its packets at pace x link rate
+    npkts = -(-sizes // PAYLOAD)
+    stream = np.repeat(np.arange(nstreams), npkts)
+    k = np.arange(len(stream)) - np.repeat(np.cumsum(npkts) - npkts, npkts)
+    send = arrivals[stream] + k * service / pace
+    order = np.argsort(send, kind="stable")
+    send, stream = send[order], stream[order]
+
+    # FIFO queue of qlen packets waiting behind the one in service
+    depart = np.full(len(send), np.nan)
+    queue, head, last = [], 0, 0.0
+    for i, t in enumerate(send):
+        while head < len(queue) and queue[head] <= t:
+            head += 1
+        if len(queue) - head > qlen:
+            continue
+        last = max(t, last) + service
+        depart[i] = last
+        queue.append(last)
+    delivered = ~np.isnan(depart)
+    arrive = depart + delay_ms / 1e3
+
+    times, left, right = [], [], []
+    payloads = rng.integers(0, 256, (len(send), PAYLOAD), dtype=np.uint8)
+    for i in range(len(send)):
+        frame = _frame(CLIENT_IP, SERVER_IP, 50000 + stream[i] % 1000, SERVER_PORT,
+                       i & 0xffff, payloads[i].tobytes())
+        left.append((send[i], frame))
+        if delivered[i]:
+            right.append((arrive[i], frame))
+    # acks: right -> left, no queue on the way back
+    acks = np.flatnonzero(delivered)[::ACK_EVERY]
+    for j, i in enumerate(acks):
+        frame = _frame(SERVER_IP, CLIENT_IP, SERVER_PORT, 50000 + stream[i] % 1000,
+                       j & 0xffff, rng.bytes(ACK_PAYLOAD))
+        right.append((arrive[i], frame))
+        left.append((arrive[i] + (20 + 8 + ACK_PAYLOAD) / capacity + delay_ms / 1e3, frame))
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name, records in ((LEFT_PCAP, left), (RIGHT_PCAP, right)):
+        times = np.array([int((EPOCH_S + t) * 1e9) for t, _ in records], dtype=np.int64)
+        write_pcap(os.path.join(out_dir, name), times, [f for _, f in records])
+
+    pd.DataFrame({
+        "time_ms": (EPOCH_S + send) * 1e3,
+        "stream_id": stream,
+        "bytes": pkt_bytes,
+        "dropped": ~delivered,
+        "qdelay_ms": (depart - send - service) * 1e3,
+    }).to_csv(os.path.join(out_dir, "truth.csv"), index=False)
+
+    # server log: a stream completes when its last delivered packet arrives
+    last_arrival = pd.Series(arrive[delivered]).groupby(stream[delivered]).max()
+    ids = last_arrival.index.to_numpy()
+    done_ms = (EPOCH_S + last_arrival.to_numpy()) * 1e3
+    sct = done_ms - (EPOCH_S + arrivals[ids]) * 1e3
+    log = pd.DataFrame({
+        "time_ms": np.round(done_ms).astype(np.int64),
+        "stream_id": ids,
+        "bytes": sizes[ids],
+        "sct_ms": np.round(sct, 2),
+        "e2e_ms": np.round(sct + delay_ms, 2),
+        "class": np.where(sizes[ids] > 51200, "long", "short"),
+        "scheduler": "rr",
+    }).sort_values("time_ms")
+    path = os.path.join(out_dir, f"sc-synthetic_d{delay_ms}_bw{bw_mbps}_ql{qlen}_sch-rr_con1.csv")
+    log.to_csv(path, index=False)
+    print(f"synthetic captures of {nstreams} streams, {len(send)} packets "
+          f"({int((~delivered).sum())} dropped) written to {out_dir}")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="queueing delay and drops at the bottleneck from the sim captures")
+    parser.add_argument("--dir", type=str, default=SIM_DIR,
+                        help=f"directory with {LEFT_PCAP} and {RIGHT_PCAP}")
+    parser.add_argument("--left", type=str, default=None, help="client-side capture")
+    parser.add_argument("--right", type=str, default=None, help="server-side capture")
+    parser.add_argument("--server", type=str, default=None,
+                        help="server log of the same run, for the per-stream correlation")
+    parser.add_argument("--interval", type=float, default=INTERVAL_S, help="seconds per interval")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_S,
+                        help="seconds after which an unmatched packet counts as dropped")
+    parser.add_argument("--bw", type=float, default=None,
+                        help="bottleneck Mbps (default: from the --server file name)")
+    parser.add_argument("--block", type=int, default=BLOCK_PACKETS, help="records parsed at a time")
+    parser.add_argument("--out", type=str, default=OUT_DIR)
+    parser.add_argument("--synth", metavar="DIR", default=None,
+                        help="write synthetic captures, server log and truth.csv to DIR and exit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duration", type=float, default=30.0, help="with --synth: seconds of traffic")
+    args = parser.parse_args()
+
+    if args.synth:
+        write_synthetic(args.synth, args.duration, seed=args.seed)
+        return
+    left = args.left or os.path.join(args.dir, LEFT_PCAP)
+    right = args.right or os.path.join(args.dir, RIGHT_PCAP)
+    analyze(left, right, args.server, args.interval, args.timeout, args.block, args.bw, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,414 @@
+'''
+per-stream and per-connection transport timelines from qlog
+
+The quic-go endpoints write one qlog per connection into /logs/qlog when
+QLOGDIR is set (docker-compose.yml), i.e. ../logs/server/qlog and
+../logs/client/qlog on the host. The files are JSON-SEQ (or newline-delimited
+JSON), one event per line, and are read incrementally: CHUNK_BYTES at a time,
+only the events below are decoded (a substring test skips the rest, but in a
+"delta" time format trace every event is read for its time), and the
+values are kept in typed arrays (array module), not Python objects.
+
+    metrics    recovery:metrics_updated -> t, min/smoothed/latest RTT, RTT
+               variance, cwnd, bytes and packets in flight (forward-filled:
+               quic-go only logs the fields that changed)
+    packets    transport:packet_sent / packet_received -> t, packet number,
+               size, sent (1) or received (0)
+    frames     the stream frames of those packets -> t, stream_id, offset,
+               length, fin, sent, packet number
+    lost       recovery:packet_lost -> t, packet number
+
+Times are epoch ms (reference_time + event time), like time_ms in the server
+log. The parsed arrays and the reader state are cached per qlog in
+./results/qlog/cache, so the next run only parses what was appended (or
+nothing); a file whose first bytes changed is parsed again from the start.
+
+stream_summary() reduces the frames to one row per stream (first/last frame,
+bytes, retransmitted and lost bytes, mean RTT and cwnd while it was served),
+which join_log() merges into the server log rows by stream_id.
+
+usage (from analysis/):
+    python3 qlog.py                                      # ../logs/{server,client}/qlog
+    python3 qlog.py ../logs/client/qlog --server ../logs/server/<experiment>.csv
+'''
+import os
+import io
+import json
+import array
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+
+QLOG_DIRS = ["../logs/server/qlog", "../logs/client/qlog"]
+QLOG_SUFFIXES = (".sqlog", ".qlog")
+OUT_DIR = "./results/qlog"
+CACHE_DIR = os.path.join(OUT_DIR, "cache")
+CHUNK_BYTES = 8 << 20
+# bytes at the start of a qlog that identify it (a new run rewrites the header)
+HEAD_BYTES = 4096
+# bumped when the parsing changes, so older caches are parsed again
+CACHE_VERSION = 2
+
+METRICS = ["min_rtt", "smoothed_rtt", "latest_rtt", "rtt_variance",
+           "congestion_window", "bytes_in_flight", "packets_in_flight"]
+# table -> column -> array typecode
+TABLES = {
+    "metrics": dict({"t": "d"}, **{m: "d" for m in METRICS}),
+    "packets": {"t": "d", "pn": "q", "size": "q", "sent": "b", "one_rtt": "b"},
+    "frames": {"t": "d", "stream_id": "q", "offset": "q", "length": "q", "fin": "b",
+               "sent": "b", "pn": "q"},
+    "lost": {"t": "d", "pn": "q"},
+}
+# substrings of the events we decode; every other line is skipped undecoded
+WANTED = (b"packet_sent", b"packet_received", b"metrics_updated", b"packet_lost")
+
+
+def _event_name(event):
+    name = event.get("name")
+    if name is None:
+        return event.get("event", "")
+    return name.split(":")[-1]
+
+
+def _head_digest(path):
+    with open(path, "rb") as fp:
+        return hashlib.sha1(fp.read(HEAD_BYTES)).hexdigest()
+
+
+class QlogTrace:
+    '''
+    one qlog file, parsed incrementally: update() reads what was appended
+    since the last call; tables() returns the numpy arrays
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.head = None
+        self.reference_ms = 0.0
+        self.time_format = "relative"
+        self.last_time = 0.0
+        self.vantage = None
+        self.odcid = None
+        self.events = 0
+        self.current = {m: np.nan for m in METRICS}
+        self.columns = {t: {c: array.array(code) for c, code in cols.items()}
+                        for t, cols in TABLES.items()}
+
+    def _header(self, record):
+        trace = record.get("trace") or (record.get("traces") or [{}])[0]
+        common = trace.get("common_fields", {})
+        self.reference_ms = float(common.get("reference_time", self.reference_ms))
+        self.time_format = common.get("time_format", self.time_format)
+        self.odcid = common.get("ODCID") or common.get("group_id") or self.odcid
+        self.vantage = (trace.get("vantage_point") or {}).get("type", self.vantage)
+
+    def _time(self, event):
+        t = float(event.get("time", 0.0))
+        if self.time_format == "delta":
+            t += self.last_time
+        self.last_time = t
+        return self.reference_ms + t
+
+    def _packet(self, t, data, sent):
+        header = data.get("header", {})
+        pn = int(header.get("packet_number", -1))
+        raw = data.get("raw", {})
+        size = int(raw.get("length", header.get("packet_size", 0)) or 0)
+        one_rtt = header.get("packet_type") in ("1RTT", "0RTT")
+        p = self.columns["packets"]
+        p["t"].append(t)
+        p["pn"].append(pn)
+        p["size"].append(size)
+        p["sent"].append(sent)
+        p["one_rtt"].append(one_rtt)
+        f = self.columns["frames"]
+        for frame in data.get("frames") or ():
+            if frame.get("frame_type") != "stream":
+                continue
+            f["t"].append(t)
+            f["stream_id"].append(int(frame["stream_id"]))
+            f["offset"].append(int(frame.get("offset", 0)))
+            f["length"].append(int(frame.get("length", 0)))
+            f["fin"].append(bool(frame.get("fin", False)))
+            f["sent"].append(sent)
+            f["pn"].append(pn)
+
+    def _event(self, event):
+        name = _event_name(event)
+        data = event.get("data", {})
+        t = self._time(event)
+        if name == "metrics_updated":
+            self.current.update({m: float(data[m]) for m in METRICS if m in data})
+            m = self.columns["metrics"]
+            m["t"].append(t)
+            for k in METRICS:
+                m[k].append(self.current[k])
+        elif name == "packet_sent":
+            self._packet(t, data, 1)
+        elif name == "packet_received":
+            self._packet(t, data, 0)
+        elif name == "packet_lost":
+            lost = self.columns["lost"]
+            lost["t"].append(t)
+            lost["pn"].append(int(data.get("header", {}).get("packet_number", -1)))
+        else:
+            return
+        self.events += 1
+
+    def update(self, chunk_bytes=CHUNK_BYTES):
+        '''parse the complete records appended since the last call; returns events added'''
+        before = self.events
+        with open(self.path, "rb") as fp:
+            if self.head is None:
+                self.head = hashlib.sha1(fp.read(HEAD_BYTES)).hexdigest()
+            fp.seek(self.offset)
+            while True:
+                chunk = fp.read(chunk_bytes)
+                if not chunk:
+                    break
+                # only complete lines; the rest is read again next time
+                cut = chunk.rfind(b"\n") + 1
+                if cut == 0:
+                    if len(chunk) < chunk_bytes:
+                        break
+                    raise ValueError(f"{self.path}: record longer than {chunk_bytes} bytes")
+                self._parse(chunk[:cut])
+                self.offset += cut
+                fp.seek(self.offset)
+        return self.events - before
+
+    def _parse(self, data):
+        for line in io.BytesIO(data):
+            line = line.strip(b"\x1e \r\n")
+            if not line:
+                continue
+            if b"qlog_version" in line or b"qlog_format" in line:
+                record = json.loads(line)
+                self._header(record)
+                # draft-02 files hold their events inside the header
+                for trace in record.get("traces", []):
+                    for event in trace.get("events", []):
+                        if isinstance(event, dict):
+                            self._event(event)
+                continue
+            if not any(w in line for w in WANTED):
+                # a delta time is relative to the previous event, wanted or not
+                if self.time_format == "delta":
+                    self._time(json.loads(line))
+                continue
+            self._event(json.loads(line))
+
+    def tables(self):
+        return {t: {c: np.frombuffer(col, dtype=col.typecode) if len(col) else
+                    np.array([], dtype=col.typecode) for c, col in cols.items()}
+                for t, cols in self.columns.items()}
+
+    def state(self):
+        return {
+            "version": CACHE_VERSION, "path": self.path, "offset": self.offset, "head": self.head,
+            "reference_ms": self.reference_ms, "time_format": self.time_format,
+            "last_time": self.last_time, "vantage": self.vantage, "odcid": self.odcid,
+            "events": self.events, "current": self.current,
+        }
+
+    def save(self, path):
+        arrays = {f"{t}.{c}": v for t, cols in self.tables().items() for c, v in cols.items()}
+        arrays["state"] = np.array(json.dumps(self.state()))
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, qlog_path, cache_path):
+        '''the cached trace of qlog_path, or None if the cache does not belong to this file'''
+        with np.load(cache_path) as npz:
+            state = json.loads(str(npz["state"]))
+            if (state.get("version") != CACHE_VERSION or state["path"] != qlog_path or state["head"] != _head_digest(qlog_path)
+                    or state["offset"] > os.path.getsize(qlog_path)):
+                return None
+            trace = cls(qlog_path)
+            for key in ("offset", "head", "reference_ms", "time_format", "last_time",
+                        "vantage", "odcid", "events", "current"):
+                setattr(trace, key, state[key])
+            for t, cols in TABLES.items():
+                for c, code in cols.items():
+                    trace.columns[t][c] = array.array(code, npz[f"{t}.{c}"].tobytes())
+        return trace
+
+
+def find_qlogs(sources=None):
+    files = []
+    for src in sources or QLOG_DIRS:
+        if os.path.isdir(src):
+            files += [os.path.join(src, f) for f in os.listdir(src) if f.endswith(QLOG_SUFFIXES)]
+        elif src.endswith(QLOG_SUFFIXES) and os.path.exists(src):
+            files.append(src)
+    return sorted(set(files))
+
+
+def load_trace(path, use_cache=True, cache_dir=CACHE_DIR):
+    '''the trace of one qlog, parsing only what the cache has not seen yet'''
+    path = os.path.abspath(path)
+    cache_path = os.path.join(cache_dir, hashlib.sha1(path.encode()).hexdigest()[:16] + ".npz")
+    trace = None
+    if use_cache and os.path.exists(cache_path):
+        trace = QlogTrace.load(path, cache_path)
+    if trace is None:
+        trace = QlogTrace(path)
+    offset = trace.offset
+    trace.update()
+    if use_cache and trace.offset != offset:
+        os.makedirs(cache_dir, exist_ok=True)
+        trace.save(cache_path)
+    return trace
+
+
+def _window_mean(t, values, start, end):
+    '''mean of the samples (t, values) in [start, end] for every window, NaN if none'''
+    ok = ~np.isnan(values)
+    t, values = t[ok], values[ok]
+    cum = np.concatenate([[0.0], np.cumsum(values)])
+    lo = np.searchsorted(t, start, side="left")
+    hi = np.searchsorted(t, end, side="right")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (cum[hi] - cum[lo]) / (hi - lo)
+
+
+def stream_summary(trace):
+    '''
+    one row per stream: frames and bytes sent (or received, for a trace of
+    the receiving side), retransmitted and lost bytes, first and last frame
+    time, and the mean smoothed RTT / cwnd / bytes in flight while it was served
+    '''
+    tables = trace.tables()
+    f = tables["frames"]
+    if not len(f["t"]):
+        return pd.DataFrame()
+    by_sender = bool(f["sent"].any())
+    frames = pd.DataFrame({k: v[f["sent"] == by_sender] for k, v in f.items()})
+    # only the sender sees its packets declared lost
+    frames["lost"] = np.isin(frames["pn"], tables["lost"]["pn"]) if by_sender else False
+    frames["end"] = frames["offset"] + frames["length"]
+    frames["lost_bytes"] = np.where(frames["lost"], frames["length"], 0)
+
+    g = frames.groupby("stream_id", sort=True)
+    out = pd.DataFrame({
+        "frames": g.size(),
+        "frame_bytes": g["length"].sum(),
+        "stream_bytes": g["end"].max(),
+        "lost_frames": g["lost"].sum(),
+        "lost_bytes": g["lost_bytes"].sum(),
+        "first_ms": g["t"].min(),
+        "last_ms": g["t"].max(),
+        "fin": g["fin"].max().astype(bool),
+    }).reset_index()
+    out["retransmitted_bytes"] = out["frame_bytes"] - out["stream_bytes"]
+    out["service_ms"] = out["last_ms"] - out["first_ms"]
+
+    m = tables["metrics"]
+    start, end = out["first_ms"].to_numpy(), out["last_ms"].to_numpy()
+    for col, name in (("smoothed_rtt", "mean_srtt_ms"), ("congestion_window", "mean_cwnd"),
+                      ("bytes_in_flight", "mean_bytes_in_flight")):
+        out[name] = _window_mean(m["t"], m[col], start, end)
+    out["side"] = "sent" if by_sender else "received"
+    return out
+
+
+def connection_summary(trace):
+    tables = trace.tables()
+    p, m, f = tables["packets"], tables["metrics"], tables["frames"]
+    srtt = m["smoothed_rtt"][~np.isnan(m["smoothed_rtt"])]
+    t = np.concatenate([p["t"], m["t"]])
+    return {
+        "file": os.path.basename(trace.path),
+        "vantage": trace.vantage,
+        "events": trace.events,
+        "duration_s": (t.max() - t.min()) / 1e3 if len(t) else 0.0,
+        "sent": int(p["sent"].sum()),
+        "received": int(len(p["sent"]) - p["sent"].sum()),
+        "lost": len(tables["lost"]["pn"]),
+        "streams": len(np.unique(f["stream_id"])),
+        "min_rtt_ms": float(np.nanmin(m["min_rtt"])) if len(m["t"]) and not np.isnan(m["min_rtt"]).all() else np.nan,
+        "median_srtt_ms": float(np.median(srtt)) if len(srtt) else np.nan,
+        "p99_srtt_ms": float(np.percentile(srtt, 99)) if len(srtt) else np.nan,
+        "mean_cwnd": float(np.nanmean(m["congestion_window"])) if len(m["t"]) else np.nan,
+    }
+
+
+def join_log(streams, log):
+    '''
+    the server log rows with the qlog summary of their stream; wait_ms is the
+    time from the stream being opened (time_ms - e2e_ms) to its first frame,
+    drain_ms from its last frame to its completion being logged
+    '''
+    joined = log.merge(streams, on="stream_id", how="left")
+    if "e2e_ms" in joined:
+        joined["wait_ms"] = joined["first_ms"] - (joined["time_ms"] - joined["e2e_ms"])
+    joined["drain_ms"] = joined["time_ms"] - joined["last_ms"]
+    return joined
+
+
+def match_trace(traces, log):
+    '''
+    the trace whose frames overlap the log's time span the most; on a tie the
+    client's, as the client is the side that sends the stream data
+    '''
+    lo, hi = log["time_ms"].min() - log["sct_ms"].max(), log["time_ms"].max()
+    best, best_key = None, None
+    for trace in traces:
+        t = trace.tables()["frames"]["t"]
+        if not len(t):
+            continue
+        overlap = max(0.0, min(hi, t.max()) - max(lo, t.min()))
+        key = (overlap, trace.vantage == "client")
+        if overlap > 0 and (best_key is None or key > best_key):
+            best, best_key = trace, key
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="per-stream transport timelines from qlog")
+    parser.add_argument("sources", nargs="*", help=f"qlog files or directories (default {QLOG_DIRS})")
+    parser.add_argument("--server", type=str, default=None,
+                        help="server log to join the per-stream summary to, by stream_id")
+    parser.add_argument("--no-cache", action="store_true", help="parse every qlog from the start")
+    parser.add_argument("--out", type=str, default=OUT_DIR)
+    args = parser.parse_args()
+
+    files = find_qlogs(args.sources or None)
+    if not files:
+        print(f"warning: no qlog files in {args.sources or QLOG_DIRS}")
+        return
+    traces = []
+    for path in files:
+        try:
+            traces.append(load_trace(path, use_cache=not args.no_cache))
+        except (OSError, ValueError) as e:
+            print(f"warning: could not read {path}: {type(e).__name__}: {e}")
+    print(pd.DataFrame([connection_summary(t) for t in traces]).to_string(
+        index=False, float_format=lambda v: f"{v:.2f}"))
+
+    if args.server:
+        log = pd.read_csv(args.server)
+        trace = match_trace(traces, log)
+        if trace is None:
+            print(f"warning: no qlog overlaps {args.server}")
+            return
+        joined = join_log(stream_summary(trace), log)
+        name = os.path.splitext(os.path.basename(args.server))[0]
+        os.makedirs(args.out, exist_ok=True)
+        path = os.path.join(args.out, f"{name}_streams.csv")
+        joined.to_csv(path, index=False)
+        cols = [c for c in ("sct_ms", "wait_ms", "service_ms", "drain_ms", "retransmitted_bytes",
+                            "lost_frames", "mean_srtt_ms", "mean_cwnd") if c in joined]
+        print(f"\n{os.path.basename(trace.path)} ({trace.vantage}) joined to {len(joined)} streams, "
+              f"{joined['frames'].notna().sum()} with frames")
+        if "class" in joined:
+            print(joined.groupby("class")[cols].mean().to_string(float_format=lambda v: f"{v:.2f}"))
+        print(f"Saved per-stream timeline to {path}")
+
+
+if __name__ == "__main__":
+    main()
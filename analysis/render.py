@@ -0,0 +1,100 @@
+'''
+incremental plot rendering
+
+Figures are drawn on the Agg canvas directly (no pyplot state) and reused:
+one Figure per size is kept per process and cleared between plots. Every PNG
+carries a hash of its inputs (the experiment's data digest, its metadata, the
+plot name and parameters, RENDER_VERSION) in a PNG text chunk; a plot whose
+hash matches the file already in PLOT_DIR is not drawn again.
+
+Bump RENDER_VERSION when the drawing code changes, or pass force=True.
+'''
+import os
+import json
+import struct
+import hashlib
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+PLOT_DIR = "./results/plots"
+DPI = 150
+RENDER_VERSION = 1
+HASH_KEY = "InputHash"
+
+_FIGURES = {}
+
+
+def get_figure(figsize):
+    '''a cleared Agg figure of the given size, reused across plots'''
+    fig = _FIGURES.get(figsize)
+    if fig is None:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        _FIGURES[figsize] = fig
+    else:
+        fig.clear()
+        # tight_layout left its layout engine and subplot margins; clear() keeps both
+        fig.set_layout_engine(None)
+        fig.subplotpars.update(**{k: matplotlib.rcParams[f"figure.subplot.{k}"]
+                                  for k in ("left", "right", "bottom", "top", "wspace", "hspace")})
+    return fig
+
+
+def input_hash(view, meta, name, params=None):
+    blob = json.dumps([RENDER_VERSION, name, view.digest(), meta, params],
+                      sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def stored_hash(path):
+    '''the input hash recorded in an existing PNG, or None'''
+    try:
+        with open(path, "rb") as fp:
+            if fp.read(8) != b"\x89PNG\r\n\x1a\n":
+                return None
+            while True:
+                head = fp.read(8)
+                if len(head) < 8:
+                    return None
+                length, kind = struct.unpack(">I4s", head)
+                if kind == b"IDAT":
+                    return None         # text chunks we write come before the image data
+                data = fp.read(length)
+                fp.read(4)              # crc
+                if kind == b"tEXt":
+                    key, _, value = data.partition(b"\0")
+                    if key.decode("latin-1") == HASH_KEY:
+                        return value.decode("latin-1")
+    except OSError:
+        return None
+
+
+def plot_path(meta, suffix):
+    return os.path.join(PLOT_DIR, f"{meta['file']}_{suffix}.png")
+
+
+def render(draw, view, meta, suffix, figsize, params=None, force=False):
+    '''
+    draw(fig, view, meta) onto a reused figure and save it as <file>_<suffix>.png,
+    unless the PNG already holds the same input hash; draw may return False when
+    there is nothing to plot, which also removes the PNG of an earlier run
+    returns (path, True if drawn / False if up to date), or (None, False)
+    '''
+    path = plot_path(meta, suffix)
+    key = input_hash(view, meta, suffix, params)
+    if not force and stored_hash(path) == key:
+        return path, False
+
+    fig = get_figure(figsize)
+    if draw(fig, view, meta) is False:
+        fig.clear()
+        if os.path.exists(path):
+            os.remove(path)
+        return None, False
+    if not fig.get_layout_engine():
+        fig.tight_layout()
+    os.makedirs(PLOT_DIR, exist_ok=True)
+    fig.savefig(path, dpi=DPI, bbox_inches="tight", metadata={HASH_KEY: key})
+    fig.clear()
+    return path, True
@@ -1,70 +1,46 @@
 import os
+import io
 import argparse
+import contextlib
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.stats import skew as sp_skew, kurtosis as sp_kurtosis, gaussian_kde
+from matplotlib.colors import to_rgba
+from scipy.stats import skew as sp_skew, kurtosis as sp_kurtosis
+
+import cache
+import chunked
+import compare
+import latency
+import render
+import summary
+import workload
+from experiments import parse_filename
+from kde import binned_kde
+from timebins import ROLLING_WINDOWS, binned_series, density_image
+from timeline import Tracer
+from view import ExperimentView
 
 LOG_DIR = "../data/wfq_threepoints_data"
 OUT_SUMMARY = "./results/summary_by_class.csv"
+TRACE_PATH = "./results/trace.json"
+# above this many streams the throughput time series is drawn as a density image
+DENSITY_MIN_ROWS = 50_000
+DENSITY_BINS = (600, 300)
+# per-stream metrics the stats table, boxplot, ridgeline and time series can show
+METRIC_LABELS = {
+    "throughput": "Throughput (bytes/ms)",
+    "sct_ms": "Stream completion time (ms)",
+    "slowdown": "Slowdown (SCT / ideal completion time)",
+}
 
 # maybe an overall score: score= w1â€‹â‹…mean_short â€‹+ w2â€‹â‹…p99_short â€‹+ w3â€‹â‹…skew_short
 
-def parse_filename(path):
-    '''
-    example filename: sc-simple-p2p_d20_bw10_ql20_sch-drr_q7200-3600-1200_con10.csv
-    '''
-    name = os.path.basename(path)
-    if name.endswith(".csv"):
-        name = name[:-4]
-
-    # make meta data struct
-    parts = name.split("_")
-    meta = {
-        "scenario": None,
-        "delay_ms": None,
-        "bandwidth_mbps": None,
-        "queue_pkts": None,
-        "scheduler": None,
-        "quantum0": None,
-        "quantum1": None,
-        "quantum2": None,
-        "concurrency": None, 
-        "file": name,
-    }
-
-    for p in parts:
-        if p.startswith("sc-"):
-            meta["scenario"] = p[3:]                 # after "sc-"
-        elif p.startswith("d") and p[1:].isdigit():
-            meta["delay_ms"] = int(p[1:])            # "d20" -> 20
-        elif p.startswith("bw"):
-            meta["bandwidth_mbps"] = int(p[2:])      # "bw10" -> 10
-        elif p.startswith("ql"):
-            meta["queue_pkts"] = int(p[2:])          # "ql20" -> 20
-        elif p.startswith("sch-"):
-            meta["scheduler"] = p[4:]                # "sch-drr" -> "drr"
-        elif p.startswith("q"):                      # "q7200-3600-1200" -> 7200,3600,1200
-            nums = p[1:].split("-")
-            if len(nums) == 3:
-                meta["quantum0"] = int(nums[0])
-                meta["quantum1"] = int(nums[1])
-                meta["quantum2"] = int(nums[2])
-        elif p.startswith("con"):
-            meta["concurrency"] = int(p[3:])
-
-    return meta
-
 ''' compute moments for a flow length group
     e.g., compute the mean, std, skew, kurt of short flows in xyz scenario
 '''
-def compute_moments(class_name, group):
-    bytes_vals = group["bytes"].values.astype(float)
-    sct_vals = group["sct_ms"].values.astype(float)
-    valid_mask = sct_vals > 0
-    bytes_vals = bytes_vals[valid_mask]
-    sct_vals = sct_vals[valid_mask]
-    throughput = bytes_vals / sct_vals
+def compute_moments(class_name, throughput):
     n = len(throughput)
 
     if n == 0:
@@ -91,22 +67,15 @@ def compute_moments(class_name, group):
     })
 
 '''box plot for stream completion time'''
-def plot_sct_boxplot(df, meta, log_y=True):
-
-    df_plot = df[df["sct_ms"] > 0].copy()
-    df_plot["fct_ms"] = df_plot["sct_ms"].astype(float)
+def draw_sct_boxplot(fig, view, meta, log_y=True):
 
-    # prepare data for each class
-    classes = sorted(df_plot["class"].unique())
-    data_by_class = [
-        df_plot[df_plot["class"] == c]["fct_ms"].values for c in classes
-    ]
+    # box statistics for each class come straight from the sorted view
+    stats = view.box_stats("sct_ms")
 
     # plot
-    fig, ax = plt.subplots(figsize=(10, 6))
-    bp = ax.boxplot(
-        data_by_class,
-        labels=classes,
+    ax = fig.subplots()
+    bp = ax.bxp(
+        stats,
         patch_artist=True,
         showfliers=False
     )
@@ -134,62 +103,84 @@ def plot_sct_boxplot(df, meta, log_y=True):
     if log_y:
         ax.set_yscale("log")
 
-    plt.tight_layout()
-    os.makedirs("./results/plots", exist_ok=True)
-    out_path = f"./results/plots/{meta['file']}_sct_boxplot.png"
-    plt.savefig(out_path, dpi=150, bbox_inches="tight")
-    print(f"  Saved SCT boxplot to {out_path}")
-    plt.close()
+def plot_sct_boxplot(view, meta, log_y=True, force=False):
+    path, drawn = render.render(partial(draw_sct_boxplot, log_y=log_y), view, meta,
+                                "sct_boxplot", (10, 6), params={"log_y": log_y}, force=force)
+    report_plot("SCT boxplot", path, drawn)
 
 '''
 get stream completion time by class (stream length) for one scenario
 '''
-def print_sct_stats(df):
+def print_sct_stats(view, metric="throughput"):
 
     rows = []
     # get sct across all classes
-    s = compute_moments("full", df)
+    s = compute_moments("full", view.values(metric))
     s["class"] = "full"
     rows.append(s)
     # get sct by class
-    for class_name, group in df.groupby("class"):
-        s = compute_moments(class_name, group)
+    for class_name in view.classes:
+        s = compute_moments(class_name, view.values(metric, class_name))
         s["class"] = class_name
         rows.append(s)
     results = pd.DataFrame(rows)
+    if metric != "throughput":
+        print(f"  {METRIC_LABELS[metric]}")
     print(results)
 
 '''
 get best quantum for eahc scenario
+score = w_mean * mean_short + w_p99 * p99_short, averaged over the replicates
+of every quantum; path is a directory of drr logs (e.g. from quantum_search.py)
+returns {(scenario, delay, bw, qlen, con): (best quantum, score)}
 '''
-def get_best_quantum(path):
-    pass
+def get_best_quantum(path, w_mean=1.0, w_p99=1.0):
+    scores = {}
+    for fname in sorted(os.listdir(path)):
+        if not fname.endswith(".csv"):
+            continue
+        meta = parse_filename(fname)
+        if meta.get("scheduler") != "drr" or meta.get("quantum0") is None:
+            continue
+        df = pd.read_csv(os.path.join(path, fname))
+        if "class" not in df:
+            continue
+        sct = df.loc[(df["class"] == "short") & (df["sct_ms"] > 0), "sct_ms"].to_numpy()
+        if len(sct) == 0:
+            continue
+        point = (meta["scenario"], meta["delay_ms"], meta["bandwidth_mbps"],
+                 meta["queue_pkts"], meta["concurrency"])
+        quantum = (meta["quantum0"], meta["quantum1"], meta["quantum2"])
+        score = w_mean * sct.mean() + w_p99 * np.percentile(sct, 99)
+        scores.setdefault(point, {}).setdefault(quantum, []).append(score)
+
+    best = {}
+    for point, by_quantum in scores.items():
+        quantum, reps = min(by_quantum.items(), key=lambda kv: np.mean(kv[1]))
+        best[point] = (quantum, float(np.mean(reps)))
+        print(f"{point}: best quantum {quantum}, score {best[point][1]:.1f} "
+              f"({len(by_quantum)} quanta compared)")
+    return best
 
 '''
 for plotting
 '''
-def plot_throughput_boxplot(df, meta):
+def draw_throughput_boxplot(fig, view, meta, metric="throughput"):
     """
-    Create box plot of throughput by class for a given scenario
+    Create box plot of throughput (or another metric) by class for a given scenario
     WITHOUT showing outlier points
     """
-    # Calculate throughput for each flow
-    bytes_vals = df["bytes"].values.astype(float)
-    sct_vals = df["sct_ms"].values.astype(float)
-    valid_mask = sct_vals > 0
-    
-    df_plot = df[valid_mask].copy()
-    df_plot["throughput"] = df_plot["bytes"].astype(float) / df_plot["sct_ms"].astype(float)
+    # Create axes
+    ax = fig.subplots()
     
-    # Create figure
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    # Get unique classes and create box plot WITHOUT outliers
-    classes = sorted(df_plot["class"].unique())
-    data_by_class = [df_plot[df_plot["class"] == c]["throughput"].values for c in classes]
+    # Box statistics per class are precomputed by the view
+    stats = view.box_stats(metric)
+    if not stats:
+        print(f"  No valid {metric} data for box plot")
+        return False
     
     # showfliers=False removes the outlier points
-    bp = ax.boxplot(data_by_class, labels=classes, patch_artist=True, showfliers=False)
+    bp = ax.bxp(stats, patch_artist=True, showfliers=False)
     
     # Customize colors
     for patch in bp['boxes']:
@@ -207,58 +198,70 @@ def plot_throughput_boxplot(df, meta):
     
     ax.set_title("\n".join(title_parts), fontsize=12)
     ax.set_xlabel("Flow Class", fontsize=11)
-    ax.set_ylabel("Throughput (bytes/ms)", fontsize=11)
+    ax.set_ylabel(METRIC_LABELS[metric], fontsize=11)
     ax.grid(True, alpha=0.3, axis='y')
-    
-    plt.tight_layout()
-    
-    # Save figure
-    os.makedirs("./results/plots", exist_ok=True)
-    output_path = f"./results/plots/{meta['file']}_boxplot.png"
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
-    print(f"  Saved plot to {output_path}")
-    plt.close()
 
-def plot_throughput_timeseries(df, meta):
+def metric_suffix(suffix, metric):
+    """throughput plots keep their original file names"""
+    return suffix if metric == "throughput" else f"{suffix}_{metric}"
+
+def plot_throughput_boxplot(view, meta, metric="throughput", force=False):
+    path, drawn = render.render(partial(draw_throughput_boxplot, metric=metric), view, meta,
+                                metric_suffix("boxplot", metric), (10, 6), force=force)
+    report_plot("plot", path, drawn)
+
+def draw_throughput_timeseries(fig, view, meta, density=None, metric="throughput"):
     """
-    Create time series plot of throughput over time for each class
+    Create time series plot of throughput (or another metric) over time for each class
     Removes outliers from visualization using IQR method
+    density draws a rasterized point density instead of one marker per
+    stream (None: when there are more than DENSITY_MIN_ROWS streams)
     """
-    # Calculate throughput for each flow
-    bytes_vals = df["bytes"].values.astype(float)
-    sct_vals = df["sct_ms"].values.astype(float)
-    time_vals = df["time_ms"].values.astype(float)
-    valid_mask = sct_vals > 0
+    time_vals = view.columns["time_ms"]
+    throughput = view.columns[metric]
+    valid = view.valid["sct_ms"] & ~np.isnan(throughput)
     
-    df_plot = df[valid_mask].copy()
-    df_plot["throughput"] = df_plot["bytes"].astype(float) / df_plot["sct_ms"].astype(float)
-    
-    # Create figure
-    fig, ax = plt.subplots(figsize=(12, 6))
+    # Create axes
+    ax = fig.subplots()
     
     # Plot each class with different colors
-    classes = sorted(df_plot["class"].unique())
     colors = {'short': '#FF6B6B', 'medium': '#4ECDC4', 'long': '#45B7D1'}
     
-    for class_name in classes:
-        class_data = df_plot[df_plot["class"] == class_name].sort_values("time_ms").copy()
+    points = {}
+    for class_name in view.classes:
+        rows = view.rows(class_name)
+        rows = rows[valid[rows]]
+        if len(rows) == 0:
+            continue
         
         # Remove outliers using IQR method for plotting only
-        Q1 = class_data["throughput"].quantile(0.25)
-        Q3 = class_data["throughput"].quantile(0.75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
+        lower_bound, upper_bound = view.iqr_bounds(metric, class_name)
         
         # Filter out outliers for plotting only
-        class_data_filtered = class_data[
-            (class_data["throughput"] >= lower_bound) & 
-            (class_data["throughput"] <= upper_bound)
-        ]
-        
-        color = colors.get(class_name, '#95A5A6')
-        ax.scatter(class_data_filtered["time_ms"], class_data_filtered["throughput"], 
-                  label=class_name, alpha=0.6, s=20, color=color)
+        keep = (throughput[rows] >= lower_bound) & (throughput[rows] <= upper_bound)
+        points[class_name] = rows[keep]
+    
+    if density is None:
+        density = sum(len(r) for r in points.values()) > DENSITY_MIN_ROWS
+    
+    if density and points:
+        # one histogram image per class: render cost scales with pixels, not rows
+        every = np.concatenate(list(points.values()))
+        x0, x1 = time_vals[every].min(), time_vals[every].max()
+        y0, y1 = throughput[every].min(), throughput[every].max()
+        extent = ((x0, x1 if x1 > x0 else x0 + 1), (y0, y1 if y1 > y0 else y0 + 1))
+        for class_name, rows in points.items():
+            color = colors.get(class_name, '#95A5A6')
+            img = density_image(time_vals[rows], throughput[rows], DENSITY_BINS, extent,
+                                to_rgba(color))
+            ax.imshow(img, extent=(*extent[0], *extent[1]), origin="lower",
+                      aspect="auto", interpolation="nearest")
+            ax.scatter([], [], label=class_name, s=20, color=color)
+    else:
+        for class_name, rows in points.items():
+            color = colors.get(class_name, '#95A5A6')
+            ax.scatter(time_vals[rows], throughput[rows], 
+                      label=class_name, alpha=0.6, s=20, color=color)
     
     # Labels and title
     title_parts = []
@@ -271,40 +274,73 @@ def plot_throughput_timeseries(df, meta):
     
     ax.set_title("\n".join(title_parts), fontsize=12)
     ax.set_xlabel("Time (ms)", fontsize=11)
-    ax.set_ylabel("Throughput (bytes/ms)", fontsize=11)
+    ax.set_ylabel(METRIC_LABELS[metric], fontsize=11)
     ax.legend(loc='best')
     ax.grid(True, alpha=0.3)
+
+def plot_throughput_timeseries(view, meta, density=None, metric="throughput", force=False):
+    path, drawn = render.render(partial(draw_throughput_timeseries, density=density, metric=metric),
+                                view, meta, metric_suffix("timeseries", metric), (12, 6),
+                                params={"density": density}, force=force)
+    report_plot("time series plot", path, drawn)
+
+def draw_goodput_timeseries(fig, view, meta):
+    """
+    Per-class goodput, mean open streams and rolling p99 SCT per time window
+    """
+    series = binned_series(view)
+    if series is None:
+        print(f"  No valid sct_ms data for goodput plot")
+        return False
     
-    plt.tight_layout()
+    colors = {'short': '#FF6B6B', 'medium': '#4ECDC4', 'long': '#45B7D1'}
+    axes = fig.subplots(3, 1, sharex=True)
+    t = series["t"] / 1000
+    for i, class_name in enumerate(series["classes"]):
+        color = colors.get(class_name, '#95A5A6')
+        axes[0].step(t, series["goodput"][i], where="post", color=color, label=class_name)
+        axes[1].step(t, series["active"][i], where="post", color=color)
+        axes[2].step(t, series["p99_sct"][i], where="post", color=color)
+    
+    axes[0].set_ylabel("Goodput (bytes/ms)", fontsize=11)
+    axes[1].set_ylabel("Open streams", fontsize=11)
+    axes[2].set_ylabel(f"p99 SCT (ms)\nlast {ROLLING_WINDOWS} windows", fontsize=11)
+    axes[2].set_yscale("log")
+    axes[2].set_xlabel(f"Time since first stream (s), {series['window_ms']:.0f} ms windows", fontsize=11)
+    axes[0].legend(loc='best')
+    for ax in axes:
+        ax.grid(True, alpha=0.3)
     
-    # Save figure
-    os.makedirs("./results/plots", exist_ok=True)
-    output_path = f"./results/plots/{meta['file']}_timeseries.png"
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
-    print(f"  Saved time series plot to {output_path}")
-    plt.close()
+    title_parts = []
+    if meta["scenario"]:
+        title_parts.append(f"Scenario: {meta['scenario']}")
+    if meta["scheduler"]:
+        title_parts.append(f"Scheduler: {meta['scheduler']}")
+    if meta["quantum0"] is not None:
+        title_parts.append(f"Quantum: {meta['quantum0']}-{meta['quantum1']}-{meta['quantum2']}")
+    title_parts.append("Goodput over Time by Class")
+    axes[0].set_title("\n".join(title_parts), fontsize=12)
+
+def plot_goodput_timeseries(view, meta, force=False):
+    path, drawn = render.render(draw_goodput_timeseries, view, meta, "goodput", (12, 9), force=force)
+    report_plot("goodput plot", path, drawn)
 
-def plot_e2e_bar(df, meta):
+def draw_e2e_bar(fig, view, meta):
     """
     Create bar graph showing mean e2e_ms for each class
     """
-    # Filter valid e2e_ms values
-    df_plot = df[df["e2e_ms"] > 0].copy()
+    # Only classes with valid (> 0) e2e_ms values
+    classes = [c for c in view.classes if len(view.values("e2e_ms", c)) > 0]
     
-    if len(df_plot) == 0:
+    if not classes:
         print(f"  No valid e2e_ms data for bar plot")
-        return
+        return False
     
     # Calculate mean e2e_ms by class
-    classes = sorted(df_plot["class"].unique())
-    means = []
+    means = [view.values("e2e_ms", c).mean() for c in classes]
     
-    for class_name in classes:
-        class_data = df_plot[df_plot["class"] == class_name]["e2e_ms"].astype(float)
-        means.append(class_data.mean())
-    
-    # Create figure
-    fig, ax = plt.subplots(figsize=(10, 6))
+    # Create axes
+    ax = fig.subplots()
     
     # Define colors for each class
     colors_map = {'short': '#FF6B6B', 'medium': '#4ECDC4', 'long': '#45B7D1'}
@@ -334,61 +370,42 @@ def plot_e2e_bar(df, meta):
     ax.set_xlabel("Flow Class", fontsize=11)
     ax.set_ylabel("Mean E2E Time (ms)", fontsize=11)
     ax.grid(True, alpha=0.3, axis='y')
-    
-    plt.tight_layout()
-    
-    # Save figure
-    os.makedirs("./results/plots", exist_ok=True)
-    output_path = f"./results/plots/{meta['file']}_e2e_bar.png"
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
-    print(f"  Saved E2E bar plot to {output_path}")
-    plt.close()
 
-def plot_throughput_ridgeline(df, meta):
+def plot_e2e_bar(view, meta, force=False):
+    path, drawn = render.render(draw_e2e_bar, view, meta, "e2e_bar", (10, 6), force=force)
+    report_plot("E2E bar plot", path, drawn)
+
+def ridgeline_data(view, metric="throughput"):
+    """
+    throughput (or another metric) of each class inside the IQR fences, for
+    the classes with enough distinct values for a KDE
+    """
+    class_data_dict = {}
+    for class_name in view.classes:
+        # Sorted values inside the IQR fences
+        class_data_filtered = view.within_iqr(metric, class_name)
+        
+        # Need at least 2 distinct points for KDE (values are sorted)
+        if len(class_data_filtered) > 1 and class_data_filtered[-1] > class_data_filtered[0]:
+            class_data_dict[class_name] = class_data_filtered
+    return class_data_dict
+
+def draw_throughput_ridgeline(fig, view, meta, metric="throughput"):
     """
-    Create ridgeline plot showing throughput distributions for each class
+    Create ridgeline plot showing throughput (or another metric) distributions for each class
     Removes outliers using IQR method
     """
-    # Calculate throughput for each flow
-    bytes_vals = df["bytes"].values.astype(float)
-    sct_vals = df["sct_ms"].values.astype(float)
-    valid_mask = sct_vals > 0
-    
-    df_plot = df[valid_mask].copy()
-    df_plot["throughput"] = df_plot["bytes"].astype(float) / df_plot["sct_ms"].astype(float)
-    
-    # Get unique classes
-    classes = sorted(df_plot["class"].unique())
     colors = {'short': '#FF6B6B', 'medium': '#4ECDC4', 'long': '#45B7D1'}
     
     # Prepare data for each class (with outliers removed)
-    class_data_dict = {}
-    for class_name in classes:
-        class_data = df_plot[df_plot["class"] == class_name]["throughput"].values
-        
-        # Remove outliers using IQR method
-        Q1 = np.percentile(class_data, 25)
-        Q3 = np.percentile(class_data, 75)
-        IQR = Q3 - Q1
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-        
-        # Filter out outliers
-        class_data_filtered = class_data[
-            (class_data >= lower_bound) & 
-            (class_data <= upper_bound)
-        ]
-        
-        if len(class_data_filtered) > 1:  # Need at least 2 points for KDE
-            class_data_dict[class_name] = class_data_filtered
+    class_data_dict = ridgeline_data(view, metric)
     
     if not class_data_dict:
         print(f"  Not enough data for ridgeline plot")
-        return
+        return False
     
-    # Create figure
-    fig, axes = plt.subplots(len(class_data_dict), 1, figsize=(12, 2 * len(class_data_dict)), 
-                             sharex=True)
+    # Create axes
+    axes = fig.subplots(len(class_data_dict), 1, sharex=True)
     
     # Handle single class case
     if len(class_data_dict) == 1:
@@ -399,13 +416,14 @@ def plot_throughput_ridgeline(df, meta):
     x_min, x_max = all_data.min(), all_data.max()
     x_range = np.linspace(x_min, x_max, 1000)
     
+    # Evaluate all class densities in one batched binned KDE
+    densities = binned_kde(list(class_data_dict.values()), x_range)
+    
     # Plot each class
     for idx, (class_name, class_data) in enumerate(class_data_dict.items()):
         ax = axes[idx]
         
-        # Create KDE
-        kde = gaussian_kde(class_data)
-        density = kde(x_range)
+        density = densities[idx]
         
         # Fill the density curve
         color = colors.get(class_name, '#95A5A6')
@@ -426,7 +444,7 @@ def plot_throughput_ridgeline(df, meta):
             ax.set_xticks([])
     
     # Set xlabel only on bottom plot
-    axes[-1].set_xlabel("Throughput (bytes/ms)", fontsize=11)
+    axes[-1].set_xlabel(METRIC_LABELS[metric], fontsize=11)
     
     # Add title
     title_parts = []
@@ -436,44 +454,231 @@ def plot_throughput_ridgeline(df, meta):
         title_parts.append(f"Scheduler: {meta['scheduler']}")
     if meta["quantum0"] is not None:
         title_parts.append(f"Quantum: {meta['quantum0']}-{meta['quantum1']}-{meta['quantum2']}")
-    title_parts.append("Throughput Distribution by Class")
+    title_parts.append(f"{METRIC_LABELS[metric].split(' (')[0]} Distribution by Class")
     
     fig.suptitle("\n".join(title_parts), fontsize=12, y=0.98)
-    
-    plt.tight_layout()
-    
-    # Save figure
-    os.makedirs("./results/plots", exist_ok=True)
-    output_path = f"./results/plots/{meta['file']}_ridgeline.png"
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
-    print(f"  Saved ridgeline plot to {output_path}")
-    plt.close()
+
+def plot_throughput_ridgeline(view, meta, metric="throughput", force=False):
+    figsize = (12, 2 * max(len(ridgeline_data(view, metric)), 1))
+    path, drawn = render.render(partial(draw_throughput_ridgeline, metric=metric), view, meta,
+                                metric_suffix("ridgeline", metric), figsize, force=force)
+    report_plot("ridgeline plot", path, drawn)
+
+# the six views of an experiment, in contact sheet order, and whether they take a metric
+PANELS = [
+    ("Throughput boxplot", draw_throughput_boxplot, True),
+    ("Throughput ridgeline", draw_throughput_ridgeline, True),
+    ("Throughput over time", draw_throughput_timeseries, True),
+    ("SCT boxplot", draw_sct_boxplot, False),
+    ("Mean E2E time", draw_e2e_bar, False),
+    ("Goodput over time", draw_goodput_timeseries, False),
+]
+
+def draw_contact_sheet(fig, view, meta, metric="throughput"):
+    """
+    All six views of an experiment as panels of one figure
+    """
+    fig.set_layout_engine("constrained")
+    panels = fig.subfigures(2, 3).ravel()
+    for panel, (title, draw, by_metric) in zip(panels, PANELS):
+        if by_metric:
+            drawn = draw(panel, view, meta, metric=metric)
+        else:
+            drawn = draw(panel, view, meta)
+        if drawn is False:
+            panel.text(0.5, 0.5, f"{title}: no data", ha="center", va="center")
+    fig.suptitle(meta["file"], fontsize=14)
+
+def plot_contact_sheet(view, meta, metric="throughput", force=False):
+    path, drawn = render.render(partial(draw_contact_sheet, metric=metric), view, meta,
+                                metric_suffix("sheet", metric), (32, 13), force=force)
+    report_plot("contact sheet", path, drawn)
+
+def report_plot(what, path, drawn):
+    if path is None:
+        return
+    if drawn:
+        print(f"  Saved {what} to {path}")
+    else:
+        print(f"  {what} {path} is up to date")
+
+def write_summary(sources=None, chunked_read=False):
+    """
+    Ingest all logs into the cache and write one summary row per
+    (experiment, class) to OUT_SUMMARY
+    With chunked_read the logs are streamed in bounded memory instead
+    (sketched percentiles, see chunked.py) and the cache is not touched
+    """
+    if chunked_read:
+        table = chunked.summarize_files(cache.find_sources(sources))
+    else:
+        # the index also has the experiments cached from other sources
+        table = summary.build_summary(cache.select(cache.ingest(sources), sources))
+    os.makedirs(os.path.dirname(OUT_SUMMARY), exist_ok=True)
+    table.to_csv(OUT_SUMMARY, index=False)
+    print(f"Saved summary of {table['file'].nunique()} experiments to {OUT_SUMMARY}")
+
+def analyze_file(path, use_cache=False, force=False, contact_sheet=False, density=None,
+                 metric="throughput", goodput=False):
+    """
+    Run the stats and all plots for one experiment file
+    Output is captured so that parallel workers can be printed in order;
+    returns (captured output, error string or None, timeline spans)
+    With use_cache the columns are memory-mapped from the result cache
+    Plots whose inputs did not change are skipped unless force is set;
+    contact_sheet draws the six views as panels of one figure instead;
+    density forces (True) or disables (False) the rasterized time series;
+    metric is the per-stream value of the stats table, boxplot, ridgeline and
+    time series (throughput, sct_ms or slowdown); goodput adds the goodput
+    time series, which the contact sheet always has
+    """
+    buf = io.StringIO()
+    tracer = Tracer("analysis")
+    try:
+        with contextlib.redirect_stdout(buf), \
+                tracer.span(os.path.basename(path), category="experiment"):
+            print(f"reading file {path}")
+            with tracer.span("parse_filename"):
+                meta = parse_filename(path)
+            with tracer.span("read_csv"):
+                # replayed workloads: classes by the trace's intended sizes
+                # (the cache stores them classed that way)
+                if use_cache:
+                    df = cache.read_log(path)
+                else:
+                    df = workload.apply_trace(pd.read_csv(path, sep=','), path)
+                view = ExperimentView(df, meta)
+            with tracer.span("print_sct_stats"):
+                print_sct_stats(view, metric)
+            if contact_sheet:
+                plots = [partial(plot_contact_sheet, metric=metric)]
+            else:
+                plots = [partial(plot_throughput_boxplot, metric=metric),
+                         partial(plot_throughput_ridgeline, metric=metric),
+                         partial(plot_throughput_timeseries, density=density, metric=metric),
+                         plot_sct_boxplot, plot_e2e_bar]
+                if goodput:
+                    plots.append(plot_goodput_timeseries)
+            for plot in plots:
+                with tracer.span(getattr(plot, "func", plot).__name__):
+                    plot(view, meta, force=force)
+    except Exception as e:
+        return buf.getvalue(), f"{type(e).__name__}: {e}", tracer.events
+    return buf.getvalue(), None, tracer.events
 
 def main():
 
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="number of files to analyse in parallel (0 = one per core)")
+    parser.add_argument("--cache", action="store_true",
+                        help="ingest the log directory into the columnar cache and read from it")
+    parser.add_argument("--log-dir", type=str, default=None,
+                        help=f"directory of the server logs to analyse (default {LOG_DIR}); with "
+                             f"--summary/--compare the only one read (default {' '.join(cache.DEFAULT_SOURCES)})")
+    parser.add_argument("--client-dir", metavar="DIR",
+                        help="join the client logs in DIR with the server logs on stream_id, split "
+                             f"every stream's latency, write {latency.OUT_BREAKDOWN} and exit")
+    parser.add_argument("--summary", action="store_true",
+                        help=f"write the per-class summary of every cached experiment to {OUT_SUMMARY} and exit")
+    parser.add_argument("--chunked", action="store_true",
+                        help="with --summary: stream every log in chunks instead of loading it "
+                             "(bounded memory, percentiles within 1%%)")
+    parser.add_argument("--best-quantum", metavar="DIR",
+                        help="print the best DRR quantum of every grid point among the logs in DIR and exit")
+    parser.add_argument("--compare", metavar="BASELINE", nargs="?", const="rr",
+                        help="compare every scheduler with BASELINE (default rr) on the grid points "
+                             f"they share, write {compare.OUT_COMPARE} and exit")
+    parser.add_argument("--force", "-f", action="store_true",
+                        help="redraw every plot, even if its inputs did not change")
+    parser.add_argument("--contact-sheet", action="store_true",
+                        help="draw the six views of each experiment into one <file>_sheet.png")
+    parser.add_argument("--density", action="store_true", default=None,
+                        help="draw the throughput time series as a rasterized density "
+                             f"(default: only above {DENSITY_MIN_ROWS} streams)")
+    parser.add_argument("--goodput", action="store_true",
+                        help="also draw <file>_goodput.png: per-class goodput, open streams and "
+                             "p99 SCT over time")
+    parser.add_argument("--metric", choices=list(METRIC_LABELS), default=None,
+                        help="per-stream value of the stats table, boxplot, ridgeline and time series "
+                             "(default throughput; with --compare one of "
+                             f"{', '.join(compare.METRICS)}, default sct_ms); "
+                             "slowdown is SCT over the ideal completion time of the stream")
+    parser.add_argument("--trace", metavar="PATH", nargs="?", const=TRACE_PATH, default=None,
+                        help=f"write the Chrome trace of every file and stage to PATH (default {TRACE_PATH})")
+    args = parser.parse_args()
+    sources = [args.log_dir] if args.log_dir else None
+    args.log_dir = args.log_dir or LOG_DIR
+
+    if args.best_quantum:
+        get_best_quantum(args.best_quantum)
+        return
+
+    if args.compare:
+        if args.metric is not None and args.metric not in compare.METRICS:
+            parser.error(f"--compare: --metric must be one of {', '.join(compare.METRICS)}")
+        compare.write_comparison(sources, baseline=args.compare, metric=args.metric or "sct_ms")
+        return
+    args.metric = args.metric or "throughput"
+
+    if args.client_dir:
+        latency.write_breakdown(args.log_dir, args.client_dir)
+        return
+
+    if args.summary:
+        write_summary(sources, chunked_read=args.chunked)
+        return
+
     # get csv files
     files = []
-    for fname in os.listdir(LOG_DIR):
+    for fname in os.listdir(args.log_dir):
         if fname.endswith(".csv"):
-            files.append(os.path.join(LOG_DIR, fname))
+            files.append(os.path.join(args.log_dir, fname))
 
     if not files:
-        print(f"warning: no CSV files found in {LOG_DIR}")
+        print(f"warning: no CSV files found in {args.log_dir}")
         return
 
     files.sort()
-    
-    # process each csv file
-    for f in files:
-        print(f"reading file {f}")
-        meta = parse_filename(f)
-        df = pd.read_csv(f, sep=',')
-        print_sct_stats(df)
-        plot_throughput_boxplot(df, meta)
-        plot_throughput_ridgeline(df, meta)
-        plot_throughput_timeseries(df, meta)
-        plot_sct_boxplot(df, meta)
-        plot_e2e_bar(df, meta)
-    
+
+    tracer = Tracer("analysis")
+    if args.cache:
+        with tracer.span("ingest"):
+            cache.ingest([args.log_dir])
+    worker = partial(analyze_file, use_cache=args.cache, force=args.force,
+                     contact_sheet=args.contact_sheet, density=args.density, metric=args.metric,
+                     goodput=args.goodput)
+
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    jobs = min(jobs, len(files))
+
+    # process each csv file, one per worker; map() keeps the output in file order
+    failed = []
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(worker, files)
+            for f, (out, err, spans) in zip(files, results):
+                print(out, end="")
+                tracer.extend(spans)
+                if err is not None:
+                    print(f"error: failed to analyse {f}: {err}")
+                    failed.append(f)
+    else:
+        for f in files:
+            out, err, spans = worker(f)
+            print(out, end="")
+            tracer.extend(spans)
+            if err is not None:
+                print(f"error: failed to analyse {f}: {err}")
+                failed.append(f)
+
+    if failed:
+        print(f"warning: {len(failed)} of {len(files)} files failed")
+
+    tracer.report()
+    if args.trace:
+        tracer.write(args.trace)
+        print(f"timeline written to {args.trace} (open in chrome://tracing)")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,204 @@
+'''
+grouped and streaming statistics
+
+Values are tagged with an integer group id (e.g. experiment * nclasses + class)
+and every statistic is computed for all groups in one vectorised pass:
+bincount for the moments, one lexsort for the percentiles.
+
+OnlineMoments and QuantileSketch are the streaming counterparts: they fold in
+values batch by batch and merge with each other.
+'''
+import numpy as np
+
+
+def grouped_moments(values, groups, ngroups):
+    '''
+    count, mean, std (ddof=1), skew and excess kurtosis (both bias corrected,
+    as scipy.stats.skew/kurtosis with bias=False) of every group
+    returns a dict of arrays of length ngroups; NaN where undefined
+    '''
+    values = np.asarray(values, dtype=float)
+    groups = np.asarray(groups, dtype=np.int64)
+    n = np.bincount(groups, minlength=ngroups).astype(float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.bincount(groups, weights=values, minlength=ngroups) / n
+        d = values - mean[groups]
+        d2 = d * d
+        m2 = np.bincount(groups, weights=d2, minlength=ngroups) / n
+        m3 = np.bincount(groups, weights=d2 * d, minlength=ngroups) / n
+        m4 = np.bincount(groups, weights=d2 * d2, minlength=ngroups) / n
+
+        std = np.sqrt(m2 * n / (n - 1))
+        g1 = m3 / m2 ** 1.5
+        g2 = m4 / m2 ** 2 - 3.0
+        skew = np.sqrt(n * (n - 1)) / (n - 2) * g1
+        kurt = (n - 1) / ((n - 2) * (n - 3)) * ((n + 1) * g2 + 6.0)
+
+    std[n < 2] = np.nan
+    skew[n < 3] = np.nan
+    kurt[n < 4] = np.nan
+    mean[n < 1] = np.nan
+    return {"count": n.astype(np.int64), "mean": mean, "std": std,
+            "skew": skew, "kurtosis": kurt}
+
+
+def grouped_quantiles(values, groups, ngroups, qs):
+    '''
+    quantiles qs (in [0, 1]) of every group, linear interpolation as np.percentile
+    returns an array of shape (ngroups, len(qs)); NaN rows for empty groups
+    '''
+    values = np.asarray(values, dtype=float)
+    groups = np.asarray(groups, dtype=np.int64)
+    qs = np.asarray(qs, dtype=float)
+
+    order = np.lexsort((values, groups))
+    s = values[order]
+    counts = np.bincount(groups, minlength=ngroups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    out = np.full((ngroups, len(qs)), np.nan)
+    nonempty = counts > 0
+    pos = qs[None, :] * (counts[nonempty, None] - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, counts[nonempty, None] - 1)
+    base = starts[nonempty, None]
+    lo_vals = s[base + lo]
+    out[nonempty] = lo_vals + (s[base + hi] - lo_vals) * (pos - lo)
+    return out
+
+
+class OnlineMoments:
+    '''
+    streaming count/mean/std/skew/kurtosis (Welford, extended to the third and
+    fourth central moments); batches and other accumulators merge exactly
+    (Pebay 2008), so the result matches the one-shot computation
+    '''
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+
+    def add(self, values):
+        '''fold a batch of values into the accumulator'''
+        x = np.asarray(values, dtype=float).ravel()
+        if len(x) == 0:
+            return
+        batch = OnlineMoments()
+        batch.n = len(x)
+        batch.mean = x.mean()
+        d = x - batch.mean
+        d2 = d * d
+        batch.m2 = d2.sum()
+        batch.m3 = (d2 * d).sum()
+        batch.m4 = (d2 * d2).sum()
+        self.merge(batch)
+
+    def merge(self, other):
+        na, nb = self.n, other.n
+        if nb == 0:
+            return
+        if na == 0:
+            self.n, self.mean, self.m2, self.m3, self.m4 = (
+                other.n, other.mean, other.m2, other.m3, other.m4)
+            return
+        n = na + nb
+        delta = other.mean - self.mean
+        d2 = delta * delta
+        m4 = (self.m4 + other.m4
+              + d2 * d2 * na * nb * (na * na - na * nb + nb * nb) / n ** 3
+              + 6 * d2 * (na * na * other.m2 + nb * nb * self.m2) / n ** 2
+              + 4 * delta * (na * other.m3 - nb * self.m3) / n)
+        m3 = (self.m3 + other.m3
+              + d2 * delta * na * nb * (na - nb) / n ** 2
+              + 3 * delta * (na * other.m2 - nb * self.m2) / n)
+        self.m2 = self.m2 + other.m2 + d2 * na * nb / n
+        self.m3, self.m4 = m3, m4
+        self.mean = self.mean + delta * nb / n
+        self.n = n
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+    @property
+    def skew(self):
+        '''bias corrected, as scipy.stats.skew(bias=False)'''
+        n = self.n
+        if n < 3 or self.m2 == 0:
+            return np.nan
+        g1 = np.sqrt(n) * self.m3 / self.m2 ** 1.5
+        return np.sqrt(n * (n - 1)) / (n - 2) * g1
+
+    @property
+    def kurtosis(self):
+        '''bias corrected excess kurtosis, as scipy.stats.kurtosis(bias=False)'''
+        n = self.n
+        if n < 4 or self.m2 == 0:
+            return np.nan
+        g2 = n * self.m4 / self.m2 ** 2 - 3.0
+        return (n - 1) / ((n - 2) * (n - 3)) * ((n + 1) * g2 + 6.0)
+
+
+class QuantileSketch:
+    '''
+    mergeable quantile sketch with relative accuracy `alpha` for positive values
+    (logarithmic buckets as in DDSketch): every quantile is returned within
+    alpha * value of the exact order statistic, in memory that grows with
+    log(max/min) rather than with the number of values
+    '''
+
+    def __init__(self, alpha=0.01):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = np.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.n = 0
+
+    def add(self, values):
+        x = np.asarray(values, dtype=float).ravel()
+        x = x[~np.isnan(x)]
+        if len(x) == 0:
+            return
+        pos = x[x > 0]
+        self.zeros += len(x) - len(pos)
+        keys, counts = np.unique(np.ceil(np.log(pos) / self._log_gamma).astype(np.int64),
+                                 return_counts=True)
+        for k, c in zip(keys.tolist(), counts.tolist()):
+            self.buckets[k] = self.buckets.get(k, 0) + c
+        self.n += len(x)
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for k, c in other.buckets.items():
+            self.buckets[k] = self.buckets.get(k, 0) + c
+        self.zeros += other.zeros
+        self.n += other.n
+
+    def quantile(self, q):
+        '''
+        value at quantile q in [0, 1], NaN if empty; interpolates linearly
+        between the two neighbouring order statistics, as np.percentile
+        '''
+        if self.n == 0:
+            return np.nan
+        rank = q * (self.n - 1)
+        lo = int(np.floor(rank))
+        hi = min(lo + 1, self.n - 1)
+        keys = np.array(sorted(self.buckets))
+        cum = np.cumsum([self.buckets[k] for k in keys]) + self.zeros
+
+        def order_statistic(r):
+            if r < self.zeros:
+                return 0.0
+            k = keys[np.searchsorted(cum, r, side="right")]
+            # bucket k holds (gamma^(k-1), gamma^k]; its midpoint in relative terms
+            return 2 * self.gamma ** k / (self.gamma + 1)
+
+        v_lo = order_statistic(lo)
+        return v_lo + (order_statistic(hi) - v_lo) * (rank - lo)
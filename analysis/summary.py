@@ -0,0 +1,107 @@
+'''
+cross-experiment summary table
+
+One row per (experiment, class), plus a "full" row per experiment, with the
+moments and tail percentiles of sct_ms, e2e_ms and slowdown (sct_ms over the
+ideal completion time, see experiments.ideal_fct_ms), joined to the metadata
+parsed from the file name. All experiments are stacked and every statistic is
+computed in one grouped pass (see stats.py).
+'''
+import numpy as np
+import pandas as pd
+
+import cache
+from experiments import META_FIELDS, slowdown
+from stats import grouped_moments, grouped_quantiles
+
+# percentile columns: name suffix -> quantile
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99, "p999": 0.999}
+MOMENTS = ["count", "mean", "std", "skew", "kurtosis"]
+SUMMARY_METRICS = ["sct_ms", "e2e_ms", "slowdown"]
+# columns derived from the logged ones and the file name metadata
+DERIVED = {"slowdown": ["sct_ms", "bytes"]}
+
+
+def stack_experiments(index, columns, cache_dir=cache.CACHE_DIR):
+    '''
+    concatenate the given numeric columns of every indexed experiment
+    (slowdown is computed from sct_ms, bytes and the delay/bandwidth of the index)
+    returns (dict of stacked arrays, experiment position of each row,
+             global class code of each row, list of class names)
+    '''
+    logged = []
+    for c in columns:
+        for src in DERIVED.get(c, [c]):
+            if src not in logged:
+                logged.append(src)
+    arrays = {c: [] for c in logged}
+    exp_pos, class_codes = [], []
+    classes = []
+    for i, eid in enumerate(index["id"]):
+        cols = cache.load_columns(eid, logged + ["class"], cache_dir)
+        local = cache.load_categories(eid, cache_dir)["class"]
+        for c in local:
+            if c not in classes:
+                classes.append(c)
+        # map this file's category codes onto the global class list (-1 stays -1)
+        remap = np.array([classes.index(c) for c in local] + [-1], dtype=np.int64)
+        class_codes.append(remap[np.asarray(cols["class"], dtype=np.int64)])
+        exp_pos.append(np.full(len(cols["class"]), i, dtype=np.int64))
+        for c in logged:
+            arrays[c].append(np.asarray(cols[c], dtype=float))
+
+    def cat(parts, dtype):
+        return np.concatenate(parts) if parts else np.array([], dtype=dtype)
+
+    stacked = {c: cat(arrays[c], float) for c in logged}
+    exp_pos = cat(exp_pos, np.int64)
+    if "slowdown" in columns:
+        delay = index["delay_ms"].to_numpy(dtype=float, na_value=np.nan)
+        bw = index["bandwidth_mbps"].to_numpy(dtype=float, na_value=np.nan)
+        stacked["slowdown"] = slowdown(stacked["sct_ms"], stacked["bytes"],
+                                       delay[exp_pos], bw[exp_pos])
+    stacked = {c: stacked[c] for c in columns}
+    return stacked, exp_pos, cat(class_codes, np.int64), classes
+
+
+def summary_columns(metrics=SUMMARY_METRICS):
+    '''columns of the summary table, in order'''
+    stats = MOMENTS + list(PERCENTILES)
+    return ["file"] + META_FIELDS + ["class"] + [f"{m}_{s}" for m in metrics for s in stats]
+
+
+def build_summary(index, cache_dir=cache.CACHE_DIR, metrics=SUMMARY_METRICS):
+    '''summary table of every experiment in the cache index'''
+    index = index.reset_index(drop=True)
+    stacked, exp_pos, codes, classes = stack_experiments(index, list(metrics), cache_dir)
+
+    # group slots per experiment: one per class, and a last one for "full"
+    slots = len(classes) + 1
+    ngroups = len(index) * slots
+    by_class = codes >= 0
+    groups = np.concatenate([
+        exp_pos[by_class] * slots + codes[by_class],
+        exp_pos * slots + len(classes),
+    ])
+
+    table = pd.DataFrame({
+        "exp": np.repeat(np.arange(len(index)), slots),
+        "class": np.tile(classes + ["full"], len(index)),
+    })
+    present = np.zeros(ngroups, dtype=bool)
+    for m in metrics:
+        vals = np.concatenate([stacked[m][by_class], stacked[m]])
+        ok = vals > 0
+        mom = grouped_moments(vals[ok], groups[ok], ngroups)
+        qs = grouped_quantiles(vals[ok], groups[ok], ngroups, list(PERCENTILES.values()))
+        for name in MOMENTS:
+            table[f"{m}_{name}"] = mom[name]
+        for j, name in enumerate(PERCENTILES):
+            table[f"{m}_{name}"] = qs[:, j]
+        present |= mom["count"] > 0
+
+    meta = index[["file"] + META_FIELDS]
+    table = table[present].merge(meta, left_on="exp", right_index=True)
+    table = table[["file"] + META_FIELDS + ["class"]
+                  + [c for c in table.columns if c.startswith(tuple(metrics))]]
+    return table.sort_values(["file", "class"]).reset_index(drop=True)
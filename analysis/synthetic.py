@@ -0,0 +1,90 @@
+'''
+synthetic server logs for benchmarking the analysis pipeline
+
+Writes CSVs in the server schema (experiments.LOG_COLUMNS) with the class mix,
+flow sizes and SCT/e2e spread of the threePoints runs in ../data: 90% short
+flows, SCT lognormal per class, e2e a little above SCT. Rows are generated and
+written in chunks, so 10^7-row files need no more memory than 10^6-row ones.
+
+usage (from analysis/):
+    python3 synthetic.py --rows 1000000 --out ./results/bench/data/n1000000
+'''
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+from experiments import LOG_COLUMNS
+
+# class -> (share of flows, bytes, median sct_ms, sigma of log sct_ms), fitted to ../data
+CLASS_MIX = {
+    "short": (0.90, 51200, 660.0, 0.6),
+    "medium": (0.05, 575488, 8500.0, 0.5),
+    "long": (0.05, 1521664, 22700.0, 0.35),
+}
+# e2e_ms - sct_ms is lognormal around this median (ms)
+E2E_EXTRA_MS = 45.0
+START_MS = 1765685275000
+# stream completions per millisecond of log time
+COMPLETIONS_PER_MS = 0.1
+CHUNK_ROWS = 1_000_000
+
+
+def generate(nrows, rng, scheduler="wfq", first_row=0):
+    '''one DataFrame of nrows synthetic log rows, numbered from first_row'''
+    names = list(CLASS_MIX)
+    shares = np.array([CLASS_MIX[c][0] for c in names])
+    codes = rng.choice(len(names), size=nrows, p=shares / shares.sum())
+    size = np.array([CLASS_MIX[c][1] for c in names])[codes]
+    median = np.array([CLASS_MIX[c][2] for c in names])[codes]
+    sigma = np.array([CLASS_MIX[c][3] for c in names])[codes]
+
+    sct = median * np.exp(sigma * rng.standard_normal(nrows))
+    e2e = sct + E2E_EXTRA_MS * np.exp(0.5 * rng.standard_normal(nrows))
+    rows = np.arange(first_row, first_row + nrows)
+    return pd.DataFrame({
+        "time_ms": START_MS + (rows / COMPLETIONS_PER_MS).astype(np.int64),
+        "stream_id": 4 * rows,
+        "bytes": size,
+        "sct_ms": np.round(sct, 2),
+        "e2e_ms": np.round(e2e, 2),
+        "class": np.array(names)[codes],
+        "scheduler": scheduler,
+    })[LOG_COLUMNS]
+
+
+def write_log(path, nrows, seed=0, scheduler="wfq", chunk_rows=CHUNK_ROWS):
+    '''write an nrows synthetic server log to path, chunk by chunk'''
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="") as fp:
+        for start in range(0, nrows, chunk_rows):
+            n = min(chunk_rows, nrows - start)
+            generate(n, rng, scheduler, start).to_csv(fp, index=False, header=(start == 0))
+    os.replace(tmp, path)
+    return path
+
+
+def log_name(scheduler="wfq"):
+    '''file name of a synthetic log, parseable by experiments.parse_filename'''
+    quantum = "_q3600-2400-1200" if scheduler == "drr" else ""
+    return f"sc-simple-p2p_d20_bw8_ql20_sch-{scheduler}{quantum}_con10.csv"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="write a synthetic server log")
+    parser.add_argument("--rows", "-n", type=float, default=1e5, help="number of rows (1e3 .. 1e7)")
+    parser.add_argument("--out", "-o", type=str, default="./results/bench/data",
+                        help="output directory")
+    parser.add_argument("--sched", "-s", type=str, default="wfq")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = write_log(os.path.join(args.out, log_name(args.sched)), int(args.rows),
+                     args.seed, args.sched)
+    print(f"wrote {int(args.rows)} rows to {path}")
+
+
+if __name__ == "__main__":
+    main()
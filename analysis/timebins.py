@@ -0,0 +1,120 @@
+'''
+time-binned aggregates of one experiment
+
+Instead of one marker per stream, the log is summarised per class on a grid
+of fixed windows:
+
+    goodput   bytes delivered per ms, each stream's bytes spread evenly over
+              its lifetime (open = time_ms - e2e_ms, or - sct_ms)
+    active    mean number of open streams
+    p99 SCT   of the streams completing in the last ROLLING_WINDOWS windows
+
+Goodput and active streams are the per-window increments of piecewise-linear
+cumulative sums, evaluated at all window edges with one sort and searchsorted;
+the p99 comes from one grouped lexsort (stats.grouped_quantiles). The cost is
+O(n log n + windows), whatever the number of streams.
+'''
+import numpy as np
+
+from stats import grouped_quantiles
+
+DEFAULT_WINDOWS = 200
+ROLLING_WINDOWS = 5
+
+
+def ramp_integral(starts, ends, weights, edges):
+    '''
+    sum over streams of weight * (time the stream spent in [edges[0], t]) / its
+    duration, for every t in edges; zero-length streams count at their end
+    '''
+    dur = ends - starts
+    slope = np.where(dur > 0, weights / np.where(dur > 0, dur, 1), 0.0)
+    # each stream adds `slope` from its start and removes it at its end
+    points = np.concatenate([starts, ends])
+    slopes = np.concatenate([slope, -slope])
+    order = np.argsort(points, kind="stable")
+    points, slopes = points[order], slopes[order]
+    cum_slope = np.concatenate([[0.0], np.cumsum(slopes)])
+    cum_offset = np.concatenate([[0.0], np.cumsum(slopes * points)])
+    k = np.searchsorted(points, edges, side="right")
+    total = cum_slope[k] * edges - cum_offset[k]
+    # instantaneous streams: a step at their end
+    instant = dur <= 0
+    if instant.any():
+        steps = np.sort(ends[instant])
+        cum_w = np.concatenate([[0.0], np.cumsum(weights[instant][np.argsort(ends[instant])])])
+        total += cum_w[np.searchsorted(steps, edges, side="right")]
+    return total
+
+
+def binned_series(view, window_ms=None, windows=DEFAULT_WINDOWS, rolling=ROLLING_WINDOWS):
+    '''
+    per-class time series on a regular window grid
+    returns dict: t (window start, ms since the first stream opened), window_ms,
+    classes, and (len(classes), nwindows) arrays goodput (bytes/ms), active, p99_sct
+    '''
+    cols = view.columns
+    valid = view.valid["sct_ms"]
+    end = cols["time_ms"]
+    life = np.where(view.valid["e2e_ms"], cols["e2e_ms"], cols["sct_ms"])
+    start = end - life
+
+    rows = np.flatnonzero(valid)
+    if len(rows) == 0:
+        return None
+    t0 = start[rows].min()
+    span = end[rows].max() - t0
+    if window_ms is None:
+        window_ms = max(span / windows, 1.0)
+    nwin = max(int(np.ceil(span / window_ms)), 1)
+    # relative times: epoch ms would cancel catastrophically in ramp_integral
+    edges = np.arange(nwin + 1) * window_ms
+    start, end = start - t0, end - t0
+
+    goodput = np.zeros((len(view.classes), nwin))
+    active = np.zeros((len(view.classes), nwin))
+    for i, c in enumerate(view.classes):
+        r = view.rows(c)
+        r = r[valid[r]]
+        if len(r) == 0:
+            continue
+        s, e = start[r], end[r]
+        goodput[i] = np.diff(ramp_integral(s, e, cols["bytes"][r], edges)) / window_ms
+        active[i] = np.diff(ramp_integral(s, e, e - s, edges)) / window_ms
+
+    # rolling p99: every completion counts in its window and the next rolling-1
+    codes = view.codes[rows]
+    keep = codes >= 0
+    win = np.minimum((end[rows] // window_ms).astype(np.int64), nwin - 1)[keep]
+    sct = cols["sct_ms"][rows][keep]
+    codes = codes[keep]
+    shift = np.repeat(np.arange(rolling), len(win))
+    win = np.tile(win, rolling) + shift
+    inside = win < nwin
+    groups = np.tile(codes, rolling)[inside] * nwin + win[inside]
+    p99 = grouped_quantiles(np.tile(sct, rolling)[inside], groups,
+                            len(view.classes) * nwin, [0.99])[:, 0]
+
+    return {
+        "t": edges[:-1],
+        "window_ms": window_ms,
+        "classes": list(view.classes),
+        "goodput": goodput,
+        "active": active,
+        "p99_sct": p99.reshape(len(view.classes), nwin),
+    }
+
+
+def density_image(x, y, bins, extent, color):
+    '''
+    RGBA image of the point density of (x, y) in `color`, alpha growing with
+    log(count); cost depends on the number of pixels, not of points
+    '''
+    (x0, x1), (y0, y1) = extent
+    counts, _, _ = np.histogram2d(x, y, bins=bins, range=[[x0, x1], [y0, y1]])
+    img = np.zeros(counts.T.shape + (4,))
+    img[..., :3] = color[:3]
+    if counts.max() > 0:
+        img[..., 3] = 0.15 + 0.8 * np.log1p(counts.T) / np.log1p(counts.max())
+        img[..., 3][counts.T == 0] = 0.0
+    return img
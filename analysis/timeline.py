@@ -0,0 +1,94 @@
+'''
+span recording for run_grid.py and the analysis
+
+A Tracer records named spans (an experiment, a compose up, a csv parse, a
+plot) and writes them as a Chrome trace (open in chrome://tracing or
+https://ui.perfetto.dev), plus a per-phase summary table of where the time
+went. Timestamps are wall clock, so spans recorded in worker processes or read
+back from logs line up with the ones of the main process.
+
+Only the standard library is used, so run_grid.py can import it.
+'''
+import os
+import json
+import time
+import threading
+import contextlib
+
+
+class Tracer:
+
+    def __init__(self, process_name):
+        self.process_name = process_name
+        self.lock = threading.Lock()
+        self.events = []
+        self._threads = {}
+
+    def _tid(self):
+        name = threading.current_thread().name
+        with self.lock:
+            return self._threads.setdefault(name, len(self._threads))
+
+    def add(self, name, start, duration, category="phase", tid=None, **args):
+        '''record a span that started at wall time `start` (s) and lasted `duration` (s)'''
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": int(start * 1e6),
+            "dur": max(int(duration * 1e6), 0),
+            "pid": os.getpid(),
+            "tid": self._tid() if tid is None else tid,
+        }
+        if args:
+            event["args"] = args
+        with self.lock:
+            self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name, category="phase", **args):
+        start = time.time()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter() - t0, category, **args)
+
+    def extend(self, events):
+        '''add spans recorded by another Tracer, e.g. in a worker process'''
+        with self.lock:
+            self.events.extend(events)
+
+    def summary(self, category="phase"):
+        '''{name: (count, total s, mean s, max s)} of the spans of one category'''
+        totals = {}
+        for e in self.events:
+            if e["cat"] != category:
+                continue
+            n, total, longest = totals.get(e["name"], (0, 0.0, 0.0))
+            dur = e["dur"] / 1e6
+            totals[e["name"]] = (n + 1, total + dur, max(longest, dur))
+        return {k: (n, total, total / n, longest) for k, (n, total, longest) in totals.items()}
+
+    def report(self, prefix="", category="phase"):
+        table = self.summary(category)
+        if not table:
+            return
+        grand = sum(total for _, total, _, _ in table.values())
+        print(f"\n{prefix}time per {category}")
+        print(f"  {'name':<28} {'count':>6} {'total (s)':>10} {'mean (s)':>9} {'max (s)':>8} {'share':>6}")
+        for name, (n, total, mean, longest) in sorted(table.items(), key=lambda kv: -kv[1][1]):
+            share = total / grand if grand > 0 else 0.0
+            print(f"  {name:<28} {n:>6} {total:>10.2f} {mean:>9.3f} {longest:>8.2f} {share:>6.1%}")
+
+    def write(self, path):
+        '''write the Chrome trace JSON (atomically)'''
+        meta = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": self.process_name}}
+                for pid in sorted({e["pid"] for e in self.events} or {os.getpid()})]
+        meta += [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                 for name, tid in self._threads.items()]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as fp:
+            json.dump({"traceEvents": meta + self.events, "displayTimeUnit": "ms"}, fp)
+        os.replace(tmp, path)
@@ -0,0 +1,157 @@
+'''
+precomputed per-experiment view shared by all stat and plot functions
+
+The log is partitioned by class with a single stable sort, throughput is
+derived once, and the valid values of every metric are kept sorted per class
+so that quantiles, IQR bounds and box plot statistics are index lookups.
+'''
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+from experiments import slowdown
+
+# metric -> (column the values come from, column whose > 0 marks a valid row)
+METRICS = {
+    "throughput": ("throughput", "sct_ms"),
+    "sct_ms": ("sct_ms", "sct_ms"),
+    "e2e_ms": ("e2e_ms", "e2e_ms"),
+    "slowdown": ("slowdown", "sct_ms"),
+}
+
+
+def sorted_quantile(sorted_vals, q):
+    '''
+    quantile(s) q in [0, 1] of an already sorted array
+    same linear interpolation as np.percentile / pd.Series.quantile
+    '''
+    n = len(sorted_vals)
+    if n == 0:
+        return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+    pos = np.asarray(q, dtype=float) * (n - 1)
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, n - 1)
+    frac = pos - lo
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * frac
+
+
+class ExperimentView:
+    '''
+    one experiment log, partitioned by class
+
+    columns      float64 arrays in file order (time_ms, bytes, sct_ms, e2e_ms, throughput,
+                 slowdown = sct_ms / ideal completion time, NaN without meta)
+    classes      sorted class names
+    codes        int class code of every row (index into classes, -1 for missing)
+    rows(c)      row indices of class c in file order (c=None: all rows)
+    values(m, c) valid values of metric m for class c in file order
+    sorted(m, c) the same values sorted
+    digest()     content hash of the data, for skipping unchanged plots
+    '''
+
+    def __init__(self, df, meta=None):
+        n = len(df)
+        cols = {}
+        for c in ("time_ms", "bytes", "sct_ms", "e2e_ms"):
+            if c in df:
+                cols[c] = df[c].to_numpy(dtype=float)
+            else:
+                cols[c] = np.full(n, np.nan)
+
+        valid = {c: cols[c] > 0 for c in ("sct_ms", "e2e_ms")}
+        throughput = np.full(n, np.nan)
+        np.divide(cols["bytes"], cols["sct_ms"], out=throughput, where=valid["sct_ms"])
+        cols["throughput"] = throughput
+        meta = meta or {}
+        cols["slowdown"] = slowdown(cols["sct_ms"], cols["bytes"],
+                                    meta.get("delay_ms"), meta.get("bandwidth_mbps"))
+
+        cat = pd.Categorical(df["class"]) if "class" in df else pd.Categorical([None] * n)
+        self.classes = [str(c) for c in cat.categories]
+        self.codes = np.asarray(cat.codes, dtype=np.int64)
+        self.columns = cols
+        self.valid = valid
+        self.n = n
+        self._digest = None
+
+        # partition rows by class with one stable sort; rows with no class sort first
+        order = np.argsort(self.codes, kind="stable")
+        counts = np.bincount(self.codes + 1, minlength=len(self.classes) + 1)
+        bounds = np.cumsum(counts)
+        self._rows = {None: np.arange(n)}
+        for i, c in enumerate(self.classes):
+            self._rows[c] = order[bounds[i]:bounds[i + 1]]
+
+        self._values = {}
+        self._sorted = {}
+        for metric, (col, valid_col) in METRICS.items():
+            for c, idx in self._rows.items():
+                vals = cols[col][idx[valid[valid_col][idx]]]
+                vals = vals[~np.isnan(vals)]
+                self._values[metric, c] = vals
+                self._sorted[metric, c] = np.sort(vals)
+
+    def digest(self):
+        '''sha1 of the columns and classes every stat and plot is computed from'''
+        if self._digest is None:
+            h = hashlib.sha1()
+            for c in ("time_ms", "bytes", "sct_ms", "e2e_ms"):
+                h.update(np.ascontiguousarray(self.columns[c]).tobytes())
+            h.update(self.codes.tobytes())
+            h.update(json.dumps(self.classes).encode())
+            self._digest = h.hexdigest()
+        return self._digest
+
+    def rows(self, class_name=None):
+        return self._rows[class_name]
+
+    def values(self, metric, class_name=None):
+        return self._values[metric, class_name]
+
+    def sorted(self, metric, class_name=None):
+        return self._sorted[metric, class_name]
+
+    def quantile(self, metric, class_name, q):
+        return sorted_quantile(self._sorted[metric, class_name], q)
+
+    def iqr_bounds(self, metric, class_name, k=1.5):
+        '''(lower, upper) Tukey fences of the class, Q1 - k*IQR and Q3 + k*IQR'''
+        q1, q3 = self.quantile(metric, class_name, [0.25, 0.75])
+        iqr = q3 - q1
+        return q1 - k * iqr, q3 + k * iqr
+
+    def within_iqr(self, metric, class_name, k=1.5):
+        '''sorted values of the class inside the Tukey fences (a contiguous slice)'''
+        s = self._sorted[metric, class_name]
+        if len(s) == 0:
+            return s
+        lower, upper = self.iqr_bounds(metric, class_name, k)
+        return s[np.searchsorted(s, lower, "left"):np.searchsorted(s, upper, "right")]
+
+    def box_stats(self, metric, whis=1.5):
+        '''
+        box plot statistics of every non-empty class, ready for Axes.bxp
+        (same definitions as matplotlib's cbook.boxplot_stats)
+        '''
+        stats = []
+        for c in self.classes:
+            s = self._sorted[metric, c]
+            if len(s) == 0:
+                continue
+            q1, med, q3 = sorted_quantile(s, [0.25, 0.5, 0.75])
+            iqr = q3 - q1
+            # whiskers: most extreme values still inside the fences
+            hi = np.searchsorted(s, q3 + whis * iqr, "right") - 1
+            lo = np.searchsorted(s, q1 - whis * iqr, "left")
+            stats.append({
+                "label": c,
+                "med": med,
+                "q1": q1,
+                "q3": q3,
+                "whislo": min(s[lo], q1) if lo < len(s) else q1,
+                "whishi": max(s[hi], q3) if hi >= 0 else q3,
+                "mean": s.mean(),
+                "fliers": np.array([]),
+            })
+        return stats
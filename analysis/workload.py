@@ -0,0 +1,253 @@
+'''
+precomputed workload traces: flow arrival times and sizes
+
+A trace fixes the flows of an experiment up front, so every scheduler variant
+of a grid point replays exactly the same sizes in the same order (and, with a
+load, at the same times) instead of the client sampling its own:
+
+    flow,stream_id,arrival_ms,bytes,class
+    0,0,0.000,51200,short
+    1,4,3.182,1521664,long
+
+stream_id is the client-initiated bidirectional stream the flow is sent on
+(4 * flow), which is how a trace is joined to a server log. Flow sizes:
+
+    threePoints   THREE_POINTS (short / medium / long) with probabilities
+                  short_frac, (1 - short_frac) / 2, (1 - short_frac) / 2
+    logUniform    log-uniform between MIN_SIZE and 2 * long_size
+    webSearch     the web search CDF of DCTCP (Alizadeh et al., SIGCOMM 2010)
+    dataMining    the data mining CDF of VL2 (Greenberg et al., SIGCOMM 2009)
+
+The empirical CDFs are the packet-count tables used by the pFabric and Homa
+simulations (1460-byte packets), sampled by inverse transform with linear
+interpolation between the points. Without a load every flow arrives at 0 ms
+and the client's -concurrency limit paces them (as the built-in sampler does);
+with a load, arrivals are Poisson at load x the link rate over the mean size.
+
+THREE_POINTS are the sizes the server logs for the client's own threePoints
+sampler (../data/*_threepoints_data), not -shortSize/-longSize themselves. A
+size's class follows the server's rule: short up to -shortSize, long from
+-longSize on, medium in between (size_classes). reclassify() warns when a log
+disagrees with that rule on a stream whose size it logged as intended.
+
+Everything is drawn from numpy's default_rng(seed) in a few vectorised calls,
+so a (distribution, seed, ...) always gives the same trace. This module only
+needs numpy; run_grid.py and surrogate.py import it as analysis.workload.
+
+usage (from the repository root):
+    python3 -m analysis.workload webSearch --seed 1 --nflows 200 [--load 0.6 --bw 8]
+'''
+import os
+import csv
+import json
+import tempfile
+import argparse
+import numpy as np
+
+DISTRIBUTIONS = ["threePoints", "logUniform", "webSearch", "dataMining"]
+TRACE_COLUMNS = ["flow", "stream_id", "arrival_ms", "bytes", "class"]
+CLASSES = ["short", "medium", "long"]
+PACKET = 1460       # bytes per packet of the empirical CDFs
+MIN_SIZE = 1200     # smallest logUniform flow
+# threePoints sizes as the server logs them for -shortSize 100KiB -longSize 1MiB
+THREE_POINTS = (51200, 575488, 1521664)
+# (packets, cumulative probability)
+WEB_SEARCH_CDF = [
+    (6, 0.0), (6, 0.15), (13, 0.2), (19, 0.3), (33, 0.4), (53, 0.53), (133, 0.6),
+    (667, 0.7), (1333, 0.8), (3333, 0.9), (6667, 0.97), (20000, 1.0),
+]
+DATA_MINING_CDF = [
+    (1, 0.0), (1, 0.5), (2, 0.6), (3, 0.7), (7, 0.8), (267, 0.9), (2107, 0.95),
+    (66667, 0.99), (666667, 1.0),
+]
+EMPIRICAL = {"webSearch": WEB_SEARCH_CDF, "dataMining": DATA_MINING_CDF}
+MANIFEST = "manifest.json"
+
+
+def sample_sizes(dist, nflows, rng, short_size, long_size, short_frac):
+    '''flow sizes in bytes (int64)'''
+    if dist == "threePoints":
+        sizes = np.array(THREE_POINTS)
+        probs = [short_frac, (1 - short_frac) / 2, (1 - short_frac) / 2]
+        return sizes[rng.choice(3, size=nflows, p=probs)].astype(np.int64)
+    if dist == "logUniform":
+        return np.exp(rng.uniform(np.log(MIN_SIZE), np.log(2 * long_size), size=nflows)).astype(np.int64)
+    if dist in EMPIRICAL:
+        packets, cdf = np.array(EMPIRICAL[dist], dtype=float).T
+        return np.maximum(np.interp(rng.random(nflows), cdf, packets) * PACKET, 1).astype(np.int64)
+    raise ValueError(f"unknown distribution {dist!r}, expected one of {DISTRIBUTIONS}")
+
+
+def mean_size(dist, short_size, long_size, short_frac):
+    '''expected flow size in bytes'''
+    if dist == "threePoints":
+        return short_frac * THREE_POINTS[0] + (1 - short_frac) / 2 * (THREE_POINTS[1] + THREE_POINTS[2])
+    if dist == "logUniform":
+        lo, hi = np.log(MIN_SIZE), np.log(2 * long_size)
+        return (np.exp(hi) - np.exp(lo)) / (hi - lo)
+    packets, cdf = np.array(EMPIRICAL[dist], dtype=float).T
+    # piecewise-uniform between the points of the CDF
+    return float(np.sum(np.diff(cdf) * (packets[1:] + packets[:-1]) / 2) * PACKET)
+
+
+def size_classes(nbytes, short_size, long_size):
+    '''
+    class code of every size as the server classes it: 0 short (<= short_size),
+    2 long (>= long_size), else 1
+    '''
+    return np.where(nbytes <= short_size, 0, np.where(nbytes >= long_size, 2, 1))
+
+
+def generate(dist, nflows, seed, short_size, long_size, short_frac, load=None, bw=None):
+    '''
+    a trace as a dict of arrays (TRACE_COLUMNS); load (fraction of the link) and
+    bw (Mbps) give Poisson arrivals, otherwise every flow arrives at 0
+    '''
+    rng = np.random.default_rng(seed)
+    nbytes = sample_sizes(dist, nflows, rng, short_size, long_size, short_frac)
+    if load:
+        if not bw:
+            raise ValueError("a load needs the link bandwidth")
+        rate = load * float(bw) * 1e6 / 8 / 1000 / mean_size(dist, short_size, long_size, short_frac)
+        arrival = np.cumsum(rng.exponential(1 / rate, size=nflows))
+        arrival -= arrival[0]
+    else:
+        arrival = np.zeros(nflows)
+    flow = np.arange(nflows)
+    return {
+        "flow": flow,
+        "stream_id": 4 * flow,
+        "arrival_ms": arrival,
+        "bytes": nbytes,
+        "class": np.array(CLASSES, dtype=object)[size_classes(nbytes, short_size, long_size)],
+    }
+
+
+def trace_name(dist, nflows, seed, short_size, long_size, short_frac, load=None, bw=None):
+    '''file name of a trace, from every argument of generate() that changes it'''
+    name = f"{dist}_n{nflows}_s{seed}_size{short_size}-{long_size}_frac{short_frac:g}"
+    if load:
+        name += f"_load{load:g}_bw{float(bw):g}"
+    return name + ".csv"
+
+
+def write_trace(path, trace):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # a temp file of its own: parallel slots may write the same trace at once
+    with tempfile.NamedTemporaryFile("w", newline="", dir=os.path.dirname(path) or ".",
+                                     prefix=os.path.basename(path), suffix=".tmp", delete=False) as fp:
+        tmp = fp.name
+        writer = csv.writer(fp)
+        writer.writerow(TRACE_COLUMNS)
+        for i in range(len(trace["flow"])):
+            writer.writerow([trace["flow"][i], trace["stream_id"][i], f"{trace['arrival_ms'][i]:.3f}",
+                             trace["bytes"][i], trace["class"][i]])
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def read_trace(path):
+    with open(path, newline="") as fp:
+        rows = list(csv.DictReader(fp))
+    return {
+        "flow": np.array([int(r["flow"]) for r in rows], dtype=np.int64),
+        "stream_id": np.array([int(r["stream_id"]) for r in rows], dtype=np.int64),
+        "arrival_ms": np.array([float(r["arrival_ms"]) for r in rows]),
+        "bytes": np.array([int(r["bytes"]) for r in rows], dtype=np.int64),
+        "class": np.array([r["class"] for r in rows], dtype=object),
+    }
+
+
+def ensure_trace(trace_dir, dist, nflows, seed, short_size, long_size, short_frac, load=None, bw=None):
+    '''path of the trace, generated on first use; the same arguments always give the same file'''
+    path = os.path.join(trace_dir, trace_name(dist, nflows, seed, short_size, long_size, short_frac,
+                                              load, bw))
+    if not os.path.exists(path):
+        write_trace(path, generate(dist, nflows, seed, short_size, long_size, short_frac, load, bw))
+    return path
+
+
+def trace_for(log_path, manifests=None):
+    '''
+    the trace an experiment replayed, from the run manifest next to its log
+    (run_grid.py records it as "workload", relative to the log directory), or None
+    manifests: dict of the manifests already read, by path, to reuse across logs
+    '''
+    log_dir = os.path.dirname(log_path)
+    manifest = os.path.join(log_dir, MANIFEST)
+    if manifests is not None and manifest in manifests:
+        entries = manifests[manifest]
+    elif not os.path.exists(manifest):
+        return None
+    else:
+        with open(manifest) as fp:
+            entries = json.load(fp)
+        if manifests is not None:
+            manifests[manifest] = entries
+    entry = entries.get(os.path.splitext(os.path.basename(log_path))[0])
+    if not entry or not entry.get("workload"):
+        return None
+    path = os.path.join(log_dir, entry["workload"])
+    return path if os.path.exists(path) else None
+
+
+def reclassify(df, trace):
+    '''
+    the log with class taken from the trace's intended size of every stream
+    (joined on stream_id) and that size as intended_bytes; streams the trace
+    does not know keep their logged class
+    '''
+    df = df.copy()
+    if not len(trace["stream_id"]):
+        df["intended_bytes"] = -1
+        return df
+    order = np.argsort(trace["stream_id"])
+    ids = trace["stream_id"][order]
+    sid = df["stream_id"].to_numpy(dtype=np.int64)
+    pos = np.minimum(np.searchsorted(ids, sid), len(ids) - 1)
+    known = ids[pos] == sid
+    intended = np.where(known, trace["bytes"][order][pos], -1)
+    df["intended_bytes"] = intended
+    logged = np.asarray(df["class"], dtype=object)
+    classes = logged.copy()
+    classes[known] = trace["class"][order][pos[known]]
+    same_size = known & (df["bytes"].to_numpy() == intended)
+    differ = int((logged[same_size] != classes[same_size]).sum())
+    if differ:
+        print(f"warning: {differ} streams of the intended size are classed differently "
+              "by the server than by the trace")
+    df["class"] = classes
+    return df
+
+
+def apply_trace(df, log_path, manifests=None):
+    '''the log classed by the trace it replayed (see reclassify), or as logged if it replayed none'''
+    trace = trace_for(log_path, manifests)
+    if trace is None:
+        return df
+    return reclassify(df, read_trace(trace))
+
+
+def main():
+    from run_grid import NFLOWS, SHORT_SIZE, LONG_SIZE, SLRATIO
+
+    parser = argparse.ArgumentParser(description="generate a workload trace")
+    parser.add_argument("dist", choices=DISTRIBUTIONS)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--nflows", type=int, default=NFLOWS)
+    parser.add_argument("--load", type=float, default=None,
+                        help="offered load as a fraction of the link (Poisson arrivals); needs --bw")
+    parser.add_argument("--bw", type=float, default=None, help="link bandwidth (Mbps)")
+    parser.add_argument("--out", type=str, default=os.path.join("logs", "server", "traces"))
+    args = parser.parse_args()
+
+    path = ensure_trace(args.out, args.dist, args.nflows, args.seed, SHORT_SIZE, LONG_SIZE, SLRATIO,
+                        args.load, args.bw)
+    trace = read_trace(path)
+    counts = {c: int((trace["class"] == c).sum()) for c in CLASSES}
+    print(f"{path}: {len(trace['flow'])} flows, mean {trace['bytes'].mean():.0f} bytes, "
+          f"last arrival {trace['arrival_ms'][-1]:.1f} ms, {counts}")
+
+
+if __name__ == "__main__":
+    main()
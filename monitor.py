@@ -0,0 +1,255 @@
+'''
+resource monitor of the containers of one experiment
+
+While an experiment runs, a background thread reads `docker stats` as a stream
+(one process per experiment, about one sample per container per second) and
+appends every sample to a stats CSV:
+
+    time, container, cpu_pct, mem_bytes, mem_pct, net_rx_bytes, net_tx_bytes, pids
+
+cpu_pct is docker's: 100 is one full core. The ns-3 realtime sim runs on one
+thread, so a sim near 100% can no longer keep up with the emulated link and the
+measured SCTs reflect the host, not the network. Per container only running
+counts are kept, so memory does not grow with the length of the run; at the end
+verdict() reports a container as saturated when at least SATURATED_FRACTION of
+its samples were at or above the CPU or memory limit.
+
+ReplaySource stands in for docker: it replays recorded `docker stats --format
+'{{json .}}'` lines from a file, e.g. for a dry run with DOCKER pointing at a stub.
+
+usage:
+    python3 monitor.py logs/server/stats/<experiment>.csv     # verdict of a stats file
+'''
+import os
+import re
+import csv
+import json
+import time
+import signal
+import argparse
+import threading
+import subprocess
+
+CONTAINERS = ["sim", "server", "client"]
+STATS_FIELDS = ["time", "container", "cpu_pct", "mem_bytes", "mem_pct",
+                "net_rx_bytes", "net_tx_bytes", "pids"]
+# saturation thresholds (cpu in % of one core, memory in % of the limit)
+CPU_LIMIT = 90.0
+MEM_LIMIT = 90.0
+# share of a container's samples above a limit for it to count as saturated
+SATURATED_FRACTION = 0.1
+
+ANSI_ESCAPE = re.compile(rb"\x1b\[[0-9;]*[A-Za-z]")
+UNITS = {"b": 1, "kb": 1e3, "mb": 1e6, "gb": 1e9, "tb": 1e12,
+         "kib": 1 << 10, "mib": 1 << 20, "gib": 1 << 30, "tib": 1 << 40}
+
+
+def parse_size(text):
+    '''"1.5MiB" -> 1572864.0; docker uses decimal units for I/O, binary for memory'''
+    m = re.fullmatch(r"\s*([0-9.]+)\s*([A-Za-z]*)\s*", text)
+    if not m:
+        return float("nan")
+    return float(m.group(1)) * UNITS.get(m.group(2).lower() or "b", float("nan"))
+
+
+def parse_percent(text):
+    try:
+        return float(text.strip().rstrip("%"))
+    except ValueError:
+        return float("nan")
+
+
+def parse_record(record, now):
+    '''one `docker stats` json record -> a STATS_FIELDS row'''
+    mem = record.get("MemUsage", "").split("/")[0]
+    rx, _, tx = record.get("NetIO", "").partition("/")
+    try:
+        pids = int(record.get("PIDs", ""))
+    except ValueError:
+        pids = -1
+    return {
+        "time": round(now, 3),
+        "container": record.get("Name", ""),
+        "cpu_pct": parse_percent(record.get("CPUPerc", "")),
+        "mem_bytes": parse_size(mem),
+        "mem_pct": parse_percent(record.get("MemPerc", "")),
+        "net_rx_bytes": parse_size(rx),
+        "net_tx_bytes": parse_size(tx),
+        "pids": pids,
+    }
+
+
+class DockerStatsSource:
+    '''
+    streaming `docker stats` of all running containers (containers started
+    after the monitor show up too); iterating yields json records until close()
+    '''
+
+    def __init__(self, docker="docker"):
+        self.proc = subprocess.Popen(
+            [docker, "stats", "--format", "{{json .}}"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            start_new_session=True,     # close() ends the whole process group
+        )
+
+    def __iter__(self):
+        for line in self.proc.stdout:
+            # every refresh starts with a clear-screen escape sequence
+            line = ANSI_ESCAPE.sub(b"", line).strip()
+            if line.startswith(b"{"):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def close(self):
+        if self.proc.poll() is None:
+            os.killpg(self.proc.pid, signal.SIGTERM)
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.proc.pid, signal.SIGKILL)
+
+
+class ReplaySource:
+    '''stand-in for DockerStatsSource: yields the json records of a file, `interval` s apart'''
+
+    def __init__(self, path, interval=0.0):
+        self.path = path
+        self.interval = interval
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        with open(self.path) as fp:
+            for line in fp:
+                if self.closed.is_set():
+                    return
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+                if self.interval:
+                    self.closed.wait(self.interval)
+
+    def close(self):
+        self.closed.set()
+
+
+class ContainerStats:
+    '''running counts of one container's samples'''
+
+    def __init__(self):
+        self.samples = 0
+        self.cpu_sum = 0.0
+        self.cpu_max = 0.0
+        self.mem_max = 0.0
+        self.over = 0
+
+    def add(self, row, cpu_limit, mem_limit):
+        self.samples += 1
+        if row["cpu_pct"] == row["cpu_pct"]:
+            self.cpu_sum += row["cpu_pct"]
+            self.cpu_max = max(self.cpu_max, row["cpu_pct"])
+        if row["mem_pct"] == row["mem_pct"]:
+            self.mem_max = max(self.mem_max, row["mem_pct"])
+        if row["cpu_pct"] >= cpu_limit or row["mem_pct"] >= mem_limit:
+            self.over += 1
+
+    def summary(self):
+        return {
+            "samples": self.samples,
+            "cpu_mean": round(self.cpu_sum / self.samples, 2) if self.samples else None,
+            "cpu_max": self.cpu_max,
+            "mem_max_pct": self.mem_max,
+            "over_limit": self.over,
+        }
+
+
+class ResourceMonitor:
+    '''
+    samples the given containers in a background thread while the `with`
+    block runs and appends every sample to the stats CSV at path
+    source: zero-argument factory of the record source (default DockerStatsSource)
+    '''
+
+    def __init__(self, path, containers, source=None, docker="docker",
+                 cpu_limit=CPU_LIMIT, mem_limit=MEM_LIMIT, fraction=SATURATED_FRACTION):
+        self.path = path
+        self.containers = list(containers)
+        self.source_factory = source or (lambda: DockerStatsSource(docker))
+        self.cpu_limit = cpu_limit
+        self.mem_limit = mem_limit
+        self.fraction = fraction
+        self.stats = {c: ContainerStats() for c in self.containers}
+        self.source = None
+        self.thread = None
+
+    def _run(self, fp):
+        writer = csv.DictWriter(fp, fieldnames=STATS_FIELDS)
+        writer.writeheader()
+        wanted = set(self.containers)
+        for record in self.source:
+            row = parse_record(record, time.time())
+            if row["container"] not in wanted:
+                continue
+            writer.writerow(row)
+            fp.flush()
+            self.stats[row["container"]].add(row, self.cpu_limit, self.mem_limit)
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fp = open(self.path, "w", newline="")
+        self.source = self.source_factory()
+
+        def run():
+            try:
+                self._run(fp)
+            finally:
+                fp.close()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.source is not None:
+            self.source.close()
+        if self.thread is not None:
+            self.thread.join(timeout=10)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def verdict(self):
+        '''per-container summary and the containers that were saturated'''
+        containers = {c: s.summary() for c, s in self.stats.items()}
+        saturated = [c for c, s in self.stats.items()
+                     if s.samples and s.over >= self.fraction * s.samples]
+        return {"containers": containers, "saturated": saturated,
+                "cpu_limit": self.cpu_limit, "mem_limit": self.mem_limit}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="saturation verdict of a recorded stats CSV")
+    parser.add_argument("path")
+    parser.add_argument("--cpu-limit", type=float, default=CPU_LIMIT)
+    parser.add_argument("--mem-limit", type=float, default=MEM_LIMIT)
+    args = parser.parse_args()
+
+    stats = {}
+    with open(args.path, newline="") as fp:
+        for row in csv.DictReader(fp):
+            row = {k: (v if k == "container" else float(v)) for k, v in row.items()}
+            stats.setdefault(row["container"], ContainerStats()).add(row, args.cpu_limit, args.mem_limit)
+    for name, s in sorted(stats.items()):
+        summary = s.summary()
+        flag = "  SATURATED" if s.over >= SATURATED_FRACTION * s.samples else ""
+        print(f"{name}: {summary['samples']} samples, cpu mean {summary['cpu_mean']}% "
+              f"max {summary['cpu_max']}%, mem max {summary['mem_max_pct']}%{flag}")
+
+
+if __name__ == "__main__":
+    main()
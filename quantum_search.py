@@ -0,0 +1,250 @@
+'''
+search for the DRR quanta (quantum0, quantum1, quantum2) of one grid point
+
+Successive halving over the quantum space: every candidate gets `--min-reps`
+replicates, the best 1/eta by objective survive and get eta times more
+replicates, until one candidate is left or `--max-reps` is reached. The
+objective is a weighted sum of short-flow mean and p99 SCT (and optionally the
+long-flow mean SCT), averaged over the replicates of a candidate.
+
+Candidates are evaluated either on the emulator (run_grid.run_one_experiment,
+replicate r passes seed BASE_SEED + r like --reps) or on the surrogate model
+(surrogate.simulate). Every evaluation is appended to --log as one JSON line,
+and evaluations already in the log are reused, so an interrupted search picks
+up where it stopped. An emulator run that fails is logged as failed, scores
+inf for its candidate and is tried again by the next search.
+
+usage:
+    python3 quantum_search.py --backend surrogate --delay 20 --bw 8 --qlen 20 --con 10
+    sudo python3 quantum_search.py --backend emulator --candidates 9 --max-reps 3
+'''
+import os
+import csv
+import json
+import random
+import argparse
+import itertools
+import subprocess
+
+from run_grid import (
+    QUANTUMS, BASE_SEED, SEED_FLAG, MANIFEST_PATH, RunManifest, run_one_experiment, build_experiment,
+    client_supports,
+)
+
+SEARCH_LOG = os.path.join("logs", "server", "quantum_search.jsonl")
+
+# quanta are whole packets, 1 to MAX_PACKETS of them per class
+PACKET = 1200
+MAX_PACKETS = 8
+
+
+''' every (quantum0, quantum1, quantum2) in the search space '''
+def quantum_space(max_packets=MAX_PACKETS):
+    steps = [PACKET * k for k in range(1, max_packets + 1)]
+    return list(itertools.product(steps, repeat=3))
+
+
+''' mean and p99 (linear interpolation, as numpy) of a list of values '''
+def mean_p99(values):
+    if not values:
+        return None, None
+    values = sorted(values)
+    pos = 0.99 * (len(values) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    p99 = values[lo] + (values[hi] - values[lo]) * (pos - lo)
+    return sum(values) / len(values), p99
+
+
+''' short-flow mean/p99 and long-flow mean SCT of (class, sct_ms) pairs '''
+def class_stats(rows):
+    short = [sct for cls, sct in rows if cls == "short" and sct > 0]
+    long = [sct for cls, sct in rows if cls == "long" and sct > 0]
+    short_mean, short_p99 = mean_p99(short)
+    long_mean, _ = mean_p99(long)
+    return {"short_mean": short_mean, "short_p99": short_p99, "long_mean": long_mean}
+
+
+class SurrogateBackend:
+    name = "surrogate"
+
+    def evaluate(self, config, quantum, rep):
+        # imported here so the emulator backend does not need numpy
+        from surrogate import simulate, CLASSES
+        result = simulate(config["delay"], config["bw"], config["qlen"], "drr", config["con"],
+                          dtype=config["dtype"], quantum=quantum, seed=BASE_SEED + rep)
+        return class_stats(zip((CLASSES[c] for c in result["class"]), result["sct_ms"]))
+
+
+class EmulatorBackend:
+    name = "emulator"
+
+    def __init__(self, manifest=None, seeded=True):
+        self.manifest = manifest
+        self.seeded = seeded    # pass SEED_FLAG; False when the client does not define it
+        self.count = 0
+
+    def evaluate(self, config, quantum, rep):
+        self.count += 1
+        try:
+            run_one_experiment(config["scenario"], config["delay"], config["bw"], config["qlen"],
+                               "drr", config["con"], config["dtype"], self.count, quantum=quantum,
+                               rep=rep, seed=BASE_SEED + rep if self.seeded else None,
+                               manifest=self.manifest)
+        except (subprocess.CalledProcessError, RuntimeError) as e:
+            print(f"[SEARCH] quantum {tuple(quantum)} replicate {rep} failed: {e}")
+            return {"failed": True, "error": str(e)}
+        _, logfile, _ = build_experiment(config["scenario"], config["delay"], config["bw"],
+                                         config["qlen"], "drr", config["con"], config["dtype"],
+                                         quantum, rep)
+        path = os.path.join("logs", "server", logfile)
+        if not os.path.exists(path):
+            return None
+        with open(path, newline="") as fp:
+            rows = [(r.get("class"), float(r["sct_ms"])) for r in csv.DictReader(fp)]
+        return class_stats(rows)
+
+
+'''
+appends every evaluation to a JSON-lines file and answers repeated
+(backend, config, quantum, rep) lookups from it
+'''
+class EvaluationLog:
+
+    def __init__(self, path=SEARCH_LOG):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as fp:
+                for line in fp:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    entry = json.loads(line)
+                    self.entries[self.key(entry["backend"], entry["config"],
+                                          entry["quantum"], entry["rep"])] = entry["stats"]
+
+    @staticmethod
+    def key(backend, config, quantum, rep):
+        return json.dumps([backend, config, list(quantum), rep], sort_keys=True)
+
+    def get(self, backend, config, quantum, rep):
+        return self.entries.get(self.key(backend, config, quantum, rep))
+
+    def add(self, backend, config, quantum, rep, stats):
+        self.entries[self.key(backend, config, quantum, rep)] = stats
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as fp:
+            fp.write(json.dumps({"backend": backend, "config": config, "quantum": list(quantum),
+                                 "rep": rep, "stats": stats}, sort_keys=True) + "\n")
+
+
+class QuantumSearch:
+
+    def __init__(self, backend, config, log, weights=(1.0, 1.0, 0.0)):
+        self.backend = backend
+        self.config = config
+        self.log = log
+        self.weights = weights
+        self.evaluations = 0
+        self.tried = set()      # (quantum, rep) evaluated by this search
+
+    def stats(self, quantum, rep):
+        stats = self.log.get(self.backend.name, self.config, quantum, rep)
+        # a failed evaluation of an earlier search is run once more
+        if stats is not None and (not stats.get("failed") or (tuple(quantum), rep) in self.tried):
+            return stats
+        self.tried.add((tuple(quantum), rep))
+        stats = self.backend.evaluate(self.config, quantum, rep)
+        if stats is None:
+            return None
+        self.log.add(self.backend.name, self.config, quantum, rep, stats)
+        self.evaluations += 1
+        return stats
+
+    def objective(self, quantum, reps):
+        '''weighted short mean + p99 (+ long mean) SCT averaged over replicates 0..reps-1'''
+        w_mean, w_p99, w_long = self.weights
+        scores = []
+        for rep in range(reps):
+            s = self.stats(quantum, rep)
+            if s is not None and s.get("failed"):
+                return float("inf")
+            if s is None or s["short_mean"] is None:
+                continue
+            score = w_mean * s["short_mean"] + w_p99 * s["short_p99"]
+            if w_long:
+                score += w_long * (s["long_mean"] or 0.0)
+            scores.append(score)
+        return sum(scores) / len(scores) if scores else float("inf")
+
+    def run(self, candidates, eta=3, min_reps=1, max_reps=9):
+        '''successive halving; returns [(objective, quantum)] of the last rung, best first'''
+        survivors = [tuple(q) for q in candidates]
+        reps = min_reps
+        rung = 0
+        while True:
+            ranked = sorted((self.objective(q, reps), q) for q in survivors)
+            print(f"[SEARCH] rung {rung}: {len(survivors)} candidates x {reps} replicates, "
+                  f"best {ranked[0][1]} objective {ranked[0][0]:.1f}")
+            if len(ranked) == 1 or reps >= max_reps:
+                return ranked
+            survivors = [q for _, q in ranked[:max(1, len(ranked) // eta)]]
+            reps = min(reps * eta, max_reps)
+            rung += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="successive halving search over DRR quanta")
+    parser.add_argument("--backend", "-b", choices=["surrogate", "emulator"], default="surrogate")
+    parser.add_argument("--topo", "-t", type=str, default="b")
+    parser.add_argument("--dtype", "-d", type=str, default="threePoints")
+    parser.add_argument("--delay", type=int, default=20)
+    parser.add_argument("--bw", type=int, default=8)
+    parser.add_argument("--qlen", type=int, default=20)
+    parser.add_argument("--con", type=int, default=10)
+    parser.add_argument("--candidates", "-n", type=int, default=81,
+                        help="quanta sampled from the search space (plus QUANTUMS); 0 = all")
+    parser.add_argument("--max-packets", type=int, default=MAX_PACKETS,
+                        help="largest quantum, in packets of 1200 bytes")
+    parser.add_argument("--eta", type=int, default=3, help="keep the best 1/eta at every rung")
+    parser.add_argument("--min-reps", type=int, default=1)
+    parser.add_argument("--max-reps", type=int, default=9)
+    parser.add_argument("--w-mean", type=float, default=1.0, help="weight of short-flow mean SCT")
+    parser.add_argument("--w-p99", type=float, default=1.0, help="weight of short-flow p99 SCT")
+    parser.add_argument("--w-long", type=float, default=0.0, help="weight of long-flow mean SCT")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the candidate sample")
+    parser.add_argument("--log", type=str, default=SEARCH_LOG,
+                        help="evaluations are appended here and reused on the next run")
+    args = parser.parse_args()
+
+    space = quantum_space(args.max_packets)
+    if 0 < args.candidates < len(space):
+        candidates = random.Random(args.seed).sample(space, args.candidates)
+    else:
+        candidates = space
+    candidates += [q for q in QUANTUMS if q not in candidates]
+
+    if args.backend == "emulator":
+        seeded = client_supports(SEED_FLAG)
+        if not seeded:
+            print(f"warning: the client does not define {SEED_FLAG}; replicates run unseeded")
+        backend = EmulatorBackend(RunManifest(MANIFEST_PATH), seeded)
+    else:
+        backend = SurrogateBackend()
+
+    config = {"scenario": args.topo, "delay": args.delay, "bw": args.bw, "qlen": args.qlen,
+              "con": args.con, "dtype": args.dtype}
+    search = QuantumSearch(backend, config, EvaluationLog(args.log),
+                           weights=(args.w_mean, args.w_p99, args.w_long))
+    ranked = search.run(candidates, args.eta, args.min_reps, args.max_reps)
+
+    print(f"[SEARCH] {search.evaluations} new evaluations, {len(search.log.entries)} in {args.log}")
+    for score, q in ranked[:5]:
+        print(f"  quantum {q}: objective {score:.1f}")
+    best = ranked[0][1]
+    print(f"[SEARCH] best quantum for {config}: {best}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,52 @@
 import os 
-import itertools
+import re
+import json
+import time
+import queue
+import hashlib
+import threading
+import contextlib
+import shutil
 import argparse
 import subprocess
+import csv
+import math
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis.timeline import Tracer
+import monitor
+import sweep
 
 ''' docker configurations '''
 CLIENT_IMAGE = "quic-go-datacenter"
+# client binary inside CLIENT_IMAGE (see quic-go-datacenter/run_endpoint.sh)
+CLIENT_BINARY = "datacenter_client"
 SERVER_IMAGE = "quic-go-datacenter"
+SIM_IMAGE = "quic-network-simulator-sim"
+# docker binary; point DOCKER at a stub script to dry-run the grid
+DOCKER = os.environ.get("DOCKER", "docker")
+
+''' parallel slot configurations '''
+# cores one experiment keeps busy (ns-3 realtime sim, server, client)
+CORES_PER_EXPERIMENT = 3
+# slot s uses leftnet 193.167.s.0/24 and rightnet 193.167.(100+s).0/24; the
+# scenarios use 193.167.49-51.0/24 inside the simulator (the tcp-cross-traffic
+# source and sink, the point-to-point link), so the slots stay below them
+SCENARIO_SUBNETS = [49, 50, 51]
+MAX_SLOTS = min(SCENARIO_SUBNETS)
+
+''' run manifest '''
+MANIFEST_PATH = os.path.join("logs", "server", "manifest.json")
+# chrome://tracing timeline of the sweep (see analysis/timeline.py)
+TRACE_PATH = os.path.join("logs", "server", "trace.json")
+# per-container docker stats of every experiment (see monitor.py)
+STATS_DIR = os.path.join("logs", "server", "stats")
+
+''' warm environment '''
+# recreate a warm sim after this many runs: its synchronizer socket never
+# accepts connections, so every client's readiness probe stays in its backlog
+WARM_MAX_REUSE = 50
 
 ''' scheduler configurations '''
 # scheduler modules
@@ -21,6 +62,30 @@ QUANTUMS = [
     (2 * 1200, 1 * 1200, 1 * 1200)
 ]
 
+''' replication configurations '''
+# client flag that seeds its flow size / arrival sampler
+SEED_FLAG = "-seed"
+# replicate r of every configuration uses seed BASE_SEED + r, so all
+# schedulers see the same sequence of workloads
+BASE_SEED = 1
+# two-sided 95% student-t critical values for 1..30 degrees of freedom
+T95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+       2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+       2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+REPLICATION_LOG = os.path.join("logs", "server", "replication.csv")
+
+''' workload traces (see analysis/workload.py) '''
+# client flag naming the trace of flow arrivals and sizes it replays
+TRACE_FLAG = "-trace"
+# analysis.workload.DISTRIBUTIONS (not imported here: it needs numpy)
+WORKLOADS = ["threePoints", "logUniform", "webSearch", "dataMining"]
+TRACE_DIR = os.path.join("logs", "server", "traces")
+
+''' client log (see analysis/latency.py) '''
+# client flag naming the per-stream log it writes; the columns are the contract
+# in analysis/latency.py (CLIENT_COLUMNS), --client-log needs a client that has it
+CLIENT_LOG_FLAG = "-logfile"
+
 ''' network configurations '''
 # stream attributes
 NFLOWS = 200
@@ -45,8 +110,173 @@ QUEUE_LENGTHS = [
     "20",    
 ]
 
-''' run one docker compose experiment '''
-def run_one_experiment(scenario, delay, bw, qlen, scheduler, con, dtype, count, quantum=None):
+''' factor levels of the default sweep (see sweep.py for spec files) '''
+def default_factors(scenario="b", scheduler="drr", dtype="threePoints"):
+    return {
+        "scenario": scenario,
+        "dtype": dtype,
+        "scheduler": scheduler,
+        "delay": DELAYS,
+        "bw": BANDWIDTHS,
+        "qlen": QUEUE_LENGTHS,
+        "quantum": [list(q) for q in QUANTUMS],     # dropped for other schedulers
+        "con": CONCURRENCY,
+    }
+
+'''
+record of every experiment run so far: a hash of its full configuration
+(scenario, server/client parameters and the image IDs) and its status
+(running, complete or failed), stored as json next to the server logs
+'''
+class RunManifest:
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self._image_ids = None
+        if os.path.exists(path):
+            with open(path) as fp:
+                self.entries = json.load(fp)
+
+    def image_ids(self):
+        '''IDs of the sim, server and client images, looked up once per run'''
+        if self._image_ids is None:
+            self._image_ids = {}
+            for image in sorted({SIM_IMAGE, SERVER_IMAGE, CLIENT_IMAGE}):
+                res = subprocess.run(
+                    [DOCKER, "image", "inspect", "--format", "{{.Id}}", image],
+                    capture_output=True, text=True, check=False,
+                )
+                self._image_ids[image] = res.stdout.strip()
+        return self._image_ids
+
+    def config_hash(self, params):
+        config = dict(params)
+        config["images"] = self.image_ids()
+        blob = json.dumps(config, sort_keys=True).encode()
+        return hashlib.sha256(blob).hexdigest()
+
+    def is_complete(self, name, config_hash, log_path):
+        entry = self.entries.get(name)
+        return (
+            entry is not None
+            and entry["status"] == "complete"
+            and entry["config_hash"] == config_hash
+            and os.path.exists(log_path)
+        )
+
+    def mark(self, name, config_hash, status, **extra):
+        with self.lock:
+            entry = {
+                "config_hash": config_hash,
+                "status": status,
+                "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+            entry.update(extra)
+            self.entries[name] = entry
+            self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as fp:
+            json.dump(self.entries, fp, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+'''
+flags the client binary defines, parsed from its -h output once per run; the
+client is built from another repository, and Go's flag package exits on an
+unknown flag, so optional flags are only passed when the client has them
+'''
+_CLIENT_FLAGS = None
+
+def client_flags():
+    global _CLIENT_FLAGS
+    if _CLIENT_FLAGS is None:
+        res = subprocess.run(
+            [DOCKER, "run", "--rm", "--entrypoint", CLIENT_BINARY, CLIENT_IMAGE, "-h"],
+            capture_output=True, text=True, check=False,
+        )
+        _CLIENT_FLAGS = set(re.findall(r"^\s+-([\w.-]+)", res.stdout + res.stderr, flags=re.M))
+    return _CLIENT_FLAGS
+
+def client_supports(flag):
+    return flag.lstrip("-") in client_flags()
+
+''' spans of every experiment and phase, written as a Chrome trace at the end '''
+TRACER = Tracer("run_grid")
+
+'''
+compose projects kept up between experiments: the networks and the sim stay
+up, and the sim is only recreated when the SCENARIO string changes
+'''
+class WarmEnvironment:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = {}     # compose project -> (scenario, runs since sim start, env)
+
+    def sim_running(self, env):
+        res = subprocess.run(
+            [DOCKER, "compose", "ps", "--status", "running", "-q", "sim"],
+            capture_output=True, text=True, check=False, env=env,
+        )
+        return bool(res.stdout.strip())
+
+    def run(self, env):
+        project = env.get("COMPOSE_PROJECT_NAME", "")
+        with self.lock:
+            scenario, runs, _ = self.state.get(project, (None, 0, None))
+
+        if scenario != env["SCENARIO"] or runs >= WARM_MAX_REUSE or not self.sim_running(env):
+            with TRACER.span("sim_start"):
+                subprocess.run(
+                    [DOCKER, "compose", "up", "-d", "--force-recreate", "sim"],
+                    check=True, env=env,
+                )
+            runs = 0
+        else:
+            print(f"[SIMULATOR] reusing warm sim ({runs} runs on '{scenario}')")
+
+        with self.lock:
+            self.state[project] = (env["SCENARIO"], runs + 1, env)
+
+        # only the endpoints are restarted for every experiment
+        with TRACER.span("endpoints"):
+            subprocess.run(
+                [DOCKER, "compose", "up", "--no-deps", "--force-recreate",
+                 "--abort-on-container-exit", "server", "client"],
+                check=True, env=env,
+            )
+
+    def shutdown(self):
+        '''tear down every project that was kept warm'''
+        for _, _, env in self.state.values():
+            with TRACER.span("teardown"):
+                subprocess.run([DOCKER, "compose", "down", "-v"], check=False, env=env)
+        self.state.clear()
+
+''' compose project, networks and log directory of one parallel slot '''
+def slot_env(slot):
+    return {
+        "COMPOSE_PROJECT_NAME": f"qns-slot{slot}",
+        "CONTAINER_PREFIX": f"slot{slot}-",
+        "LOG_ROOT": os.path.join(".", "logs", "slots", f"slot{slot}"),
+        "LEFTNET_V4": f"193.167.{slot}",
+        "RIGHTNET_V4": f"193.167.{100 + slot}",
+        "LEFTNET_V6": f"fd00:cafe:cafe:{slot:x}",
+        "RIGHTNET_V6": f"fd00:cafe:cafe:{0x100 + slot:x}",
+    }
+
+''' number of experiments the host can run side by side '''
+def max_parallel(requested):
+    by_cores = max(1, (os.cpu_count() or 1) // CORES_PER_EXPERIMENT)
+    return max(1, min(requested, by_cores, MAX_SLOTS))
+
+''' experiment name and compose parameters of one grid point '''
+def build_experiment(scenario, delay, bw, qlen, scheduler, con, dtype, quantum=None,
+                     rep=None, seed=None, client_log=False, workload=None):
 
     if scheduler == "drr" and quantum is None:
         raise ValueError("quantum is not defined when scheduler is DRR")
@@ -65,17 +295,10 @@ def run_one_experiment(scenario, delay, bw, qlen, scheduler, con, dtype, count,
     experiment_name = (
         f"sc-{scenario}_d{delay}_bw{bw}_ql{qlen}_sch-{scheduler}{quantum_tag}_con{con}"
     )
+    if rep is not None:
+        experiment_name += f"_rep{rep}"
     logfile = f"{experiment_name}.csv"
 
-    log_dir = os.path.join("logs", "server")
-    os.makedirs(log_dir, exist_ok=True)
-    host_log_path = os.path.join(log_dir, logfile)
-    if os.path.exists(host_log_path):
-        os.remove(host_log_path)
-
-
-    print(f"\n===== running experiment {experiment_name} =====\n")
-
     ''' define env for docker compose '''
 
     ns3_scenario = (
@@ -103,16 +326,110 @@ def run_one_experiment(scenario, delay, bw, qlen, scheduler, con, dtype, count,
     if scheduler == "drr":
         q0, q1, q2 = quantum
         ns3_client_params += f" -quantum0 {q0} -quantum1 {q1} -quantum2 {q2}"
+    if seed is not None:
+        ns3_client_params += f" {SEED_FLAG} {seed}"
+    if client_log:
+        ns3_client_params += f" {CLIENT_LOG_FLAG} /logs/{logfile}"
+    if workload is not None:
+        ns3_client_params += f" {TRACE_FLAG} /logs/traces/{trace_file(workload, bw, seed)}"
+
+    params = {
+        "CLIENT": CLIENT_IMAGE,
+        "SERVER": SERVER_IMAGE,
+        "SCENARIO": ns3_scenario,
+        "SERVER_PARAMS": ns3_server_params,
+        "CLIENT_PARAMS": ns3_client_params,
+    }
+    return experiment_name, logfile, params
+
+'''
+trace file of an experiment: workload is {"dist": ..., "load": ...}; replicate
+seeds give different traces, schedulers at the same grid point the same one
+'''
+def trace_file(workload, bw, seed=None):
+    from analysis.workload import trace_name
+    return trace_name(workload["dist"], NFLOWS, BASE_SEED if seed is None else seed,
+                      SHORT_SIZE, LONG_SIZE, SLRATIO, workload.get("load"), bw)
+
+''' run one docker compose experiment '''
+def run_one_experiment(scenario, delay, bw, qlen, scheduler, con, dtype, count, quantum=None,
+                       rep=None, seed=None, client_log=False, workload=None, slot=None, fresh=None,
+                       manifest=None, resume=False, warm=None, resources=None):
+    '''
+    rep, seed: replicate number (appended to the experiment name) and client seed
+    client_log: have the client log every stream to logs/client under the same name
+    workload: {"dist": ..., "load": ...}: generate the trace (TRACE_DIR) and
+              have the client replay it instead of sampling flows itself
+    slot: run under the isolated compose project of that slot (see slot_env)
+          instead of the default one
+    fresh: True if nothing ran before in this compose project, so there is
+           nothing to tear down (defaults to count == 1)
+    manifest: RunManifest recording the configuration hash and status
+    resume: skip the experiment if the manifest has it complete with the same hash
+    warm: WarmEnvironment to reuse the running networks and sim instead of
+          tearing the whole compose project down and up again
+    resources: factory (stats path, container names) -> monitor.ResourceMonitor;
+               its samples go to STATS_DIR and a saturated container marks
+               the experiment invalid in the manifest
+    returns False if the experiment was skipped, True if it ran
+    '''
+
+    experiment_name, logfile, params = build_experiment(
+        scenario, delay, bw, qlen, scheduler, con, dtype, quantum, rep, seed, client_log, workload)
+
+    log_dir = os.path.join("logs", "server")
+    os.makedirs(log_dir, exist_ok=True)
+    host_log_path = os.path.join(log_dir, logfile)
+
+    config_hash = None
+    if manifest is not None:
+        config_hash = manifest.config_hash(params)
+        if resume and manifest.is_complete(experiment_name, config_hash, host_log_path):
+            print(f"[SIMULATOR] experiment {count} ({experiment_name}) is complete, skipping")
+            return False
+
+    if os.path.exists(host_log_path):
+        os.remove(host_log_path)
+
+    client_log_path = os.path.join("logs", "client", logfile)
+    if client_log and os.path.exists(client_log_path):
+        os.remove(client_log_path)
+
+    # in a slot the endpoints write into the slot's own log directories
+    slot_log_path, slot_client_path = host_log_path, client_log_path
+    if slot is not None:
+        slot_log_dir = os.path.join(slot_env(slot)["LOG_ROOT"], "server")
+        os.makedirs(slot_log_dir, exist_ok=True)
+        slot_log_path = os.path.join(slot_log_dir, logfile)
+        slot_client_path = os.path.join(slot_env(slot)["LOG_ROOT"], "client", logfile)
+        for path in (slot_log_path, slot_client_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # the client reads its trace from its own log directory
+    trace = None
+    if workload is not None:
+        from analysis.workload import ensure_trace
+        trace = ensure_trace(TRACE_DIR, workload["dist"], NFLOWS, BASE_SEED if seed is None else seed,
+                             SHORT_SIZE, LONG_SIZE, SLRATIO, workload.get("load"), bw)
+        client_root = slot_env(slot)["LOG_ROOT"] if slot is not None else "logs"
+        client_traces = os.path.join(client_root, "client", "traces")
+        os.makedirs(client_traces, exist_ok=True)
+        shutil.copyfile(trace, os.path.join(client_traces, os.path.basename(trace)))
+
+    print(f"\n===== running experiment {experiment_name} =====\n")
 
     env = os.environ.copy()
-    env["CLIENT"] = CLIENT_IMAGE
-    env["SERVER"] = SERVER_IMAGE
-    env["SCENARIO"] = ns3_scenario
-    env["SERVER_PARAMS"] = ns3_server_params
-    env["CLIENT_PARAMS"] = ns3_client_params
+    env.update(params)
+    if slot is not None:
+        env.update(slot_env(slot))
 
-    if count != 1:
-        subprocess.run(["docker-compose", "down", "-v"], check=False, env=env)
+    started, t0 = time.time(), time.perf_counter()
+    if fresh is None:
+        fresh = count == 1
+    if not fresh and warm is None:
+        with TRACER.span("teardown"):
+            subprocess.run([DOCKER, "compose", "down", "-v"], check=False, env=env)
 
     # if count == 1: 
     #     subprocess.run(
@@ -127,12 +444,268 @@ def run_one_experiment(scenario, delay, bw, qlen, scheduler, con, dtype, count,
 
     print(f"[SIMULATOR] Running experiment {count}")
 
-    subprocess.run(
-        ["docker", "compose", "up", "--abort-on-container-exit"],
-        check=True,
-        env=env,
-    )
+    if manifest is not None:
+        manifest.mark(experiment_name, config_hash, "running")
+    status = "complete"
+    usage = contextlib.nullcontext()
+    if resources is not None:
+        prefix = env.get("CONTAINER_PREFIX", "")
+        usage = resources(os.path.join(STATS_DIR, logfile), [prefix + c for c in monitor.CONTAINERS])
+    up_start = time.time()
+    try:
+        with usage:
+            if warm is not None:
+                warm.run(env)
+            else:
+                with TRACER.span("compose_up"):
+                    subprocess.run(
+                        [DOCKER, "compose", "up", "--abort-on-container-exit"],
+                        check=True,
+                        env=env,
+                    )
+        with TRACER.span("collect"):
+            if slot is not None and os.path.exists(slot_log_path):
+                os.replace(slot_log_path, host_log_path)
+            if client_log and slot is not None and os.path.exists(slot_client_path):
+                os.makedirs(os.path.dirname(client_log_path), exist_ok=True)
+                os.replace(slot_client_path, client_log_path)
+        if not os.path.exists(host_log_path):
+            raise RuntimeError(f"server did not write {host_log_path}")
+    except (subprocess.CalledProcessError, RuntimeError) as e:
+        status = "failed"
+        if manifest is not None:
+            manifest.mark(experiment_name, config_hash, "failed", error=str(e))
+        raise
+    finally:
+        TRACER.add(experiment_name, started, time.perf_counter() - t0, category="experiment",
+                   count=count, slot=slot, status=status)
+
+    if client_log and not os.path.exists(client_log_path):
+        print(f"[SIMULATOR] warning: client did not write {client_log_path}")
+    trace_transfer(host_log_path, up_start)
+    extra = {}
+    if trace is not None:
+        extra["workload"] = os.path.relpath(trace, log_dir)
+    if resources is not None:
+        extra["resources"] = verdict = usage.verdict()
+        if verdict["saturated"]:
+            status = "invalid"
+            print(f"[SIMULATOR] experiment {count} ({experiment_name}) is invalid: "
+                  f"{', '.join(verdict['saturated'])} saturated the host")
+    if manifest is not None:
+        manifest.mark(experiment_name, config_hash, status, **extra)
+    return True
+
+'''
+split the time inside `compose up` using the server log: "startup" (ns-3 and
+endpoints coming up) until the first stream opened, "transfer" until the last
+stream completed. Log timestamps are wall clock ms of the same host.
+'''
+def trace_transfer(log_path, up_start):
+    first = last = None
+    try:
+        with open(log_path, newline="") as fp:
+            for row in csv.DictReader(fp):
+                done = float(row["time_ms"]) / 1000
+                opened = done - max(float(row.get("e2e_ms") or 0), 0) / 1000
+                first = opened if first is None else min(first, opened)
+                last = done if last is None else max(last, done)
+    except (OSError, KeyError, ValueError):
+        return
+    if first is None or not up_start <= first <= last <= time.time():
+        return
+    TRACER.add("startup", up_start, first - up_start, category="compose_up")
+    TRACER.add("transfer", first, last - first, category="compose_up")
 
+'''
+run every experiment of the grid, at most `parallel` at a time
+each experiment is a dict of run_one_experiment keyword arguments
+'''
+def run_experiments(experiments, parallel=1, manifest=None, resume=False, warm=None,
+                    resources=None):
+
+    if parallel <= 1:
+        # a failed experiment is reported and the grid goes on, as with slots
+        failed = []
+        for exp in experiments:
+            try:
+                run_one_experiment(**exp, manifest=manifest, resume=resume, warm=warm,
+                                   resources=resources)
+            except Exception as e:
+                print(f"[SIMULATOR] experiment {exp['count']} failed: {e}")
+                failed.append(exp)
+        return failed
+    if parallel > MAX_SLOTS:
+        raise ValueError(f"at most {MAX_SLOTS} slots, the networks of more collide with the scenarios")
+
+    # hand out slots through a queue; a slot is reused as soon as it is free
+    free_slots = queue.Queue()
+    for slot in range(parallel):
+        free_slots.put(slot)
+    used = set()
+
+    def run_in_slot(exp):
+        slot = free_slots.get()
+        try:
+            fresh = slot not in used
+            used.add(slot)
+            run_one_experiment(**exp, slot=slot, fresh=fresh, manifest=manifest, resume=resume,
+                               warm=warm, resources=resources)
+        finally:
+            free_slots.put(slot)
+
+    failed = []
+    try:
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            futures = [(exp, pool.submit(run_in_slot, exp)) for exp in experiments]
+            for exp, fut in futures:
+                try:
+                    fut.result()
+                except Exception as e:
+                    print(f"[SIMULATOR] experiment {exp['count']} failed: {e}")
+                    failed.append(exp)
+    finally:
+        # the slot projects are not reused after the grid: remove their containers and networks
+        for slot in sorted(used):
+            env = os.environ.copy()
+            env.update(slot_env(slot))
+            with TRACER.span("teardown"):
+                subprocess.run([DOCKER, "compose", "down", "-v"], check=False, env=env)
+    return failed
+
+
+''' mean and p99 stream completion time of the short streams in one server log '''
+def short_flow_stats(log_path):
+    sct = []
+    with open(log_path, newline="") as fp:
+        for row in csv.DictReader(fp):
+            if row.get("class") == "short" and float(row["sct_ms"]) > 0:
+                sct.append(float(row["sct_ms"]))
+    if not sct:
+        return None
+    sct.sort()
+    # linear interpolation between order statistics, as numpy's percentile
+    pos = 0.99 * (len(sct) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(sct) - 1)
+    p99 = sct[lo] + (sct[hi] - sct[lo]) * (pos - lo)
+    return sum(sct) / len(sct), p99
+
+''' half width of the 95% confidence interval of the mean of `values` '''
+def ci_half_width(values):
+    k = len(values)
+    if k < 2:
+        return math.inf
+    mean = sum(values) / k
+    sd = math.sqrt(sum((v - mean) ** 2 for v in values) / (k - 1))
+    t = T95[k - 2] if k - 1 <= len(T95) else 1.96
+    return t * sd / math.sqrt(k)
+
+'''
+runs replicates of every configuration until the 95% confidence intervals of
+the short-flow mean and p99 SCT are narrower than `target` (relative to the
+estimate), or max_reps / the total budget is used up. After min_reps for every
+configuration, each round gives one more replicate to the configurations whose
+intervals are currently widest.
+'''
+class ReplicationController:
+
+    def __init__(self, configs, min_reps=3, max_reps=10, target=0.05, budget=None, manifest=None,
+                 seeded=True):
+        self.configs = configs
+        self.seeded = seeded        # pass SEED_FLAG; False when the client does not define it
+        self.manifest = manifest    # replicates it marks invalid are not counted
+        self.min_reps = min_reps
+        self.max_reps = max(max_reps, min_reps)
+        self.target = target
+        self.budget = budget
+        self.samples = [[] for _ in configs]    # (mean, p99) per finished replicate
+        self.attempts = [0] * len(configs)
+        self.counter = 0
+
+    def rel_width(self, i):
+        '''widest relative CI half width of config i over short mean and p99'''
+        widths = []
+        for j in range(2):
+            vals = [s[j] for s in self.samples[i]]
+            est = sum(vals) / len(vals) if vals else 0.0
+            widths.append(ci_half_width(vals) / abs(est) if est else math.inf)
+        return max(widths)
+
+    def converged(self, i):
+        return len(self.samples[i]) >= self.min_reps and self.rel_width(i) <= self.target
+
+    def _replicate(self, i):
+        rep = self.attempts[i]
+        self.attempts[i] += 1
+        self.counter += 1
+        seed = BASE_SEED + rep if self.seeded else None
+        exp = dict(self.configs[i], rep=rep, seed=seed, count=self.counter)
+        return i, exp
+
+    def _collect(self, batch):
+        for i, exp in batch:
+            name, logfile, _ = build_experiment(**{k: v for k, v in exp.items() if k != "count"})
+            path = os.path.join("logs", "server", logfile)
+            entry = self.manifest.entries.get(name) if self.manifest is not None else None
+            if entry is not None and entry["status"] == "invalid":
+                continue
+            stats = short_flow_stats(path) if os.path.exists(path) else None
+            if stats is not None:
+                self.samples[i].append(stats)
+
+    def run(self, run_batch, parallel=1):
+        '''run_batch(list of experiment dicts) runs them, e.g. via run_experiments'''
+        spent = 0
+
+        def left():
+            return math.inf if self.budget is None else self.budget - spent
+
+        # replicate by replicate, so a tight budget still gives every config its first runs
+        first = [i for _ in range(self.min_reps) for i in range(len(self.configs))]
+        if self.budget is not None:
+            first = first[:self.budget]
+        # only replicates that run are counted in attempts
+        batch = [self._replicate(i) for i in first]
+        while batch:
+            run_batch([exp for _, exp in batch])
+            spent += len(batch)
+            self._collect(batch)
+
+            open_configs = [
+                i for i in range(len(self.configs))
+                if not self.converged(i) and self.attempts[i] < self.max_reps
+            ]
+            # widest intervals first: that is where another replicate helps most
+            open_configs.sort(key=self.rel_width, reverse=True)
+            n = min(max(parallel, 1), len(open_configs), left())
+            batch = [self._replicate(i) for i in open_configs[:n]]
+
+    def report(self, path=REPLICATION_LOG):
+        print("\n[SIMULATOR] replication summary (short streams, 95% CI)")
+        rows = []
+        for i, cfg in enumerate(self.configs):
+            name, _, _ = build_experiment(**{k: v for k, v in cfg.items() if k != "count"})
+            means = [s[0] for s in self.samples[i]]
+            p99s = [s[1] for s in self.samples[i]]
+            row = {
+                "experiment": name,
+                "reps": len(means),
+                "mean_sct_ms": sum(means) / len(means) if means else math.nan,
+                "mean_ci_ms": ci_half_width(means),
+                "p99_sct_ms": sum(p99s) / len(p99s) if p99s else math.nan,
+                "p99_ci_ms": ci_half_width(p99s),
+                "converged": self.converged(i),
+            }
+            rows.append(row)
+            print(f"  {name}: {row['reps']} reps, mean {row['mean_sct_ms']:.1f} +- {row['mean_ci_ms']:.1f}, "
+                  f"p99 {row['p99_sct_ms']:.1f} +- {row['p99_ci_ms']:.1f}"
+                  + ("" if row["converged"] else "  (not converged)"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", newline="") as fp:
+            writer = csv.DictWriter(fp, fieldnames=list(rows[0]) if rows else ["experiment"])
+            writer.writeheader()
+            writer.writerows(rows)
 
 def main():
 
@@ -147,22 +720,114 @@ def main():
     parser.add_argument("--topo", "-t", type=str, default="b")
     parser.add_argument("--sched", "-s", type=str, default="drr")
     parser.add_argument("--dtype", "-d", type=str, default="threePoints")
+    parser.add_argument("--parallel", "-p", type=int, default=1,
+                        help="experiments to run at once, each in its own compose project "
+                             f"(capped at cores/{CORES_PER_EXPERIMENT})")
+    parser.add_argument("--resume", "-r", action="store_true",
+                        help="skip experiments the run manifest records as complete "
+                             "with an identical configuration; rerun failed ones")
+    parser.add_argument("--warm", "-w", action="store_true",
+                        help="keep networks and the sim up between experiments; restart only "
+                             "the endpoints, and the sim only when the scenario changes")
+    parser.add_argument("--reps", type=int, default=1,
+                        help="maximum replicates per configuration, each with its own seed; "
+                             "above 1 replicates stop early once the confidence intervals are narrow")
+    parser.add_argument("--min-reps", type=int, default=3,
+                        help="replicates every configuration gets before early stopping")
+    parser.add_argument("--ci-target", type=float, default=0.05,
+                        help="stop once the 95%% CI half width of the short-flow mean and p99 SCT "
+                             "is below this fraction of the estimate")
+    parser.add_argument("--rep-budget", type=int, default=None,
+                        help="total number of replicate runs over the whole sweep")
+    parser.add_argument("--trace", type=str, default=TRACE_PATH,
+                        help="where to write the Chrome trace of every experiment and phase")
+    parser.add_argument("--spec", type=str, default=None,
+                        help="json sweep spec (grid, lhs or ofat design, see sweep.py); factors it "
+                             "leaves out come from --topo/--sched/--dtype and the module constants")
+    parser.add_argument("--shard", type=str, default=None,
+                        help="i/N: run only the i-th of N deterministic slices of the sweep, "
+                             "e.g. one per host; combine them with 'sweep.py merge'")
+    parser.add_argument("--client-log", action="store_true",
+                        help=f"pass {CLIENT_LOG_FLAG} to the client so it logs every stream to "
+                             "logs/client/<experiment>.csv (see analysis/latency.py)")
+    parser.add_argument("--workload", type=str, default=None,
+                        choices=WORKLOADS,
+                        help="generate a flow arrival/size trace per seed and have the client replay "
+                             f"it ({TRACE_FLAG}), so every scheduler sees the same flows")
+    parser.add_argument("--load", type=float, default=None,
+                        help="with --workload: Poisson arrivals at this fraction of the link "
+                             "(default: all flows at once, paced by -concurrency)")
+    parser.add_argument("--monitor", action="store_true",
+                        help=f"sample docker stats of the containers during every experiment into "
+                             f"{STATS_DIR} and mark experiments whose containers saturated invalid")
+    parser.add_argument("--cpu-limit", type=float, default=monitor.CPU_LIMIT,
+                        help="with --monitor: CPU %% (100 = one core) counted as saturated")
+    parser.add_argument("--mem-limit", type=float, default=monitor.MEM_LIMIT,
+                        help="with --monitor: memory %% of the container limit counted as saturated")
+    parser.add_argument("--stats-replay", type=str, default=None,
+                        help="with --monitor: replay recorded 'docker stats' json lines from this "
+                             "file instead of reading docker, e.g. for a dry run")
     args = parser.parse_args()
 
-    scenario = args.topo
-    scheduler = args.sched
-    dtype = args.dtype
+    if args.client_log and not client_supports(CLIENT_LOG_FLAG):
+        parser.error(f"--client-log: {CLIENT_BINARY} in {CLIENT_IMAGE} does not define {CLIENT_LOG_FLAG}; "
+                     "the client has to write the per-stream log of analysis/latency.py first")
+    if args.workload and not client_supports(TRACE_FLAG):
+        parser.error(f"--workload: {CLIENT_BINARY} in {CLIENT_IMAGE} does not define {TRACE_FLAG}; "
+                     "the client cannot replay a trace")
 
-    exp_counter = 0
-    
-    if scheduler == "drr": # if scheduler is DRR, add quanta to grid
-        for delay, bw, qlen, quantum, con in itertools.product(DELAYS, BANDWIDTHS, QUEUE_LENGTHS, QUANTUMS, CONCURRENCY):
-            exp_counter += 1
-            run_one_experiment(scenario, delay, bw, qlen, scheduler, con, dtype, exp_counter, quantum)
-    else: # otherwise use only network parameters 
-        for delay, bw, qlen, con in itertools.product(DELAYS, BANDWIDTHS, QUEUE_LENGTHS, CONCURRENCY):
-            exp_counter += 1
-            run_one_experiment(scenario, delay, bw, qlen, scheduler, con, dtype, exp_counter)
+    defaults = default_factors(args.topo, args.sched, args.dtype)
+    spec = sweep.load_spec(args.spec) if args.spec else {"design": "grid"}
+    configs = sweep.expand(spec, defaults)
+    total = len(configs)
+    if args.shard:
+        i, n = sweep.parse_shard(args.shard)
+        configs = sweep.shard(configs, i, n)
+        print(f"[SIMULATOR] shard {i}/{n}: {len(configs)} of {total} experiments")
+    if args.client_log:
+        configs = [dict(cfg, client_log=True) for cfg in configs]
+    if args.workload:
+        configs = [dict(cfg, workload={"dist": args.workload, "load": args.load}) for cfg in configs]
+    experiments = [dict(cfg, count=count) for count, cfg in enumerate(configs, start=1)]
+
+    parallel = max_parallel(args.parallel)
+    if parallel < args.parallel:
+        print(f"[SIMULATOR] running {parallel} experiments at a time ({os.cpu_count()} cores)")
+    manifest = RunManifest()
+    warm = WarmEnvironment() if args.warm else None
+    resources = None
+    if args.monitor:
+        source = partial(monitor.ReplaySource, args.stats_replay) if args.stats_replay else None
+        resources = partial(monitor.ResourceMonitor, source=source, docker=DOCKER,
+                            cpu_limit=args.cpu_limit, mem_limit=args.mem_limit)
+    failed = []
+    try:
+        if args.reps > 1:
+            seeded = client_supports(SEED_FLAG)
+            if not seeded:
+                print(f"[SIMULATOR] warning: {CLIENT_IMAGE} does not define {SEED_FLAG}; replicates "
+                      "run unseeded, so schedulers do not see the same workloads")
+            configs = [{k: v for k, v in exp.items() if k != "count"} for exp in experiments]
+            controller = ReplicationController(
+                configs, min(args.min_reps, args.reps), args.reps, args.ci_target, args.rep_budget,
+                manifest, seeded)
+            controller.run(
+                lambda batch: failed.extend(
+                    run_experiments(batch, parallel, manifest, args.resume, warm, resources)),
+                parallel,
+            )
+            controller.report()
+        else:
+            failed = run_experiments(experiments, parallel, manifest, args.resume, warm, resources)
+    finally:
+        if warm is not None:
+            warm.shutdown()
+        TRACER.report("[SIMULATOR] ")
+        TRACER.report("[SIMULATOR] ", category="compose_up")
+        TRACER.write(args.trace)
+        print(f"[SIMULATOR] timeline written to {args.trace} (open in chrome://tracing)")
+    if failed:
+        print(f"[SIMULATOR] {len(failed)} of {len(experiments)} experiments failed")
 
 if __name__ == "__main__":
     main()
@@ -62,6 +62,14 @@ Mac48Address getMacAddress(std::string iface) {
   return mac;
 }
 
+// Addresses of the simulator on leftnet / rightnet. They default to the
+// standard network layout and can be overridden through the environment, so
+// that several simulations can run side by side on separate networks.
+std::string getEnvOr(const char *name, const char *fallback) {
+  const char *value = getenv(name);
+  return (value != NULL && *value != '\0') ? std::string(value) : std::string(fallback);
+}
+
 QuicNetworkSimulatorHelper::QuicNetworkSimulatorHelper() {
   GlobalValue::Bind("SimulatorImplementationType", StringValue("ns3::RealtimeSimulatorImpl"));
   GlobalValue::Bind("ChecksumEnabled", BooleanValue(true));
@@ -74,8 +82,13 @@ QuicNetworkSimulatorHelper::QuicNetworkSimulatorHelper() {
   left_node_ = nodes.Get(0);
   right_node_ = nodes.Get(1);
 
-  installNetDevice(left_node_, "eth0", getMacAddress("eth0"), Ipv4InterfaceAddress("193.167.0.2", "255.255.255.0"), Ipv6InterfaceAddress("fd00:cafe:cafe:0::2", 64));
-  installNetDevice(right_node_, "eth1", getMacAddress("eth1"), Ipv4InterfaceAddress("193.167.100.2", "255.255.255.0"), Ipv6InterfaceAddress("fd00:cafe:cafe:100::2", 64));
+  std::string left_ipv4 = getEnvOr("SIM_LEFT_IPV4", "193.167.0.2");
+  std::string left_ipv6 = getEnvOr("SIM_LEFT_IPV6", "fd00:cafe:cafe:0::2");
+  std::string right_ipv4 = getEnvOr("SIM_RIGHT_IPV4", "193.167.100.2");
+  std::string right_ipv6 = getEnvOr("SIM_RIGHT_IPV6", "fd00:cafe:cafe:100::2");
+
+  installNetDevice(left_node_, "eth0", getMacAddress("eth0"), Ipv4InterfaceAddress(left_ipv4.c_str(), "255.255.255.0"), Ipv6InterfaceAddress(left_ipv6.c_str(), 64));
+  installNetDevice(right_node_, "eth1", getMacAddress("eth1"), Ipv4InterfaceAddress(right_ipv4.c_str(), "255.255.255.0"), Ipv6InterfaceAddress(right_ipv6.c_str(), 64));
 }
 
 void massageIpv6Routing(Ptr<Node> local, Ptr<Node> peer) {
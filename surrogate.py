@@ -0,0 +1,231 @@
+'''
+fast surrogate of the simple-p2p experiments, for pre-screening sweeps
+
+A fluid model of one QUIC connection over the simple-p2p bottleneck:
+the client keeps at most `concurrency` streams open, the connection sends at
+the rate its congestion window allows on a link of `bw` Mbps with `delay` ms
+one-way delay and a `qlen` packet switch queue, and the stream scheduler splits
+that rate over the open streams:
+
+    rr    equal shares
+    drr   shares proportional to the class quantum (quantum0/1/2 for short/medium/long)
+    wfq   shares proportional to WFQ_WEIGHTS
+    abs   everything to the oldest stream of the most important class
+
+The simulation is event driven (stream starts, completions and rate changes)
+so one experiment costs a few hundred vectorised steps. Results are written as
+server-style CSVs (time_ms,stream_id,bytes,sct_ms,e2e_ms,class,scheduler) with
+the same file names as run_grid.py, so the analysis runs on them unchanged.
+
+usage:
+    python3 surrogate.py --sched drr                 # the run_grid.py grid
+    python3 surrogate.py --sched wfq --out logs/surrogate --seed 3
+'''
+import os
+import csv
+import time
+import argparse
+import itertools
+import numpy as np
+
+from run_grid import (
+    QUANTUMS, NFLOWS, SLRATIO, SHORT_SIZE, LONG_SIZE,
+    CONCURRENCY, DELAYS, BANDWIDTHS, QUEUE_LENGTHS, build_experiment,
+)
+from analysis import workload
+
+OUT_DIR = os.path.join("logs", "surrogate")
+
+MSS = 1200                  # bytes per packet
+INITIAL_WINDOW = 10 * MSS   # bytes
+CLASSES = ["short", "medium", "long"]
+WFQ_WEIGHTS = np.array([4.0, 2.0, 1.0])     # short, medium, long
+
+
+''' flow sizes of one experiment and their classes (0 short, 1 medium, 2 long), see analysis/workload.py '''
+def sample_flows(dtype, nflows, rng):
+    nbytes = workload.sample_sizes(dtype, nflows, rng, SHORT_SIZE, LONG_SIZE, SLRATIO)
+    return nbytes.astype(float), workload.size_classes(nbytes, SHORT_SIZE, LONG_SIZE)
+
+
+''' long-run utilisation and mean queueing delay of an AIMD sawtooth '''
+def aimd_steady_state(bdp, qlen):
+    # the window oscillates between W/2 and W = bdp + queue, in units of bdp
+    b = qlen * MSS / bdp
+    lo, hi = (1 + b) / 2, 1 + b
+    if lo >= 1:
+        util = 1.0
+    else:
+        util = ((1 - lo * lo) / 2 + (hi - 1)) / (hi - lo)
+    # mean standing queue over the sawtooth, in bytes
+    top, bottom = hi - 1, max(lo - 1, 0.0)
+    queued = (top * top - bottom * bottom) / 2 / (hi - lo) * bdp
+    return util, queued
+
+
+''' share of the connection rate each open stream gets '''
+def stream_shares(scheduler, classes, order, quantum):
+    if scheduler == "rr":
+        w = np.ones(len(classes))
+    elif scheduler == "drr":
+        w = np.asarray(quantum, dtype=float)[classes]
+    elif scheduler == "wfq":
+        w = WFQ_WEIGHTS[classes]
+    elif scheduler == "abs":
+        # oldest stream of the most important class present
+        w = np.zeros(len(classes))
+        best = np.lexsort((order, classes))[0]
+        w[best] = 1.0
+    else:
+        raise ValueError(f"unknown scheduler {scheduler}")
+    return w / w.sum()
+
+
+'''
+simulate one experiment; returns a dict of per-stream arrays in completion
+order: time_ms, stream_id, bytes, sct_ms, e2e_ms, class (index into CLASSES)
+'''
+def simulate(delay, bw, qlen, scheduler, con, dtype="threePoints", quantum=None,
+             nflows=NFLOWS, seed=0, t0_ms=0.0, load=None):
+    '''
+    load: offered load as a fraction of the link; flows then arrive as in the
+    Poisson workload trace of (dtype, seed), otherwise all of them at 0
+    '''
+    delay, bw, qlen, con = float(delay), float(bw), int(qlen), int(con)
+    if scheduler == "drr" and quantum is None:
+        raise ValueError("quantum is not defined when scheduler is DRR")
+
+    if load:
+        trace = workload.generate(dtype, nflows, seed, SHORT_SIZE, LONG_SIZE, SLRATIO, load, bw)
+        nbytes = trace["bytes"].astype(float)
+        classes = workload.size_classes(trace["bytes"], SHORT_SIZE, LONG_SIZE)
+        arrival = trace["arrival_ms"]
+    else:
+        rng = np.random.default_rng(seed)
+        nbytes, classes = sample_flows(dtype, nflows, rng)
+        arrival = np.zeros(nflows)
+
+    capacity = bw * 1e6 / 8 / 1000      # bytes per ms
+    rtt = 2 * delay
+    bdp = capacity * rtt
+    util, queued = aimd_steady_state(bdp, qlen)
+    qdelay = queued / capacity          # ms of standing queue
+    steady_rate = capacity * util
+
+    remaining = nbytes.copy()
+    opened = np.full(nflows, np.nan)    # ms the client opened the stream
+    first = np.full(nflows, np.nan)     # ms the first byte reached the server
+    done = np.full(nflows, np.nan)      # ms the last byte reached the server
+
+    # the client opens NFLOWS streams in order, once they arrived and at most `con` at a time
+    active = []
+    next_flow = 0
+    t = 0.0
+    cwnd = INITIAL_WINDOW
+    finish_order = []
+
+    while active or next_flow < nflows:
+        if not active:
+            t = max(t, arrival[next_flow])
+        while next_flow < nflows and len(active) < con and arrival[next_flow] <= t:
+            opened[next_flow] = t
+            active.append(next_flow)
+            next_flow += 1
+        idx = np.array(active)
+        # slow start until the sawtooth regime, then the steady AIMD rate
+        slow_start = cwnd < bdp * util
+        rate = min(cwnd / rtt, steady_rate) if slow_start else steady_rate
+
+        shares = stream_shares(scheduler, classes[idx], idx, quantum) * rate
+        first[idx] = np.where(np.isnan(first[idx]) & (shares > 0), t + delay + qdelay, first[idx])
+        with np.errstate(divide="ignore"):
+            to_finish = np.where(shares > 0, remaining[idx] / shares, np.inf)
+        step = to_finish.min()
+        if slow_start:
+            step = min(step, rtt)       # the window doubles every rtt
+        if next_flow < nflows and len(active) < con:
+            step = min(step, arrival[next_flow] - t)
+
+        remaining[idx] -= shares * step
+        t += step
+        if slow_start:
+            # also grows over the shorter steps to a flow's completion or arrival
+            cwnd *= 2 ** (step / rtt)
+
+        finished = idx[remaining[idx] <= 1e-6]
+        for f in finished:
+            done[f] = t + delay + qdelay
+            finish_order.append(f)
+            active.remove(f)
+
+    order = np.array(finish_order, dtype=np.int64)
+    return {
+        "time_ms": t0_ms + done[order],
+        "stream_id": 4 * order,     # client-initiated bidirectional stream ids
+        "bytes": nbytes[order].astype(np.int64),
+        "sct_ms": done[order] - first[order],
+        "e2e_ms": done[order] - opened[order],
+        "class": classes[order],
+    }
+
+
+''' write one simulated experiment in the server csv schema '''
+def write_log(path, result, scheduler):
+    with open(path, "w", newline="") as fp:
+        writer = csv.writer(fp)
+        writer.writerow(["time_ms", "stream_id", "bytes", "sct_ms", "e2e_ms", "class", "scheduler"])
+        for i in range(len(result["stream_id"])):
+            writer.writerow([
+                int(round(result["time_ms"][i])),
+                result["stream_id"][i],
+                result["bytes"][i],
+                f"{result['sct_ms'][i]:.2f}",
+                f"{result['e2e_ms'][i]:.2f}",
+                CLASSES[result["class"][i]],
+                scheduler,
+            ])
+
+
+''' short-flow mean and p99 sct of a simulated experiment '''
+def short_flow_score(result):
+    sct = result["sct_ms"][result["class"] == 0]
+    if len(sct) == 0:
+        return np.nan, np.nan
+    return sct.mean(), np.percentile(sct, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="surrogate model of the simple-p2p grid")
+    parser.add_argument("--sched", "-s", type=str, default="drr")
+    parser.add_argument("--dtype", "-d", type=str, default="threePoints")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--load", type=float, default=None,
+                        help="Poisson flow arrivals at this fraction of the link (see analysis/workload.py)")
+    parser.add_argument("--out", type=str, default=OUT_DIR)
+    args = parser.parse_args()
+
+    if args.sched == "drr":
+        grid = itertools.product(DELAYS, BANDWIDTHS, QUEUE_LENGTHS, QUANTUMS, CONCURRENCY)
+        configs = [dict(delay=d, bw=b, qlen=q, quantum=qt, con=c) for d, b, q, qt, c in grid]
+    else:
+        grid = itertools.product(DELAYS, BANDWIDTHS, QUEUE_LENGTHS, CONCURRENCY)
+        configs = [dict(delay=d, bw=b, qlen=q, con=c) for d, b, q, c in grid]
+
+    os.makedirs(args.out, exist_ok=True)
+    start = time.monotonic()
+    scores = []
+    for cfg in configs:
+        result = simulate(scheduler=args.sched, dtype=args.dtype, seed=args.seed, load=args.load, **cfg)
+        name, logfile, _ = build_experiment("b", scheduler=args.sched, dtype=args.dtype, **cfg)
+        write_log(os.path.join(args.out, logfile), result, args.sched)
+        scores.append((name, *short_flow_score(result)))
+    elapsed = time.monotonic() - start
+
+    print(f"simulated {len(configs)} experiments in {elapsed:.2f}s, logs in {args.out}")
+    print(f"  {'experiment':<60} {'short mean':>11} {'short p99':>10}")
+    for name, mean, p99 in sorted(scores, key=lambda s: s[1]):
+        print(f"  {name:<60} {mean:>11.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+'''
+declarative sweep specifications, sharding and merging of sharded results
+
+A spec is a json file naming the levels of every factor and a design:
+
+    {
+        "design": "lhs",                 grid (default), lhs or ofat
+        "samples": 12,                   lhs only: number of points
+        "seed": 0,                       lhs only
+        "baseline": {"qlen": "20"},      ofat only: centre point (default: first levels)
+        "factors": {
+            "scheduler": ["drr", "rr", "wfq"],
+            "delay": ["10", "20", "50"],
+            "bw": ["8"],
+            "qlen": ["5", "20", "100"],
+            "con": ["10", "30"],
+            "quantum": [[3600, 2400, 1200], [2400, 1200, 1200]]
+        }
+    }
+
+Factors are the run_one_experiment arguments (scenario, delay, bw, qlen,
+scheduler, con, dtype, quantum); a scalar is a single level, and factors left
+out take the run_grid.py command line / module defaults. quantum only applies
+to drr: other schedulers drop it and their duplicate points are removed.
+
+    grid   full cartesian product, in factor order (the last factor varies fastest)
+    lhs    Latin hypercube over the levels: every level of every factor appears
+           in samples / levels points, the pairing is a seeded permutation
+    ofat   the baseline point plus, for every factor, each of its other levels
+           with all remaining factors at the baseline
+
+Expansion is deterministic, so every host of a sharded sweep computes the same
+list and `--shard i/N` takes every N-th experiment starting from the i-th.
+
+usage:
+    python3 sweep.py expand sweeps/lhs.json [--shard 2/4]     # list the experiments
+    python3 sweep.py merge hostA/logs/server hostB/logs/server --out logs/server
+'''
+import os
+import json
+import random
+import shutil
+import hashlib
+import argparse
+import itertools
+
+DESIGNS = ["grid", "lhs", "ofat"]
+# run_one_experiment arguments a spec can vary, in default grid order
+FACTORS = ["scenario", "dtype", "scheduler", "delay", "bw", "qlen", "quantum", "con"]
+MANIFEST = "manifest.json"
+
+
+def load_spec(path):
+    with open(path) as fp:
+        spec = json.load(fp)
+    design = spec.get("design", "grid")
+    if design not in DESIGNS:
+        raise ValueError(f"{path}: unknown design {design!r}, expected one of {DESIGNS}")
+    unknown = set(spec.get("factors", {})) - set(FACTORS)
+    if unknown:
+        raise ValueError(f"{path}: unknown factors {sorted(unknown)}, expected some of {FACTORS}")
+    return spec
+
+
+def levels_of(name, value):
+    '''a factor's levels as a list; numbers become the strings run_grid uses'''
+    if name == "quantum":
+        if value is None or (value and not isinstance(value[0], (list, tuple))):
+            value = [value]
+        return [None if q is None else tuple(int(x) for x in q) for q in value]
+    if not isinstance(value, list):
+        value = [value]
+    return [str(v) for v in value]
+
+
+def normalize(point):
+    '''drop the quantum of non-drr points; drr points must have one'''
+    point = dict(point)
+    if point.get("scheduler") != "drr":
+        point["quantum"] = None
+    elif point.get("quantum") is None:
+        raise ValueError(f"drr point without a quantum: {point}")
+    return point
+
+
+def latin_hypercube(factors, samples, seed=0):
+    '''samples points where every level of every factor appears equally often'''
+    rng = random.Random(seed)
+    columns = {}
+    for name, levels in factors.items():
+        # stratify [0, samples) over the levels, then shuffle the strata
+        column = [levels[i * len(levels) // samples] for i in range(samples)]
+        rng.shuffle(column)
+        columns[name] = column
+    return [{name: columns[name][i] for name in factors} for i in range(samples)]
+
+
+def one_factor_at_a_time(factors, baseline):
+    points = [dict(baseline)]
+    for name, levels in factors.items():
+        for level in levels:
+            if level != baseline[name]:
+                points.append(dict(baseline, **{name: level}))
+    return points
+
+
+def expand(spec, defaults=None):
+    '''
+    list of run_one_experiment keyword dicts (without count) of a spec;
+    defaults: factor values used where the spec does not give any
+    '''
+    factors = {}
+    for name in FACTORS:
+        if name in spec.get("factors", {}):
+            factors[name] = levels_of(name, spec["factors"][name])
+        elif defaults and name in defaults:
+            factors[name] = levels_of(name, defaults[name])
+    if "quantum" not in factors:
+        factors["quantum"] = [None]
+
+    design = spec.get("design", "grid")
+    if design == "grid":
+        points = [dict(zip(factors, values)) for values in itertools.product(*factors.values())]
+    elif design == "lhs":
+        points = latin_hypercube(factors, int(spec["samples"]), spec.get("seed", 0))
+    else:
+        baseline = {name: levels[0] for name, levels in factors.items()}
+        for name, value in spec.get("baseline", {}).items():
+            baseline[name] = levels_of(name, value)[0]
+        points = one_factor_at_a_time(factors, baseline)
+
+    # non-drr schedulers ignore the quantum: keep the first of their duplicates
+    experiments, seen = [], set()
+    for point in points:
+        if point.get("scheduler") == "drr" and point["quantum"] is None:
+            point = dict(point, quantum=factors["quantum"][0])
+        point = normalize(point)
+        key = json.dumps(point, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            experiments.append(point)
+    return experiments
+
+
+def parse_shard(text):
+    '''"i/N" (1 <= i <= N) -> (i, N)'''
+    try:
+        i, n = (int(x) for x in text.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {text!r}")
+    if not 1 <= i <= n:
+        raise ValueError(f"shard {text}: need 1 <= i <= N")
+    return i, n
+
+
+def shard(experiments, i, n):
+    '''the i-th of n disjoint, balanced slices of an expanded sweep'''
+    return experiments[i - 1::n]
+
+
+def file_sha1(path, blocksize=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(blocksize), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def newer(entry, other):
+    '''manifest entry to keep: complete beats any other status, then the latest update'''
+    rank = (entry["status"] == "complete", entry.get("updated", ""))
+    return rank > (other["status"] == "complete", other.get("updated", ""))
+
+
+def merge(sources, out):
+    '''
+    combine the server logs and run manifests of several shards into out
+    a log is taken from the shard whose manifest entry wins (see newer); logs
+    without a manifest entry are copied unless out already has a different one
+    returns the merged manifest
+    '''
+    os.makedirs(out, exist_ok=True)
+    out_manifest = os.path.join(out, MANIFEST)
+    merged = {}
+    if os.path.exists(out_manifest):
+        with open(out_manifest) as fp:
+            merged = json.load(fp)
+    origin = {name: out for name in merged}
+
+    for src in sources:
+        path = os.path.join(src, MANIFEST)
+        if not os.path.exists(path):
+            print(f"[MERGE] warning: no {MANIFEST} in {src}")
+            continue
+        with open(path) as fp:
+            entries = json.load(fp)
+        for name, entry in entries.items():
+            if name not in merged or newer(entry, merged[name]):
+                if name in merged and merged[name]["config_hash"] != entry["config_hash"]:
+                    print(f"[MERGE] {name}: configuration differs between shards, keeping {src}")
+                merged[name] = entry
+                origin[name] = src
+
+    copied = conflicts = 0
+    for src in sources:
+        for fname in sorted(os.listdir(src)):
+            if not fname.endswith(".csv"):
+                continue
+            name = fname[:-4]
+            if name in origin and origin[name] != src:
+                continue
+            target = os.path.join(out, fname)
+            source = os.path.join(src, fname)
+            if os.path.exists(target):
+                if file_sha1(target) == file_sha1(source):
+                    continue
+                if name not in origin:
+                    print(f"[MERGE] warning: {fname} differs in {src} and {out}, keeping {out}")
+                    conflicts += 1
+                    continue
+            tmp = target + ".tmp"
+            shutil.copyfile(source, tmp)
+            os.replace(tmp, target)
+            copied += 1
+
+    missing = [n for n, e in merged.items()
+               if e["status"] == "complete" and not os.path.exists(os.path.join(out, n + ".csv"))]
+    for name in missing:
+        print(f"[MERGE] warning: {name} is complete in a manifest but its log is missing")
+
+    tmp = out_manifest + ".tmp"
+    with open(tmp, "w") as fp:
+        json.dump(merged, fp, indent=2, sort_keys=True)
+    os.replace(tmp, out_manifest)
+
+    status = {}
+    for entry in merged.values():
+        status[entry["status"]] = status.get(entry["status"], 0) + 1
+    print(f"[MERGE] {len(sources)} shards -> {out}: {copied} logs copied, {conflicts} conflicts, "
+          + ", ".join(f"{n} {s}" for s, n in sorted(status.items())))
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="expand sweep specs and merge sharded results")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("expand", help="list the experiments of a spec (or of one shard)")
+    p.add_argument("spec")
+    p.add_argument("--shard", type=str, default=None, help="i/N: only the i-th of N shards")
+    p = sub.add_parser("merge", help="combine the logs/server directories of several shards")
+    p.add_argument("sources", nargs="+", help="logs/server directories copied from each host")
+    p.add_argument("--out", type=str, default=os.path.join("logs", "server"))
+    args = parser.parse_args()
+
+    if args.command == "expand":
+        from run_grid import default_factors
+        experiments = expand(load_spec(args.spec), default_factors())
+        total = len(experiments)
+        if args.shard:
+            experiments = shard(experiments, *parse_shard(args.shard))
+        for exp in experiments:
+            print(json.dumps(exp))
+        print(f"{len(experiments)} of {total} experiments")
+    else:
+        merge(args.sources, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+'''
+the tests run from a temporary directory with DOCKER pointing at stub_docker,
+so run_grid.py writes its logs there and never touches a real docker
+'''
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB_DOCKER = os.path.join(ROOT, "tests", "stub_docker")
+# run_grid.py and monitor.py import from the root, the analysis scripts import their siblings by name
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, "analysis"))
+
+
+@pytest.fixture
+def docker(tmp_path, monkeypatch):
+    '''
+    run_grid with the stub docker in an empty working directory
+    returns a function listing (compose project, argument list) of every call so far
+    '''
+    import run_grid
+
+    log = tmp_path / "docker_calls.log"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(run_grid, "DOCKER", STUB_DOCKER)
+    monkeypatch.setenv("STUB_CALLS", str(log))
+
+    def calls():
+        if not log.exists():
+            return []
+        return [(line.split()[0], line.split()[1:]) for line in log.read_text().splitlines()]
+    return calls
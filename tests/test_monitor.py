@@ -0,0 +1,64 @@
+import json
+import os
+from functools import partial
+
+import monitor
+import run_grid
+
+
+def write_stats(path, cpu):
+    '''recorded `docker stats` lines: 10 samples per container, sim at the given cpu %'''
+    with open(path, "w") as fp:
+        for _ in range(10):
+            for name in monitor.CONTAINERS:
+                fp.write(json.dumps({
+                    "Name": name,
+                    "CPUPerc": f"{cpu if name == 'sim' else 20.0}%",
+                    "MemUsage": "100MiB / 2GiB",
+                    "MemPerc": "4.88%",
+                    "NetIO": "1.2MB / 3.4kB",
+                    "PIDs": "7",
+                }) + "\n")
+    return str(path)
+
+
+def replay(path, stats_path, containers):
+    '''run_grid's resources factory, reading recorded stats instead of docker'''
+    return monitor.ResourceMonitor(stats_path, containers, source=partial(monitor.ReplaySource, path))
+
+
+def test_verdict(tmp_path):
+    for cpu, saturated in ((99.0, ["sim"]), (50.0, [])):
+        replayed = write_stats(tmp_path / f"stats{cpu:g}.jsonl", cpu)
+        mon = replay(replayed, str(tmp_path / f"stats{cpu:g}.csv"), monitor.CONTAINERS).start()
+        mon.thread.join()
+        mon.stop()
+        verdict = mon.verdict()
+        assert verdict["saturated"] == saturated
+        assert verdict["containers"]["sim"]["samples"] == 10
+        assert verdict["containers"]["sim"]["cpu_max"] == cpu
+        assert verdict["containers"]["server"]["mem_max_pct"] == 4.88
+
+
+def run(resources, manifest, resume):
+    return run_grid.run_one_experiment("b", "20", "8", "5", "rr", "10", "threePoints", count=1,
+                                       manifest=manifest, resume=resume, resources=resources)
+
+
+def test_saturated_run_is_rerun(docker, tmp_path):
+    saturated = partial(replay, write_stats(tmp_path / "hot.jsonl", 99.0))
+    idle = partial(replay, write_stats(tmp_path / "idle.jsonl", 50.0))
+    name, logfile, _ = run_grid.build_experiment("b", "20", "8", "5", "rr", "10", "threePoints")
+    manifest = run_grid.RunManifest()
+
+    assert run(saturated, manifest, resume=False)
+    entry = manifest.entries[name]
+    assert entry["status"] == "invalid"
+    assert entry["resources"]["saturated"] == ["sim"]
+    assert os.path.exists(os.path.join(run_grid.STATS_DIR, logfile))
+
+    # --resume only skips complete runs: the invalid one is run again
+    manifest = run_grid.RunManifest()
+    assert run(idle, manifest, resume=True)
+    assert manifest.entries[name]["status"] == "complete"
+    assert not run(idle, run_grid.RunManifest(), resume=True)
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pcap
+
+
+def test_synthetic_against_truth(tmp_path):
+    server = pcap.write_synthetic(str(tmp_path), duration_s=5.0, seed=1)
+    intervals, streams = pcap.analyze(str(tmp_path / pcap.LEFT_PCAP), str(tmp_path / pcap.RIGHT_PCAP),
+                                      server, out_dir=str(tmp_path / "out"))
+    truth = pd.read_csv(tmp_path / "truth.csv")
+    data = intervals[intervals["direction"] == "left->right"]
+    assert truth["dropped"].sum() > 0
+
+    # packets at the edges of the captures are censored, not counted as drops
+    assert abs(data["drops"].sum() - truth["dropped"].sum()) <= 0.01 * len(truth)
+    assert abs(data["packets"].sum() - len(truth)) <= 0.01 * len(truth)
+
+    delivered = data["packets"] - data["drops"]
+    qdelay = np.nansum(data["mean_qdelay_ms"] * delivered) / delivered.sum()
+    assert abs(qdelay - truth.loc[~truth["dropped"], "qdelay_ms"].mean()) < 0.1
+    assert data["max_qdelay_ms"].max() <= truth["qdelay_ms"].max() + 0.1
+
+    # the ack direction has no queue
+    acks = intervals[intervals["direction"] == "right->left"]
+    assert acks["drops"].sum() == 0
+    assert np.nanmax(acks["max_qdelay_ms"]) < 0.1
+
+    assert len(streams) == len(pd.read_csv(server))
@@ -0,0 +1,42 @@
+import json
+import numpy as np
+import qlog
+
+
+def write_qlog(path, time_format):
+    '''a JSON-SEQ qlog with events qlog.py skips between the ones it decodes'''
+    header = {"qlog_version": "0.3", "qlog_format": "JSON-SEQ", "trace": {
+        "vantage_point": {"type": "client"},
+        "common_fields": {"reference_time": 1000.0, "time_format": time_format}}}
+    events = [
+        (10.0, "transport:packet_sent", {"header": {"packet_number": 0, "packet_type": "1RTT"},
+                                         "frames": [{"frame_type": "stream", "stream_id": 0,
+                                                     "offset": 0, "length": 100}]}),
+        (5.0, "transport:parameters_set", {}),
+        (5.0, "recovery:loss_timer_updated", {}),
+        (2.0, "recovery:metrics_updated", {"smoothed_rtt": 40.0}),
+        (3.0, "transport:packet_sent", {"header": {"packet_number": 1, "packet_type": "1RTT"},
+                                        "frames": [{"frame_type": "stream", "stream_id": 0,
+                                                    "offset": 100, "length": 100, "fin": True}]}),
+    ]
+    t = 0.0
+    with open(path, "w") as fp:
+        fp.write("\x1e" + json.dumps(header) + "\n")
+        for delta, name, data in events:
+            t += delta
+            time = delta if time_format == "delta" else t
+            fp.write("\x1e" + json.dumps({"time": time, "name": name, "data": data}) + "\n")
+
+
+def test_delta_times_count_skipped_events(tmp_path):
+    times = {}
+    for time_format in ("relative", "delta"):
+        path = str(tmp_path / f"{time_format}.sqlog")
+        write_qlog(path, time_format)
+        tables = qlog.load_trace(path, use_cache=False).tables()
+        times[time_format] = (tables["packets"]["t"], tables["metrics"]["t"])
+
+    assert times["relative"][0].tolist() == [1010.0, 1025.0]
+    assert times["relative"][1].tolist() == [1022.0]
+    for rel, delta in zip(times["relative"], times["delta"]):
+        np.testing.assert_allclose(delta, rel)
@@ -0,0 +1,99 @@
+import os
+import run_grid
+
+
+def experiments(n):
+    '''n grid points of the default sweep, as run_experiments takes them'''
+    return [
+        dict(scenario="b", delay="20", bw="8", qlen="5", scheduler="drr", con=str(10 * (i + 1)),
+             dtype="threePoints", quantum=run_grid.QUANTUMS[0], count=i + 1)
+        for i in range(n)
+    ]
+
+
+def log_path(exp):
+    _, logfile, _ = run_grid.build_experiment(**{k: v for k, v in exp.items() if k != "count"})
+    return os.path.join("logs", "server", logfile)
+
+
+def test_serial(docker):
+    exps = experiments(3)
+    manifest = run_grid.RunManifest()
+    assert run_grid.run_experiments(exps, parallel=1, manifest=manifest) == []
+
+    for exp in exps:
+        assert os.path.exists(log_path(exp))
+    assert {e["status"] for e in manifest.entries.values()} == {"complete"}
+    # no slots: everything runs in the default compose project
+    assert {project for project, _ in docker()} == {"default"}
+
+
+def test_serial_failure(docker, monkeypatch):
+    exps = experiments(3)
+    monkeypatch.setenv("STUB_FAIL", os.path.basename(log_path(exps[1])))
+    manifest = run_grid.RunManifest()
+
+    # the grid goes on after a failure and reports it, as in parallel mode
+    failed = run_grid.run_experiments(exps, parallel=1, manifest=manifest)
+
+    assert failed == [exps[1]]
+    statuses = {name: e["status"] for name, e in manifest.entries.items()}
+    assert sorted(statuses.values()) == ["complete", "complete", "failed"]
+    assert os.path.exists(log_path(exps[0])) and os.path.exists(log_path(exps[2]))
+
+
+def test_parallel(docker):
+    exps = experiments(4)
+    manifest = run_grid.RunManifest()
+    assert run_grid.run_experiments(exps, parallel=2, manifest=manifest) == []
+
+    # the logs are collected from the slot directories into logs/server
+    for exp in exps:
+        assert os.path.exists(log_path(exp))
+    assert not [f for f in os.listdir(os.path.join("logs", "slots", "slot0", "server"))
+                if f.endswith(".csv")]
+    assert len(manifest.entries) == 4
+    assert {e["status"] for e in manifest.entries.values()} == {"complete"}
+    ups = [project for project, args in docker() if args[:2] == ["compose", "up"]]
+    assert sorted(set(ups)) == ["qns-slot0", "qns-slot1"]
+    assert len(ups) == 4
+    # every slot project is taken down once the grid is done
+    last = docker()[-2:]
+    assert sorted(project for project, _ in last) == ["qns-slot0", "qns-slot1"]
+    assert all(args == ["compose", "down", "-v"] for _, args in last)
+
+
+def test_slots_clear_of_scenario_subnets(monkeypatch):
+    monkeypatch.setattr(run_grid.os, "cpu_count", lambda: 1024)
+    slots = run_grid.max_parallel(1000)
+    nets = {int(run_grid.slot_env(s)[k].split(".")[-1])
+            for s in range(slots) for k in ("LEFTNET_V4", "RIGHTNET_V4")}
+    assert not nets & set(run_grid.SCENARIO_SUBNETS)
+    assert max(nets) <= 255
+
+
+def test_parallel_failure(docker, monkeypatch):
+    exps = experiments(3)
+    monkeypatch.setenv("STUB_FAIL", os.path.basename(log_path(exps[1])))
+    manifest = run_grid.RunManifest()
+
+    failed = run_grid.run_experiments(exps, parallel=2, manifest=manifest)
+
+    assert failed == [exps[1]]
+    statuses = {name: e["status"] for name, e in manifest.entries.items()}
+    assert sorted(statuses.values()) == ["complete", "complete", "failed"]
+    assert os.path.exists(log_path(exps[0])) and os.path.exists(log_path(exps[2]))
+    downs = [project for project, args in docker() if args[:2] == ["compose", "down"]]
+    assert {"qns-slot0", "qns-slot1"} <= set(downs)
+
+
+def test_budget_counts_only_replicates_that_ran(docker):
+    configs = [{k: v for k, v in exp.items() if k != "count"} for exp in experiments(3)]
+    ran = []
+    controller = run_grid.ReplicationController(configs, min_reps=3, max_reps=5, budget=4)
+    controller.run(ran.extend)
+
+    # every config gets a replicate before any gets its second
+    assert len(ran) == 4
+    assert controller.attempts == [2, 1, 1]
+    assert [exp["rep"] for exp in ran] == [0, 0, 0, 1]
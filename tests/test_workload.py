@@ -0,0 +1,24 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis import workload
+
+
+def test_parallel_slots_share_one_trace(tmp_path):
+    args = (str(tmp_path), "webSearch", 200, 1, 102400, 1048576, 0.9)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        paths = list(pool.map(lambda _: workload.ensure_trace(*args), range(8)))
+
+    assert len(set(paths)) == 1
+    assert os.listdir(tmp_path) == [os.path.basename(paths[0])]
+    assert len(workload.read_trace(paths[0])["flow"]) == 200
+
+
+def test_trace_name_covers_the_sizes():
+    names = {
+        workload.trace_name("threePoints", 200, 1, 102400, 1048576, 0.9),
+        workload.trace_name("threePoints", 200, 1, 51200, 1048576, 0.9),
+        workload.trace_name("threePoints", 200, 1, 102400, 2097152, 0.9),
+        workload.trace_name("threePoints", 200, 1, 102400, 1048576, 0.5),
+    }
+    assert len(names) == 4